@@ -0,0 +1,179 @@
+from collections import OrderedDict
+
+import pygame
+
+from config import BIRD_RADIUS, WHITE, RED, BLACK, YELLOW, LIGHT_GRAY
+
+TEXT_CACHE_SIZE = 256
+# Цвет прозрачности спрайтов без полупрозрачных пикселей; в палитре игры его нет
+KEY_COLOR = (255, 0, 255)
+
+_fonts = {}
+_font_paths = {}
+
+
+def get_font(name, size):
+    # SysFont при каждом вызове опрашивает системные шрифты; путь и сам шрифт запоминаем.
+    # Шрифт по умолчанию (name=None) берётся напрямую, без поиска
+    key = (name, size)
+    if key not in _fonts:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        if name is not None and name not in _font_paths:
+            _font_paths[name] = pygame.font.match_font(name)
+        _fonts[key] = pygame.font.Font(_font_paths.get(name), size)
+    return _fonts[key]
+
+
+def _canvas(w, h):
+    surface = pygame.Surface((w, h), pygame.SRCALPHA)
+    surface.fill((0, 0, 0, 0))
+    return surface
+
+
+def _finish(surface):
+    # convert_alpha() доступен только после set_mode
+    if pygame.display.get_surface() is None:
+        return surface
+    if pygame.mask.from_surface(surface, 0).count() == pygame.mask.from_surface(surface, 254).count():
+        # Прозрачность только 0 или 255: colorkey с RLE рисуется в разы быстрее попиксельной альфы
+        keyed = pygame.Surface(surface.get_size()).convert()
+        keyed.fill(KEY_COLOR)
+        keyed.blit(surface, (0, 0))
+        keyed.set_colorkey(KEY_COLOR, pygame.RLEACCEL)
+        return keyed
+    return surface.convert_alpha()
+
+
+def render_bird(surface, x, y):
+    pygame.draw.circle(surface, RED, (int(x), int(y)), BIRD_RADIUS)
+    eye_radius = 5
+    pupil_radius = 2
+    eye_x = int(x + BIRD_RADIUS // 2)
+    eye_y = int(y - BIRD_RADIUS // 2)
+    pygame.draw.circle(surface, WHITE, (eye_x, eye_y), eye_radius)
+    pygame.draw.circle(surface, BLACK, (eye_x, eye_y), pupil_radius)
+
+    wing_width = 16
+    wing_height = 10
+    wing_x = int(x - BIRD_RADIUS // 2)
+    wing_y = int(y)
+    pygame.draw.ellipse(surface, (200, 0, 0), (wing_x, wing_y, wing_width, wing_height))
+
+    beak_length = 8
+    beak_height = 6
+    beak_x = int(x + BIRD_RADIUS)
+    beak_y = int(y)
+    points = [
+        (beak_x, beak_y),
+        (beak_x - beak_length, beak_y - beak_height // 2),
+        (beak_x - beak_length, beak_y + beak_height // 2)
+    ]
+    pygame.draw.polygon(surface, BLACK, points)
+
+
+def render_heart(surface, x, y, size=20):
+    radius = size // 4
+    pygame.draw.circle(surface, RED, (x - radius, y), radius)
+    pygame.draw.circle(surface, RED, (x + radius, y), radius)
+    points = [(x - size // 2, y), (x + size // 2, y), (x, y + size // 1.3)]
+    pygame.draw.polygon(surface, RED, points)
+
+
+def render_coin(surface, x, y, radius):
+    pygame.draw.circle(surface, YELLOW, (int(x), int(y)), radius)
+    pygame.draw.circle(surface, WHITE, (int(x - radius//3), int(y - radius//3)), radius//3)
+
+
+def render_cloud(surface, x, y, s):
+    pygame.draw.ellipse(surface, LIGHT_GRAY, (x, y + s//3, s * 2, s))
+    pygame.draw.ellipse(surface, LIGHT_GRAY, (x + s//3, y, s, s))
+    pygame.draw.ellipse(surface, LIGHT_GRAY, (x + s, y - s//3, s, s))
+    pygame.draw.ellipse(surface, LIGHT_GRAY, (x + s + s//2, y + s//4, s, s))
+
+
+class AssetCache:
+    def __init__(self, text_capacity=TEXT_CACHE_SIZE):
+        self.sprites = {}
+        self.texts = OrderedDict()
+        self.text_capacity = text_capacity
+        self.theme = None
+        self.text_hits = 0
+        self.text_misses = 0
+
+    def set_theme(self, theme):
+        # Смена палитры день/ночь сбрасывает отрисованный текст
+        if theme != self.theme:
+            self.theme = theme
+            self.texts.clear()
+
+    def clear(self):
+        self.sprites.clear()
+        self.texts.clear()
+
+    def text(self, font, string, color):
+        key = (font, string, color)
+        label = self.texts.get(key)
+        if label is not None:
+            self.texts.move_to_end(key)
+            self.text_hits += 1
+            return label
+        self.text_misses += 1
+        label = font.render(string, True, color)
+        self.texts[key] = label
+        if len(self.texts) > self.text_capacity:
+            self.texts.popitem(last=False)
+        return label
+
+    def _sprite(self, key, build):
+        sprite = self.sprites.get(key)
+        if sprite is None:
+            sprite = self.sprites[key] = build()
+        return sprite
+
+    # Спрайт хранится вместе со смещением точки привязки внутри поверхности
+    def bird(self):
+        def build():
+            pad = BIRD_RADIUS + 2
+            surface = _canvas(pad * 2, pad * 2)
+            render_bird(surface, pad, pad)
+            return _finish(surface), (pad, pad)
+        return self._sprite(("bird",), build)
+
+    def heart(self, size):
+        def build():
+            radius = size // 4
+            ox, oy = size // 2 + 1, radius + 1
+            surface = _canvas(size + 3, oy + int(size // 1.3) + 2)
+            render_heart(surface, ox, oy, size)
+            return _finish(surface), (ox, oy)
+        return self._sprite(("heart", size), build)
+
+    def coin(self, radius):
+        def build():
+            pad = radius + 1
+            surface = _canvas(pad * 2 + 1, pad * 2 + 1)
+            render_coin(surface, pad, pad, radius)
+            return _finish(surface), (pad, pad)
+        return self._sprite(("coin", radius), build)
+
+    def cloud(self, size):
+        def build():
+            oy = size // 3
+            surface = _canvas(size * 2 + size // 2 + 1, size + 2 * oy + 1)
+            render_cloud(surface, 0, oy, size)
+            return _finish(surface), (0, oy)
+        return self._sprite(("cloud", size), build)
+
+    def button(self, font, text, w, h, color, text_color):
+        def build():
+            surface = _canvas(w, h)
+            pygame.draw.rect(surface, color, (0, 0, w, h), border_radius=10)
+            label = font.render(text, True, text_color)
+            surface.blit(label, label.get_rect(center=(w // 2, h // 2)))
+            return _finish(surface), (0, 0)
+        return self._sprite(("button", font, text, w, h, color, text_color), build)
+
+    def blit(self, surface, sprite, x, y):
+        image, (ox, oy) = sprite
+        return surface.blit(image, (int(x) - ox, int(y) - oy))
@@ -0,0 +1,290 @@
+import math
+import os
+import sys
+import time
+
+from config import WIDTH, HEIGHT, MS_PER_FRAME, BIRD_RADIUS, PIPE_WIDTH, DIFFICULTIES
+from collision import box_hit, swept_pipe_hit
+from profiler import percentile
+
+# Автопилот: поиск вперёд на HORIZON шагов с перебором «прыгнуть / не прыгнуть».
+# Трубы от действий птицы не зависят, поэтому их положения на весь горизонт считаются один раз
+# за решение, а состояние узла поиска — только (шаг, y, скорость): клон — это кортеж
+HORIZON = 90
+DEEPEN = 15
+# Бюджет на кадр; при догоне из нескольких шагов он делится между ними
+BUDGET = 0.002
+# Время проверяется раз в CHECK_EVERY узлов, поэтому перерасход — доли узла на проверку
+CHECK_EVERY = 16
+# Состояния с y и скоростью, равными с точностью до четверти пикселя, считаются одинаковыми
+QUANTUM = 4
+WINDOW = 600
+
+
+class Planner:
+    # Итеративное углубление: проходы до 15, 30, ... шагов. Каждый законченный проход даёт план;
+    # когда время кончается, берётся план последнего законченного прохода, а если не закончился
+    # ни один — самая длинная линия, найденная к этому моменту. Узлы запоминаются по абсолютному кадру и живут
+    # между решениями: трубы от птицы не зависят, а новые трубы только добавляют препятствия,
+    # поэтому доказанный тупик остаётся тупиком и на следующих кадрах и при большем пределе.
+    # У узлов, дошедших до предела, запомненный ход пробуется первым
+    def __init__(self, game, budget=BUDGET, horizon=HORIZON):
+        self.game = game
+        self.budget = budget
+        self.horizon = horizon
+        self.plan = []
+        self.memo = {}
+        self.frame = -2
+        self.nodes = 0
+        self.decisions = 0
+        self.overruns = 0
+        self.fallbacks = 0
+        self.search_time = 0.0
+        self.depth_total = 0
+        self.decision_times = [0.0] * WINDOW
+
+    def _timeline(self):
+        # Для каждого шага k: трубы в полосе птицы (x, верх, низ, сдвиг верха за шаг) и высота,
+        # к которой тянуться. x и верх — те же формулы, что в Pipe.update на кадре frame_count + k
+        game = self.game
+        speed = game.pipe_speed
+        gap = game.pipe_gap
+        frame = game.frame_count
+        specs = [(p.x, p.top_height, p.move_amplitude, p.move_speed, p.move_offset) for p in game.pipes]
+        if game.course is not None:
+            # По трассе известны и трубы, которые ещё не появились
+            for i in range(game.course_next[0], game.course.pipe_index(game.course_distance + WIDTH) + 3):
+                x, top, _, amplitude, move_speed, offset = game.course.pipe(i)
+                specs.append((x - game.course_distance, top, amplitude, move_speed, offset))
+        bx = game.bird_x
+        low = bx - BIRD_RADIUS - speed - PIPE_WIDTH
+        high = bx + BIRD_RADIUS
+        lowest, highest = 40, HEIGHT - gap - 40
+        self.obstacles = []
+        self.targets = []
+        for k in range(self.horizon):
+            near = []
+            target = None
+            for x, top, amplitude, move_speed, offset in specs:
+                x = x - (k + 1) * speed
+                ahead = target is None and x + PIPE_WIDTH > bx - BIRD_RADIUS
+                if not ahead and not low < x < high:
+                    continue
+                lift = 0
+                if amplitude:
+                    base = top
+                    top = base + math.sin((frame + k) * MS_PER_FRAME * move_speed + offset) * amplitude
+                    prev = base + math.sin((frame + k - 1) * MS_PER_FRAME * move_speed + offset) * amplitude
+                    lift = min(max(top, lowest), highest) - min(max(prev, lowest), highest)
+                top = min(max(top, lowest), highest)
+                if low < x < high:
+                    near.append((x, top, top + gap, lift))
+                if ahead:
+                    target = top + gap - 35
+            if target is None:
+                target = HEIGHT // 2
+            self.obstacles.append(near)
+            self.targets.append(target)
+        # Ближайшие «ворота» от каждого шага: первый шаг, где птица в полосе трубы, и её зазор
+        self.gates = [None] * (self.horizon + 1)
+        for k in range(self.horizon - 1, -1, -1):
+            near = self.obstacles[k]
+            if near:
+                self.gates[k] = (k, max(o[1] for o in near), min(o[2] for o in near))
+            else:
+                self.gates[k] = self.gates[k + 1]
+
+    def _dead(self, k, prev_y, y):
+        if y - BIRD_RADIUS < 0 or y + BIRD_RADIUS > HEIGHT:
+            return True
+        bx = self.game.bird_x
+        shift = self.game.pipe_speed
+        for x, top, bottom, lift in self.obstacles[k]:
+            if box_hit(bx, y, BIRD_RADIUS, x, PIPE_WIDTH, top, bottom):
+                return True
+            # Путь считается в системе отсчёта трубы; если он весь внутри зазора — до
+            # прямоугольников труб не меньше радиуса
+            start = prev_y + lift
+            if min(start, y) - BIRD_RADIUS >= top and max(start, y) + BIRD_RADIUS <= bottom:
+                continue
+            if swept_pipe_hit(bx, start, y, BIRD_RADIUS, x, PIPE_WIDTH, top, bottom, shift):
+                return True
+        return False
+
+    def _search(self, f, y, v):
+        # До какого кадра можно продержаться из состояния (кадр f, y, v), не дальше self.limit.
+        # self.path — ходы от корня; самая длинная найденная линия — ответ, если время выйдет
+        if f > self.deepest:
+            self.deepest = f
+            self.deepest_path = self.path[:]
+        if f == self.limit:
+            return f
+        level = self.memo.get(f)
+        if level is None:
+            level = self.memo[f] = {}
+        key = (round(y), round(v * QUANTUM))
+        known = level.get(key)
+        if known is not None:
+            reached, jump, limit = known
+            if reached < limit or limit == self.limit:
+                return reached
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+            self.expired = True
+        if self.expired:
+            return f
+        k = f - self.frame
+        gate = self.gates[k]
+        if gate is not None and f + gate[0] - k < self.limit:
+            # Через m шагов y не выше, чем при прыжке каждый шаг, и не ниже, чем без прыжков;
+            # если зазор ворот вне этого диапазона, ветка мертва без перебора
+            m = gate[0] - k + 1
+            highest = y + m * (self.jump_strength + self.gravity)
+            lowest = y + m * v + self.gravity * m * (m + 1) / 2
+            if lowest < gate[1] + BIRD_RADIUS or highest > gate[2] - BIRD_RADIUS:
+                level[key] = (f + m - 1, False, self.limit)
+                return f + m - 1
+        # Первым пробуется ход простого бота: держаться чуть выше низа зазора
+        first = y + v * 2 > self.targets[k] and v > -2
+        best, best_jump = f, first
+        for jump in (first, not first):
+            nv = (self.jump_strength if jump else v) + self.gravity
+            ny = y + nv
+            if self._dead(k, y, ny):
+                continue
+            self.path.append(jump)
+            reached = self._search(f + 1, ny, nv)
+            self.path.pop()
+            if reached > best:
+                best, best_jump = reached, jump
+                if best == self.limit:
+                    break
+        if not self.expired:
+            level[key] = (best, best_jump, self.limit)
+        return best
+
+    def _line(self, y, v):
+        line = []
+        for f in range(self.frame, self.limit):
+            known = self.memo.get(f, {}).get((round(y), round(v * QUANTUM)))
+            if known is None:
+                break
+            jump = known[1]
+            line.append(jump)
+            v = (self.jump_strength if jump else v) + self.gravity
+            y += v
+        return line
+
+    def decide(self, budget=None):
+        start = time.perf_counter()
+        self.deadline = start + (self.budget if budget is None else budget)
+        game = self.game
+        if game.frame_count != self.frame + 1:
+            # Новый забег или перемотка — запомненное к этим трубам не относится
+            self.memo = {}
+            self.plan = []
+        self.frame = frame = game.frame_count
+        for f in [f for f in self.memo if f < frame]:
+            del self.memo[f]
+        self.gravity = game.GRAVITY
+        self.jump_strength = game.JUMP_STRENGTH
+        self._timeline()
+        self.expired = False
+        self.path = []
+        self.deepest = frame
+        self.deepest_path = []
+        plan = None
+        depth = 0
+        # Прошлый план сдвигается на шаг и продлевается на один: если он доходил до горизонта,
+        # первый же проход идёт на всю глубину
+        limit = min(max(len(self.plan), DEEPEN), self.horizon)
+        while True:
+            self.limit = frame + limit
+            reached = self._search(frame, game.bird_y, game.bird_velocity) - frame
+            if self.expired:
+                break
+            plan = self._line(game.bird_y, game.bird_velocity)
+            depth = reached
+            if reached < limit or limit == self.horizon:
+                # Дальше не продержаться ни при каком горизонте — ответ окончательный
+                break
+            limit = min(limit + DEEPEN, self.horizon)
+        if plan is None:
+            # Ни один проход не закончился — лучшее из найденного: самая длинная линия этого
+            # поиска или следующий шаг прошлого плана
+            self.fallbacks += 1
+            plan = max(self.deepest_path, self.plan[1:], key=len)
+        self.plan = plan
+        jump = plan[0] if plan else False
+
+        elapsed = time.perf_counter() - start
+        self.decision_times[self.decisions % WINDOW] = elapsed
+        self.decisions += 1
+        self.search_time += elapsed
+        self.depth_total += depth
+        if elapsed > (self.budget if budget is None else budget):
+            self.overruns += 1
+        return jump
+
+    def stats(self):
+        times = sorted(self.decision_times[:min(self.decisions, WINDOW)])
+        return {"decisions": self.decisions,
+                "nodes_per_second": self.nodes / self.search_time if self.search_time else 0.0,
+                "nodes_per_decision": self.nodes / self.decisions if self.decisions else 0.0,
+                "depth": self.depth_total / self.decisions if self.decisions else 0.0,
+                "overruns": self.overruns, "fallbacks": self.fallbacks,
+                "p50_ms": percentile(times, 0.5) * 1000, "p99_ms": percentile(times, 0.99) * 1000}
+
+
+def play(difficulty, seed, frames, budget, course=False):
+    # Забег без окна: планировщик против простого бота из pools на тех же трубах
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import praktik
+    from pools import autopilot
+
+    results = []
+    for bot in ("planner", "simple"):
+        if course:
+            praktik.start_course(difficulty, seed)
+        else:
+            praktik.start_game(difficulty, seed)
+        planner = Planner(praktik, budget)
+        lives = praktik.lives
+        hits = 0
+        for _ in range(frames):
+            jump = planner.decide() if bot == "planner" else autopilot(praktik)
+            if praktik.update_game(jump):
+                hits += 1
+                break
+            if praktik.lives < lives:
+                hits += 1
+            lives = praktik.lives
+        results.append((bot, praktik.frame_count, praktik.score, hits, planner.stats()))
+    return results
+
+
+def main(argv):
+    # python autopilot.py [--budget мс] [--frames N] [--seed N] [--course]
+    options = {"--budget": BUDGET * 1000, "--frames": 3600, "--seed": 1}
+    flags = set()
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = type(options[arg])(next(args))
+        else:
+            flags.add(arg)
+    course = "--course" in flags
+    for difficulty in DIFFICULTIES:
+        for bot, frames, score, hits, s in play(difficulty, options["--seed"], options["--frames"],
+                                                options["--budget"] / 1000, course):
+            line = f"{difficulty:6s} {bot:8s}: кадров {frames:5d}, очки {score:4d}, ударов {hits}"
+            if bot == "planner":
+                line += (f"; {s['nodes_per_second'] / 1000:.0f} тыс. узлов/с, {s['nodes_per_decision']:.0f} на решение, "
+                         f"глубина {s['depth']:.0f}, решение p50 {s['p50_ms']:.2f} мс, p99 {s['p99_ms']:.2f} мс, "
+                         f"перерасходов {s['overruns']}, без плана {s['fallbacks']}")
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,117 @@
+import numpy as np
+import pygame
+
+from config import WIDTH, HEIGHT, BLUE, YELLOW, NIGHT_SKY, MOON_COLOR
+
+GROUND_HEIGHT = 60
+GRASS_HEIGHT = 20
+
+SUN_X, SUN_Y, SUN_RADIUS = WIDTH - 70, 70, 40
+MOON_X, MOON_Y = WIDTH - 70, 70
+# Луна — круг, от которого отрезан серп кругом цвета ночного неба
+MOON_CIRCLES = ((MOON_X, MOON_Y, 40), (MOON_X + 15, MOON_Y - 10, 30))
+
+STAR_RADIUS = 2
+STAR_MIN, STAR_MAX, STAR_STEP = 150, 255, 2
+
+
+def draw_ground(surface):
+    ground_y = HEIGHT - GROUND_HEIGHT
+
+    # Почва
+    pygame.draw.rect(surface, (139, 69, 19), (0, ground_y, WIDTH, GROUND_HEIGHT))  # Коричневая почва
+
+    # Трава
+    pygame.draw.rect(surface, (34, 139, 34), (0, ground_y, WIDTH, GRASS_HEIGHT))   # Зеленая трава
+
+    # Немного деталей: травинки
+    for i in range(0, WIDTH, 15):
+        pygame.draw.line(surface, (0, 100, 0), (i, ground_y), (i, ground_y - 5), 2)
+
+
+def draw_moon(surface):
+    (x, y, r), (cx, cy, cr) = MOON_CIRCLES
+    rect = pygame.draw.circle(surface, MOON_COLOR, (x, y), r)
+    return rect.union(pygame.draw.circle(surface, NIGHT_SKY, (cx, cy), cr))
+
+
+def draw_sun(surface):
+    return pygame.draw.circle(surface, YELLOW, (SUN_X, SUN_Y), SUN_RADIUS)
+
+
+def _stamp(radius):
+    # Пиксели круга так, как его рисует pygame.draw.circle, относительно центра
+    size = radius * 2 + 3
+    surface = pygame.Surface((size, size))
+    pygame.draw.circle(surface, (255, 255, 255), (size // 2, size // 2), radius)
+    xs, ys = np.nonzero(pygame.surfarray.array_red(surface))
+    return xs - size // 2, ys - size // 2
+
+
+class Background:
+    # Статичные слои (небо, солнце или луна, земля) рисуются один раз на тему.
+    # Звёзды впечатаны в ночной слой: мерцание — один проход по массиву яркостей
+    def __init__(self, stars):
+        xs, ys, brightness, direction = zip(*stars) if stars else ((), (), (), ())
+        self.brightness = np.array(brightness, dtype=np.int16)
+        self.direction = np.array(direction, dtype=np.int16)
+        # Обе темы готовим сразу, чтобы переключение по N было просто сменой поверхности
+        self.layers = {False: self._render(False), True: self._render(True)}
+        self._build_star_pixels(xs, ys)
+        # Цвет звезды (b, b, 0.8 b) сразу в формате пикселя ночного слоя для каждой яркости
+        level = np.arange(256, dtype=np.uint32)
+        rshift, gshift, bshift, _ = self.layers[True].get_shifts()
+        self.palette = (level << rshift) | (level << gshift) | ((level * 4 // 5) << bshift)
+        self.stars_dirty = True
+
+    def _render(self, night):
+        surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+        if night:
+            surface.fill(NIGHT_SKY)
+            draw_moon(surface)
+        else:
+            surface.fill(BLUE)
+            draw_sun(surface)
+            draw_ground(surface)
+        return surface
+
+    def _build_star_pixels(self, xs, ys):
+        # Для каждого пикселя — номер звезды, нарисованной последней; под луной звёзд не видно
+        owner = np.full((WIDTH, HEIGHT), -1, dtype=np.int32)
+        dx, dy = _stamp(STAR_RADIUS)
+        self.star_rects = []
+        for i, (x, y) in enumerate(zip(xs, ys)):
+            px, py = dx + x, dy + y
+            inside = (px >= 0) & (px < WIDTH) & (py >= 0) & (py < HEIGHT)
+            owner[px[inside], py[inside]] = i
+            rect = pygame.Rect(x - STAR_RADIUS, y - STAR_RADIUS, STAR_RADIUS * 2 + 1, STAR_RADIUS * 2 + 1)
+            self.star_rects.append(rect.clip(0, 0, WIDTH, HEIGHT))
+
+        mask = pygame.Surface((WIDTH, HEIGHT))
+        for x, y, r in MOON_CIRCLES:
+            pygame.draw.circle(mask, (255, 255, 255), (x, y), r)
+        owner[pygame.surfarray.array_red(mask) > 0] = -1
+
+        self.star_x, self.star_y = np.nonzero(owner >= 0)
+        self.star_owner = owner[self.star_x, self.star_y]
+
+    def twinkle(self):
+        b = self.brightness
+        d = self.direction
+        b += d * STAR_STEP
+        top = b >= STAR_MAX
+        bottom = b <= STAR_MIN
+        b[top] = STAR_MAX
+        d[top] = -1
+        b[bottom] = STAR_MIN
+        d[bottom] = 1
+        self.stars_dirty = True
+
+    def surface(self, night):
+        layer = self.layers[night]
+        if night and self.stars_dirty:
+            pixels = pygame.surfarray.pixels2d(layer)
+            pixels[self.star_x, self.star_y] = self.palette[self.brightness][self.star_owner]
+            del pixels
+            self.stars_dirty = False
+        return layer
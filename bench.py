@@ -0,0 +1,254 @@
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import numpy as np
+import pygame
+import praktik as P
+from background import draw_ground
+from entities import PipeStore, PickupStore, pipe_columns
+
+REPEATS = 15
+TARGET_SECONDS = 0.02
+COUNTS = (10, 100, 1000)
+# Порог регрессии при сравнении с базовой линией (в долях), помимо доверительных интервалов
+THRESHOLD = 0.10
+
+# Двусторонний t-критерий 95% для n-1 степеней свободы
+T95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31, 9: 2.26,
+       10: 2.23, 12: 2.18, 14: 2.14, 16: 2.12, 20: 2.09, 25: 2.06, 30: 2.04}
+
+
+def t95(df):
+    for key in sorted(T95, reverse=True):
+        if df >= key:
+            return T95[key] if df <= 30 else 1.96
+    return T95[1]
+
+
+def measure(op, setup=None, repeats=REPEATS):
+    # Число операций на повтор подбирается так, чтобы повтор длился около TARGET_SECONDS
+    if setup:
+        setup()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        elapsed = time.perf_counter() - start
+        if elapsed >= TARGET_SECONDS / 4 or number >= 1 << 20:
+            break
+        number *= 4
+    number = max(1, int(number * TARGET_SECONDS / max(elapsed, 1e-9)))
+
+    samples = []
+    for _ in range(repeats):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        samples.append((time.perf_counter() - start) / number * 1e9)
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    ci = t95(len(samples) - 1) * stdev / math.sqrt(len(samples))
+    return {"ns_per_op": mean, "ci95": ci, "median": statistics.median(samples),
+            "ops_per_sec": 1e9 / mean, "number": number, "repeats": repeats}
+
+
+def reset_world(night=False, pipes=0, coins=0, hearts=0):
+    P.scenery_rng.seed(0)
+    P.is_night = night
+    P.start_game("normal", 0)
+    rng = P.rng
+    # Объекты равномерно по экрану и отсортированы по x, как в игре
+    for i in range(pipes):
+        P.pipes.append(P.pipe_pool.acquire(int(i * P.WIDTH / max(pipes, 1))))
+    for i in range(coins):
+        coin = P.coin_pool.acquire(P.pipes)
+        coin.x = coin.prev_x = i * P.WIDTH / max(coins, 1)
+        P.coins.append(coin)
+    for i in range(hearts):
+        heart = P.heart_pool.acquire(P.pipes)
+        heart.x = heart.prev_x = i * P.WIDTH / max(hearts, 1)
+        P.hearts.append(heart)
+    P.bird_y = P.prev_bird_y = rng.randint(100, P.HEIGHT - 100)
+
+
+def scene(night):
+    def setup():
+        reset_world(night, pipes=2, coins=2, hearts=1)
+        P.app.renderer.invalidate()
+
+    def op():
+        P.update_scenery()
+        P.app.renderer.set_background(P.get_background(P.is_night))
+        P.app.renderer.begin()
+        P.draw_scenery()
+        P.draw_game()
+        P.app.renderer.present()
+    return setup, op
+
+
+def sim_frame():
+    jumps = [0]
+
+    def setup():
+        reset_world()
+
+    def op():
+        # Прыжок раз в 18 кадров держит птицу в воздухе; смерть — перезапуск с тем же зерном
+        jumps[0] += 1
+        if P.update_game(jumps[0] % 18 == 0):
+            reset_world()
+    return setup, op
+
+
+def entities(kind, count):
+    def setup():
+        reset_world(**{kind: count})
+
+    items = {"pipes": lambda: P.pipes, "coins": lambda: P.coins, "hearts": lambda: P.hearts}[kind]
+
+    def update():
+        for obj in items():
+            obj.update()
+
+    def draw():
+        for obj in items():
+            obj.draw(P.app.screen)
+    return setup, update, draw
+
+
+def collisions(count):
+    def setup():
+        reset_world(pipes=count, coins=count, hearts=count)
+
+    def pipes_op():
+        P.check_collision(P.bird_y, P.pipes, P.bird_y - 5)
+
+    def pickups_op():
+        P.collision.circle_collisions(P.coins, P.bird_x, P.bird_y, P.BIRD_RADIUS, P.COIN_RADIUS)
+    return setup, pipes_op, pickups_op
+
+
+def store(count):
+    # Те же трубы и монеты, но в столбцах PipeStore/PickupStore из entities.py
+    pipes = PipeStore()
+    coins = PickupStore(P.COIN_RADIUS)
+    columns = []
+
+    def setup():
+        gen = np.random.default_rng(0)
+        pipes.clear()
+        coins.clear()
+        pipes.spawn(np.arange(count) * P.WIDTH / count, gen, P.pipe_gap)
+        coins.spawn(np.arange(count) * P.WIDTH / count, gen.uniform(50, P.HEIGHT - 50, count))
+        if not columns:
+            columns.extend(pipe_columns())
+
+    def update():
+        pipes.update(P.pipe_speed, P.frame_count, P.pipe_gap)
+        coins.update(P.pipe_speed)
+
+    def draw():
+        pipes.draw(P.app.screen, columns, P.pipe_gap)
+        coins.draw(P.app.screen, P.app.assets.coin(P.COIN_RADIUS))
+
+    def collide():
+        pipes.hits(P.bird_x, P.HEIGHT // 2, P.BIRD_RADIUS, P.pipe_gap).any()
+        coins.collect(P.bird_x, P.HEIGHT // 2, P.BIRD_RADIUS)
+    return setup, update, draw, collide
+
+
+def cases():
+    yield "scene_day", *scene(False)
+    yield "scene_night", *scene(True)
+    yield "sim_frame", *sim_frame()
+    yield "draw_bird", None, lambda: P.draw_bird(P.bird_x, P.HEIGHT // 2)
+    yield "draw_ground", None, lambda: draw_ground(P.app.screen)
+    yield "hud_text_cached", None, lambda: P.app.assets.text(P.app.font, "Score: 42", P.BLACK)
+    yield "hud_text_render", None, lambda: P.app.font.render("Score: 42", True, P.BLACK)
+    for count in COUNTS:
+        for kind in ("pipes", "coins", "hearts"):
+            setup, update, draw = entities(kind, count)
+            yield f"{kind}_update_{count}", setup, update
+            yield f"{kind}_draw_{count}", setup, draw
+        setup, pipes_op, pickups_op = collisions(count)
+        yield f"collide_pipes_{count}", setup, pipes_op
+        yield f"collide_coins_{count}", setup, pickups_op
+        setup, update, draw, collide = store(count)
+        yield f"store_update_{count}", setup, update
+        yield f"store_draw_{count}", setup, draw
+        yield f"store_collide_{count}", setup, collide
+
+
+def run(selected=None, repeats=REPEATS):
+    results = {}
+    for name, setup, op in cases():
+        if selected and not any(s in name for s in selected):
+            continue
+        results[name] = measure(op, setup, repeats)
+        r = results[name]
+        print(f"{name:24s} {r['ns_per_op']:12.0f} ns/op ± {r['ci95']:8.0f}  {r['ops_per_sec']:12.1f} /s")
+    return {"meta": {"python": platform.python_version(), "pygame": pygame.version.ver,
+                     "platform": platform.platform(), "machine": platform.machine(),
+                     "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "results": results}
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    # Регрессия: замедление больше порога и больше суммы доверительных интервалов
+    regressions = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            continue
+        delta = new["ns_per_op"] - old["ns_per_op"]
+        ratio = delta / old["ns_per_op"]
+        noise = new["ci95"] + old["ci95"]
+        flag = ratio > threshold and delta > noise
+        print(f"{name:24s} {old['ns_per_op']:12.0f} -> {new['ns_per_op']:12.0f} ns/op {ratio:+7.1%}"
+              + ("  REGRESSION" if flag else ""))
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv):
+    # python bench.py [--save out.json] [--compare baseline.json] [--repeats N] [фильтр...]
+    save = base = None
+    repeats = REPEATS
+    selected = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--save":
+            save = next(args)
+        elif arg == "--compare":
+            base = next(args)
+        elif arg == "--repeats":
+            repeats = int(next(args))
+        else:
+            selected.append(arg)
+
+    current = run(selected, repeats)
+    if save:
+        with open(save, "w") as f:
+            json.dump(current, f, indent=2)
+    if base:
+        with open(base) as f:
+            regressions = compare(current, json.load(f))
+        print(f"{len(regressions)} regressions")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
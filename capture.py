@@ -0,0 +1,240 @@
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# Файл: заголовок, затем кадры. Кадр — либо ключевой (сырые пиксели), либо XOR с предыдущим
+# записанным кадром; оба сжаты zlib. Между кадрами игры меняется мало, XOR почти весь из нулей
+MAGIC = b"FLPV"
+HEADER = struct.Struct("<4sHHHBBIIII")   # магия, ширина, высота, шаг строки, байт на пиксель, fps, маски RGBA
+RECORD = struct.Struct("<IdBI")          # номер кадра, время, вид, длина данных
+KEY, DELTA = 0, 1
+KEY_INTERVAL = 120
+QUEUE_SIZE = 8
+LEVEL = 1
+
+
+class Capture:
+    # Захват кадров экрана без остановки игры: пиксели копируются из буфера поверхности
+    # в один из QUEUE_SIZE заранее выделенных буферов, сжатие и запись — в фоновом потоке.
+    # Если все буферы заняты, кадр пропускается, а игра не ждёт
+    def __init__(self, path, surface, fps=60, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.size = surface.get_size()
+        self.pitch = surface.get_pitch()
+        self.bytesize = surface.get_bytesize()
+        self.frame_bytes = self.pitch * self.size[1]
+        self.free = queue.Queue()
+        for _ in range(queue_size):
+            self.free.put(np.empty(self.frame_bytes, dtype=np.uint8))
+        self.filled = queue.Queue()
+
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, self.size[0], self.size[1], self.pitch, self.bytesize, fps,
+                                    *surface.get_masks()))
+        self.index = 0
+        self.captured = 0
+        self.dropped = 0
+        self.bytes_written = HEADER.size
+        self.copy_time = 0.0
+        self.encode_time = 0.0
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+
+    def capture(self, surface):
+        index = self.index
+        self.index += 1
+        try:
+            buf = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return False
+        start = time.perf_counter()
+        # get_buffer — представление пикселей без копирования; единственная копия — в buf
+        view = surface.get_buffer()
+        np.copyto(buf, np.frombuffer(view, dtype=np.uint8))
+        del view
+        self.copy_time += time.perf_counter() - start
+        self.filled.put((index, start - self.started, buf))
+        self.captured += 1
+        return True
+
+    def _write(self):
+        previous = np.zeros(self.frame_bytes, dtype=np.uint8)
+        scratch = np.empty(self.frame_bytes, dtype=np.uint8)
+        written = 0
+        while True:
+            item = self.filled.get()
+            if item is None:
+                break
+            index, when, buf = item
+            start = time.perf_counter()
+            # zlib и numpy отпускают GIL, поэтому сжатие не отнимает время у игрового потока
+            if written % KEY_INTERVAL == 0:
+                kind = KEY
+                data = zlib.compress(buf, LEVEL)
+            else:
+                kind = DELTA
+                np.bitwise_xor(buf, previous, out=scratch)
+                data = zlib.compress(scratch, LEVEL)
+            previous, buf = buf, previous
+            self.free.put(buf)
+            self.file.write(RECORD.pack(index, when, kind, len(data)))
+            self.file.write(data)
+            self.bytes_written += RECORD.size + len(data)
+            self.encode_time += time.perf_counter() - start
+            written += 1
+
+    def close(self):
+        if self.thread.is_alive():
+            self.filled.put(None)
+            self.thread.join()
+            self.file.close()
+        return self.stats()
+
+    def stats(self):
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {"frames": self.index, "captured": self.captured, "dropped": self.dropped,
+                "bytes": self.bytes_written, "bytes_per_sec": self.bytes_written / elapsed,
+                "bytes_per_frame": self.bytes_written / max(self.captured, 1),
+                "copy_ms": self.copy_time / max(self.captured, 1) * 1000,
+                "encode_ms": self.encode_time / max(self.captured, 1) * 1000}
+
+
+def read_capture(path):
+    # Генератор (номер кадра, время, пиксели в формате (высота, ширина, байт на пиксель)) и заголовок
+    f = open(path, "rb")
+    header = HEADER.unpack(f.read(HEADER.size))
+    if header[0] != MAGIC:
+        f.close()
+        raise ValueError(f"{path}: not a capture file")
+    _, width, height, pitch, bytesize, fps, *masks = header
+
+    def frames():
+        with f:
+            frame = np.zeros(pitch * height, dtype=np.uint8)
+            while True:
+                record = f.read(RECORD.size)
+                if len(record) < RECORD.size:
+                    return
+                index, when, kind, length = RECORD.unpack(record)
+                data = np.frombuffer(zlib.decompress(f.read(length)), dtype=np.uint8)
+                if kind == KEY:
+                    frame[:] = data
+                else:
+                    frame ^= data
+                yield index, when, frame.reshape(height, pitch)[:, :width * bytesize].reshape(height, width, bytesize)
+    return {"size": (width, height), "fps": fps, "bytesize": bytesize, "masks": masks}, frames()
+
+
+def decode(path, out_dir):
+    # Каждый записанный кадр — в PNG с номером кадра игры; пропуски в номерах — выброшенные кадры
+    import pygame
+
+    info, frames = read_capture(path)
+    os.makedirs(out_dir, exist_ok=True)
+    surface = pygame.Surface(info["size"], 0, info["bytesize"] * 8, info["masks"])
+    count = 0
+    for index, when, pixels in frames:
+        _fill(surface, pixels)
+        pygame.image.save(surface, os.path.join(out_dir, f"frame_{index:06d}.png"))
+        count += 1
+    return count
+
+
+def _fill(surface, pixels):
+    # Шаг строки новой поверхности может отличаться от записанного — тогда копируем построчно
+    view = surface.get_buffer()
+    pitch = surface.get_pitch()
+    if pitch == pixels.shape[1] * pixels.shape[2]:
+        view.write(pixels.tobytes())
+        return
+    for y, row in enumerate(pixels):
+        view.write(row.tobytes(), y * pitch)
+
+
+def summarize(path):
+    info, frames = read_capture(path)
+    size = os.path.getsize(path)
+    indices = []
+    times = []
+    for index, when, _ in frames:
+        indices.append(index)
+        times.append(when)
+    if not indices:
+        return {"frames": 0, "bytes": size}
+    duration = max(times[-1] - times[0], 1e-9)
+    total = indices[-1] - indices[0] + 1
+    return {"frames": len(indices), "dropped": total - len(indices), "bytes": size,
+            "bytes_per_frame": size / len(indices), "bytes_per_sec": size / duration,
+            "fps": (len(indices) - 1) / duration}
+
+
+def record_replay(rec_path, out_path, fps=60):
+    # Бот — запись забега из replay.py, проигранная в реальном времени с захватом каждого кадра
+    import pygame
+    import praktik
+    from replay import load_recording
+
+    rec = load_recording(rec_path)
+    app = praktik.app
+    capture = Capture(out_path, app.screen, fps)
+    praktik.start_game(rec.difficulty, rec.seed)
+    late = 0
+    deadline = time.perf_counter()
+    for jump in rec.jumps:
+        pygame.event.pump()
+        dead = praktik.update_game(jump)
+        app.renderer.set_background(praktik.get_background(praktik.is_night))
+        app.renderer.begin()
+        praktik.draw_game()
+        app.renderer.present()
+        capture.capture(app.screen)
+        deadline += 1 / fps
+        wait = deadline - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        else:
+            late += 1
+        if dead:
+            break
+    stats = capture.close()
+    stats["late_frames"] = late
+    return stats
+
+
+def main(argv):
+    # python capture.py record забег.flrec out.flpv — проиграть запись с захватом экрана
+    # python capture.py decode in.flpv каталог     — кадры в PNG
+    # python capture.py stats in.flpv               — размер, частота и пропуски
+    if len(argv) == 3 and argv[0] == "record":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        s = record_replay(argv[1], argv[2])
+        print(f"{s['captured']} кадров записано, {s['dropped']} пропущено, {s['late_frames']} опоздали; "
+              f"копия {s['copy_ms']:.3f} мс, сжатие {s['encode_ms']:.2f} мс на кадр, "
+              f"{s['bytes_per_frame'] / 1024:.1f} КБ/кадр, {s['bytes_per_sec'] / 1024:.0f} КБ/с")
+        return 0
+    if len(argv) == 3 and argv[0] == "decode":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        print(f"{decode(argv[1], argv[2])} кадров сохранено в {argv[2]}")
+        return 0
+    if len(argv) == 2 and argv[0] == "stats":
+        s = summarize(argv[1])
+        if not s["frames"]:
+            print("кадров нет")
+            return 1
+        print(f"{s['frames']} кадров, {s['dropped']} пропущено, {s['fps']:.1f} кадров/с, "
+              f"{s['bytes_per_frame'] / 1024:.1f} КБ/кадр, {s['bytes_per_sec'] / 1024:.0f} КБ/с")
+        return 0
+    print("usage: capture.py record|decode|stats ...")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
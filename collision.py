@@ -0,0 +1,148 @@
+import bisect
+from operator import attrgetter
+
+_x = attrgetter("x")
+
+# Границы "бесконечных" прямоугольников верхней и нижней трубы
+FAR = 10000
+
+
+def candidates(objs, x0, x1, left=0, right=0):
+    # objs отсортированы по x (новые появляются справа и все едут с одной скоростью),
+    # поэтому объекты, чей отрезок [x + left, x + right] задевает [x0, x1], идут подряд
+    start = bisect.bisect_right(objs, x0 - right, key=_x)
+    end = bisect.bisect_left(objs, x1 - left, lo=start, key=_x)
+    return objs[start:end]
+
+
+def box_hit(bx, by, br, x, width, top, bottom):
+    if bx + br > x and bx - br < x + width:
+        if by - br < top or by + br > bottom:
+            return True
+    return False
+
+
+def circle_hit(bx, by, br, x, y, r):
+    return (bx - x) ** 2 + (by - y) ** 2 < (br + r) ** 2
+
+
+def _box_distance2(px, py, xmin, ymin, xmax, ymax):
+    dx = max(xmin - px, 0, px - xmax)
+    dy = max(ymin - py, 0, py - ymax)
+    return dx * dx + dy * dy
+
+
+def swept_circle_box(x0, y0, x1, y1, r, xmin, ymin, xmax, ymax):
+    # Квадрат расстояния от точки отрезка до прямоугольника выпуклый и кусочно-квадратичный:
+    # минимум лежит на концах, на пересечениях со сторонами или в проекциях углов
+    dx = x1 - x0
+    dy = y1 - y0
+    ts = [0.0, 1.0]
+    if dx:
+        ts.append((xmin - x0) / dx)
+        ts.append((xmax - x0) / dx)
+    if dy:
+        ts.append((ymin - y0) / dy)
+        ts.append((ymax - y0) / dy)
+    length2 = dx * dx + dy * dy
+    if length2:
+        for cx in (xmin, xmax):
+            for cy in (ymin, ymax):
+                ts.append(((cx - x0) * dx + (cy - y0) * dy) / length2)
+    r2 = r * r
+    for t in ts:
+        t = min(max(t, 0.0), 1.0)
+        if _box_distance2(x0 + t * dx, y0 + t * dy, xmin, ymin, xmax, ymax) < r2:
+            return True
+    return False
+
+
+def swept_pipe_hit(bx, prev_y, by, br, x, width, top, bottom, shift):
+    # В системе отсчёта трубы птица за кадр сместилась вправо на shift. Если труба за кадр
+    # сдвинулась и по вертикали, prev_y передаётся уже в её системе: prev_y + (top - prev_top)
+    x0 = bx - shift
+    return (swept_circle_box(x0, prev_y, bx, by, br, x, -FAR, x + width, top) or
+            swept_circle_box(x0, prev_y, bx, by, br, x, bottom, x + width, FAR))
+
+
+def pipe_collision(pipes, bx, by, br, gap, width, prev_y=None, shift=0):
+    for pipe in candidates(pipes, bx - br - shift, bx + br, 0, width):
+        top = pipe.current_top_height
+        bottom = top + gap
+        if box_hit(bx, by, br, pipe.x, width, top, bottom):
+            return True
+        if prev_y is not None and swept_pipe_hit(bx, prev_y + top - pipe.prev_top, by, br,
+                                                 pipe.x, width, top, bottom, shift):
+            return True
+    return False
+
+
+def circle_collisions(objs, bx, by, br, radius):
+    hits = []
+    for obj in candidates(objs, bx - br, bx + br, -radius, radius):
+        if not obj.collected and circle_hit(bx, by, br, obj.x, obj.y, radius):
+            hits.append(obj)
+    return hits
+
+
+def _regression(cases=20000, seed=1):
+    # Сверка с прежними проверками Pipe.collides_with и Coin.collides_with (через sqrt)
+    import random
+    from types import SimpleNamespace
+
+    rnd = random.Random(seed)
+    width, gap, br, radius = 70, 160, 20, 10
+    mismatches = swept_extra = 0
+    for _ in range(cases):
+        xs = sorted(rnd.uniform(-70, 400) for _ in range(rnd.randint(0, 6)))
+        pipes = [SimpleNamespace(x=x, current_top_height=rnd.uniform(40, 400)) for x in xs]
+        for p in pipes:
+            # Подвижные трубы за кадр смещаются по вертикали не больше чем на ~15 пикселей
+            p.prev_top = p.current_top_height + (rnd.uniform(-15, 15) if rnd.random() < 0.4 else 0)
+        coins = [SimpleNamespace(x=x, y=rnd.uniform(0, 600), collected=rnd.random() < 0.2)
+                 for x in sorted(rnd.uniform(-10, 420) for _ in range(rnd.randint(0, 6)))]
+        bx, by = 100, rnd.uniform(0, 600)
+        prev_y = by - rnd.uniform(-15, 15)
+
+        old = any(box_hit(bx, by, br, p.x, width, p.current_top_height, p.current_top_height + gap)
+                  for p in pipes)
+        if pipe_collision(pipes, bx, by, br, gap, width) != old:
+            mismatches += 1
+        if pipe_collision(pipes, bx, by, br, gap, width, prev_y, 4.5) and not old:
+            swept_extra += 1
+
+        old_coins = [c for c in coins
+                     if not c.collected and ((bx - c.x) ** 2 + (by - c.y) ** 2) ** 0.5 < br + radius]
+        if circle_collisions(coins, bx, by, br, radius) != old_coins:
+            mismatches += 1
+
+    # Труба опустилась за кадр на 20 вместе с птицей: относительно трубы птица всё время в зазоре.
+    # Против текущей высоты путь задел бы верхнюю трубу, в её системе отсчёта — нет
+    pipe = SimpleNamespace(x=80, current_top_height=220, prev_top=200)
+    if pipe_collision([pipe], bx, 245, br, gap, width, 230, 4.5):
+        mismatches += 1
+    # Та же труба поднялась на 20 и наехала на птицу, висящую на месте: попадание есть
+    pipe = SimpleNamespace(x=80, current_top_height=200, prev_top=220)
+    if not pipe_collision([pipe], bx, 236, br, gap, width, 235, 4.5):
+        mismatches += 1
+    return mismatches, swept_extra
+
+
+def _dense_benchmark(count=100000, frames=2000):
+    import random
+    import time
+    from types import SimpleNamespace
+
+    rnd = random.Random(0)
+    pipes = [SimpleNamespace(x=x, current_top_height=top, prev_top=top)
+             for x, top in sorted((rnd.uniform(-70, 400 * count / 3), rnd.uniform(40, 400)) for _ in range(count))]
+    start = time.perf_counter()
+    for i in range(frames):
+        pipe_collision(pipes, 100 + i, 300, 20, 160, 70, 290, 4.5)
+    return (time.perf_counter() - start) / frames * 1e6
+
+
+if __name__ == "__main__":
+    mismatches, swept_extra = _regression()
+    print(f"расхождений с прежними проверками: {mismatches}, дополнительных попаданий по траектории: {swept_extra}")
+    print(f"100000 труб: {_dense_benchmark():.1f} мкс на проверку")
@@ -0,0 +1,38 @@
+WIDTH, HEIGHT = 400, 600
+FPS = 60
+MS_PER_FRAME = 1000.0 / FPS
+
+WHITE = (255, 255, 255)
+BLUE = (135, 206, 250)
+GREEN = (0, 200, 0)
+DARK_GREEN = (0, 150, 0)
+RED = (255, 0, 0)
+BLACK = (0, 0, 0)
+YELLOW = (255, 223, 0)
+LIGHT_GRAY = (220, 220, 220)
+ORANGE = (255, 165, 0)
+
+NIGHT_SKY = (10, 10, 40)
+MOON_COLOR = (230, 230, 210)
+STAR_COLOR = (255, 255, 200)
+
+BIRD_X = 100
+BIRD_RADIUS = 20
+
+PIPE_WIDTH = 70
+PIPE_SPAWN_DISTANCE = 200
+COIN_SPAWN_DISTANCE = 150
+HEART_SPAWN_DISTANCE = 400
+HEART_SPAWN_CHANCE = 0.01
+
+COIN_RADIUS = 10
+COIN_VALUE = 10
+HEART_RADIUS = 12
+MAX_LIVES = 3
+
+# Параметры уровней сложности: скорость труб, зазор, гравитация, прыжок
+DIFFICULTIES = {
+    "easy": {"pipe_speed": 2.5, "pipe_gap": 250, "gravity": 0.4, "jump_strength": -9},
+    "normal": {"pipe_speed": 3, "pipe_gap": 200, "gravity": 0.5, "jump_strength": -10},
+    "hard": {"pipe_speed": 4.5, "pipe_gap": 160, "gravity": 0.6, "jump_strength": -11},
+}
@@ -0,0 +1,135 @@
+import sys
+import time
+
+import pygame
+
+from config import WIDTH, HEIGHT, GREEN, BLUE, RED
+
+# Как логический кадр ложится на панель: целиком с полями, целым множителем с полями, на весь экран
+FIT, INTEGER, STRETCH = "fit", "integer", "stretch"
+MODES = (FIT, INTEGER, STRETCH)
+LETTERBOX = (0, 0, 0, 255)
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def layout(logical, output, mode=FIT):
+    # Прямоугольник на выходе, куда растягивается логический кадр; остальное — поля
+    lw, lh = logical
+    ow, oh = output
+    if mode == STRETCH:
+        return pygame.Rect(0, 0, ow, oh)
+    scale = min(ow / lw, oh / lh)
+    if mode == INTEGER and scale >= 1:
+        scale = int(scale)
+    w, h = int(lw * scale), int(lh * scale)
+    return pygame.Rect((ow - w) // 2, (oh - h) // 2, w, h)
+
+
+class ScaledDisplay:
+    # Игра рисует в поверхность логического размера; на панель кадр попадает текстурой,
+    # которую растягивает рендерер SDL (на GPU, если он есть). Работа процессора за кадр —
+    # загрузка изменившихся областей логического кадра — не зависит от разрешения панели
+    def __init__(self, size=(WIDTH, HEIGHT), output=None, mode=FIT, vsync=False, title=""):
+        from pygame._sdl2.video import Window, Renderer, Texture
+
+        pygame.display.init()
+        # convert() и convert_alpha() требуют установленного режима — для них скрытое окно 1x1
+        pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        if output is None:
+            self.window = Window(title, size=pygame.display.get_desktop_sizes()[0], fullscreen_desktop=True)
+        else:
+            self.window = Window(title, size=output, resizable=True)
+        self.renderer = Renderer(self.window, vsync=vsync)
+        self.surface = pygame.Surface(size).convert()
+        self.texture = Texture(self.renderer, size, streaming=True)
+        self.size = size
+        self.mode = mode
+        self.resized()
+
+    def resized(self):
+        self.dest = layout(self.size, self.window.size, self.mode)
+
+    def update(self, rects=None):
+        # Та же сигнатура, что у pygame.display.update, — DirtyRenderer вызывает её вместо модуля
+        if rects is None:
+            self.texture.update(self.surface)
+        else:
+            for rect in rects:
+                self.texture.update(self.surface.subsurface(rect), rect)
+        self.renderer.draw_color = LETTERBOX
+        self.renderer.clear()
+        self.texture.draw(dstrect=self.dest)
+        self.renderer.present()
+
+    def to_logical(self, pos):
+        # Координаты мыши в окне -> координаты логического кадра (для draw_button и collidepoint)
+        dest = self.dest
+        return (int((pos[0] - dest.x) * self.size[0] / dest.w),
+                int((pos[1] - dest.y) * self.size[1] / dest.h))
+
+
+OUTPUTS = ((400, 600), (1280, 720), (1920, 1080), (2560, 1440), (3840, 2160))
+
+
+def _frame(surface):
+    # Типичный кадр: небо, две трубы, птица; изменившаяся часть — около десятой доли кадра
+    surface.fill(BLUE)
+    pygame.draw.rect(surface, GREEN, (150, 0, 70, 200))
+    pygame.draw.rect(surface, GREEN, (150, 400, 70, 200))
+    pygame.draw.circle(surface, RED, (100, 300), 20)
+    return [pygame.Rect(147, 0, 76, HEIGHT), pygame.Rect(78, 200, 44, 200)]
+
+
+def report(frames=120, mode=FIT):
+    # Время кадра на каждом разрешении: загрузка грязных областей и полного кадра в текстуру
+    # с выводом на панель и, для сравнения, масштабирование того же кадра на процессоре
+    rows = []
+    for output in OUTPUTS:
+        display = ScaledDisplay((WIDTH, HEIGHT), output, mode)
+        dirty = _frame(display.surface)
+        display.update()
+        # Загрузка в текстуру — вся работа процессора на GPU-рендерере; её цена от панели не зависит
+        start = time.perf_counter()
+        for _ in range(frames):
+            for rect in dirty:
+                display.texture.update(display.surface.subsurface(rect), rect)
+        timings = [(time.perf_counter() - start) / frames * 1000]
+        for rects in (dirty, None):
+            start = time.perf_counter()
+            for _ in range(frames):
+                display.update(rects)
+            timings.append((time.perf_counter() - start) / frames * 1000)
+        target = pygame.Surface(output).convert()
+        start = time.perf_counter()
+        for _ in range(frames):
+            target.fill(LETTERBOX)
+            pygame.transform.scale(display.surface, display.dest.size, target.subsurface(display.dest))
+        timings.append((time.perf_counter() - start) / frames * 1000)
+        rows.append((output, display.dest, *timings))
+        display.window.destroy()
+    return rows
+
+
+def main(argv):
+    # python display.py [--mode fit|integer|stretch] [--frames N] — время кадра по разрешениям
+    options = {"--mode": FIT, "--frames": 120}
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = type(options[arg])(next(args))
+    rows = report(options["--frames"], options["--mode"])
+    # На драйвере dummy рендерер программный: там масштабирование тоже идёт на процессоре
+    print(f"видеодрайвер {pygame.display.get_driver()}, режим {options['--mode']}")
+    for output, dest, upload_ms, dirty_ms, full_ms, software_ms in rows:
+        print(f"{output[0]:5d}x{output[1]:<5d} кадр {dest.w}x{dest.h}: загрузка {upload_ms:5.2f} мс, "
+              f"с выводом: грязные области {dirty_ms:6.2f} мс, "
+              f"весь кадр {full_ms:6.2f} мс; масштаб на процессоре {software_ms:6.2f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
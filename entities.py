@@ -0,0 +1,381 @@
+import sys
+import time
+
+import numpy as np
+
+from config import (
+    WIDTH, HEIGHT, FPS, MS_PER_FRAME, BIRD_X, BIRD_RADIUS, PIPE_WIDTH, COIN_RADIUS, HEART_RADIUS,
+    GREEN, DARK_GREEN, ORANGE, STAR_COLOR,
+)
+
+PIPE_COLORS = (GREEN, DARK_GREEN, ORANGE)
+# Сейчас на экране около 3 труб, 3 монет, сердца, 5 облаков и 20 падающих звёзд
+BASE_COUNTS = {"pipes": 3, "coins": 3, "hearts": 1, "clouds": 5, "stars": 20}
+# Во сколько раз больше объектов в стрессе по умолчанию. На одном ядре x20 держит 60 FPS;
+# x100 — около 8-10 мс работы в среднем, но p99 выходит за 16.7 мс, его можно задать через --scale 100
+STRESS_SCALE = 20
+# Первая секунда стресса — первые блиты, заполнение кэшей спрайтов и текста — в перцентили не идёт
+WARMUP_FRAMES = 60
+
+
+class Store:
+    # Объекты одного вида — столбцы NumPy; живые занимают первые count строк в порядке появления,
+    # поэтому они, как и списки в praktik, отсортированы по x
+    FIELDS = {}
+
+    def __init__(self, capacity=64):
+        self.count = 0
+        self.columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.FIELDS.items()}
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns")
+        if columns is None or name not in columns:
+            raise AttributeError(name)
+        return columns[name][:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def append(self, **values):
+        # Пакетное добавление; ёмкость растёт удвоением, как у списка
+        n = len(next(iter(values.values())))
+        end = self.count + n
+        capacity = len(next(iter(self.columns.values())))
+        if end > capacity:
+            while capacity < end:
+                capacity *= 2
+            for name, column in self.columns.items():
+                grown = np.zeros(capacity, dtype=column.dtype)
+                grown[:self.count] = column[:self.count]
+                self.columns[name] = grown
+        for name, column in self.columns.items():
+            column[self.count:end] = values.get(name, 0)
+        self.count = end
+        return n
+
+    def keep(self, mask):
+        # Фильтрация на месте с сохранением порядка — векторный аналог pools.compact
+        kept = int(mask.sum())
+        if kept != self.count:
+            for column in self.columns.values():
+                column[:kept] = column[:self.count][mask]
+            self.count = kept
+        return kept
+
+    def clear(self):
+        self.count = 0
+
+
+class PipeStore(Store):
+    FIELDS = {"x": np.float64, "prev_x": np.float64, "top_height": np.float64, "current_top": np.float64,
+              "prev_top": np.float64, "amplitude": np.float64, "move_speed": np.float64,
+              "move_offset": np.float64, "moving": bool, "passed": bool, "color": np.uint8}
+
+    def spawn(self, x, gen, gap):
+        # Те же распределения, что в Pipe.spawn, но для всех новых труб сразу
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        n = len(x)
+        moving = gen.random(n) < 0.4
+        top = gen.integers(50, HEIGHT - gap - 50, n, endpoint=True).astype(np.float64)
+        return self.append(x=x, prev_x=x, top_height=top, current_top=top, prev_top=top,
+                           moving=moving, color=gen.integers(0, len(PIPE_COLORS), n),
+                           amplitude=np.where(moving, gen.integers(10, 30, n, endpoint=True), 0),
+                           move_speed=np.where(moving, gen.uniform(0.01, 0.03, n), 0),
+                           move_offset=np.where(moving, gen.uniform(0, 2 * np.pi, n), 0))
+
+    def update(self, speed, frame, gap):
+        c = self.columns
+        n = self.count
+        c["prev_x"][:n] = c["x"][:n]
+        c["prev_top"][:n] = c["current_top"][:n]
+        c["x"][:n] -= speed
+        offset = np.sin(frame * MS_PER_FRAME * self.move_speed + self.move_offset) * self.amplitude
+        np.clip(self.top_height + offset, 40, HEIGHT - gap - 40, out=c["current_top"][:n])
+
+    def cull(self):
+        return self.keep(self.x + PIPE_WIDTH > 0)
+
+    def hits(self, bx, by, br, gap):
+        # Маска труб, которых касается птица, — то же условие, что collision.box_hit
+        x = self.x
+        top = self.current_top
+        return (bx + br > x) & (bx - br < x + PIPE_WIDTH) & ((by - br < top) | (by + br > top + gap))
+
+    def pass_bird(self, bx):
+        passed = ~self.passed & (self.x + PIPE_WIDTH < bx)
+        self.passed[passed] = True
+        return int(passed.sum())
+
+    def draw(self, surface, columns, gap, alpha=1.0):
+        # Столб каждого цвета отрисован заранее; обе части трубы — вырезки из него одним вызовом blits.
+        # Трубы идут по x, и следующая рисуется поверх: правее её левого края от трубы остаются
+        # только строки, которые следующая не закрывает
+        x = (self.prev_x + (self.x - self.prev_x) * alpha).astype(np.int32)
+        top = (self.prev_top + (self.current_top - self.prev_top) * alpha).astype(np.int32)
+        bottom = top + gap
+        step = np.append(np.diff(x), PIPE_WIDTH)
+        strip = np.where(step >= 0, np.minimum(step, PIPE_WIDTH), PIPE_WIDTH)
+        next_top = np.append(top[1:], HEIGHT)
+        next_bottom = np.append(bottom[1:], 0)
+        blits = []
+        for x, top, bottom, strip, next_top, next_bottom, color in zip(
+                x.tolist(), top.tolist(), bottom.tolist(), strip.tolist(), next_top.tolist(),
+                next_bottom.tolist(), self.color.tolist()):
+            column = columns[color]
+            blits.append((column, (x, 0), (0, 0, strip, top)))
+            blits.append((column, (x, bottom), (0, 0, strip, HEIGHT - bottom)))
+            if strip < PIPE_WIDTH:
+                if top > next_top:
+                    blits.append((column, (x + strip, next_top), (0, 0, PIPE_WIDTH - strip, top - next_top)))
+                if next_bottom > bottom:
+                    blits.append((column, (x + strip, bottom), (0, 0, PIPE_WIDTH - strip, next_bottom - bottom)))
+        surface.blits(blits, False)
+        return len(self.x) * 2
+
+
+class PickupStore(Store):
+    FIELDS = {"x": np.float64, "prev_x": np.float64, "y": np.float64, "collected": bool}
+
+    def __init__(self, radius, capacity=64):
+        super().__init__(capacity)
+        self.radius = radius
+
+    def spawn(self, x, y):
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        return self.append(x=x, prev_x=x, y=y)
+
+    def update(self, speed):
+        # Собранные предметы стоят на месте до очистки, как в update_game
+        c = self.columns
+        n = self.count
+        c["prev_x"][:n] = c["x"][:n]
+        c["x"][:n] -= np.where(c["collected"][:n], 0, speed)
+
+    def cull(self):
+        return self.keep((self.x + self.radius > 0) & ~self.collected)
+
+    def collect(self, bx, by, br):
+        hits = ~self.collected & ((self.x - bx) ** 2 + (self.y - by) ** 2 < (br + self.radius) ** 2)
+        self.collected[hits] = True
+        return int(hits.sum())
+
+    def draw(self, surface, sprite, alpha=1.0):
+        image, (ox, oy) = sprite
+        visible = ~self.collected
+        x = (self.prev_x + (self.x - self.prev_x) * alpha)[visible].astype(np.int32) - ox
+        y = self.y[visible].astype(np.int32) - oy
+        surface.blits([(image, pos) for pos in zip(x.tolist(), y.tolist())], False)
+        return len(x)
+
+
+class CloudStore(Store):
+    FIELDS = {"x": np.float64, "prev_x": np.float64, "y": np.float64, "speed": np.float64, "size": np.int32}
+
+    def spawn(self, n, gen):
+        return self.append(x=gen.integers(0, WIDTH, n, endpoint=True).astype(np.float64),
+                           y=gen.integers(20, 100, n, endpoint=True), speed=gen.uniform(0.2, 0.5, n),
+                           size=gen.integers(30, 60, n, endpoint=True))
+
+    def move(self, gen):
+        c = self.columns
+        n = self.count
+        c["prev_x"][:n] = c["x"][:n]
+        c["x"][:n] -= c["speed"][:n]
+        wrap = np.flatnonzero(self.x < -self.size * 3)
+        if len(wrap):
+            k = len(wrap)
+            for name, values in (("x", WIDTH + gen.integers(50, 150, k, endpoint=True)),
+                                 ("y", gen.integers(20, 100, k, endpoint=True)),
+                                 ("speed", gen.uniform(0.2, 0.5, k)), ("size", gen.integers(30, 60, k, endpoint=True))):
+                c[name][wrap] = values
+            c["prev_x"][wrap] = c["x"][wrap]
+
+    def draw(self, surface, sprites):
+        # Облака за краями экрана — те, что ждут выхода справа, и уходящие влево — не рисуются
+        x = self.x.astype(np.int32)
+        visible = (x < WIDTH) & (x + self.size * 5 // 2 + 1 > 0)
+        blits = []
+        for x, y, size in zip(x[visible].tolist(), self.y[visible].astype(np.int32).tolist(),
+                              self.size[visible].tolist()):
+            image, (ox, oy) = sprites(size)
+            blits.append((image, (x - ox, y - oy)))
+        surface.blits(blits, False)
+        return len(blits)
+
+
+class StarStore(Store):
+    # Падающие звёзды; штрих каждой длины — готовая поверхность 2 x length
+    FIELDS = {"x": np.float64, "y": np.float64, "prev_y": np.float64, "speed": np.float64, "length": np.int32}
+
+    def spawn(self, n, gen):
+        return self.append(x=gen.integers(0, WIDTH, n, endpoint=True), y=gen.integers(-HEIGHT, 0, n, endpoint=True),
+                           length=gen.integers(5, 15, n, endpoint=True), speed=gen.uniform(2, 5, n))
+
+    def update(self, gen):
+        c = self.columns
+        n = self.count
+        c["prev_y"][:n] = c["y"][:n]
+        c["y"][:n] += c["speed"][:n]
+        wrap = np.flatnonzero(self.y > HEIGHT)
+        if len(wrap):
+            k = len(wrap)
+            c["x"][wrap] = gen.integers(0, WIDTH, k, endpoint=True)
+            c["y"][wrap] = gen.integers(-HEIGHT, 0, k, endpoint=True)
+            c["speed"][wrap] = gen.uniform(2, 5, k)
+            c["length"][wrap] = gen.integers(5, 15, k, endpoint=True)
+            c["prev_y"][wrap] = c["y"][wrap]
+
+    def draw(self, surface, streaks, alpha=1.0):
+        y = (self.prev_y + (self.y - self.prev_y) * alpha).astype(np.int32)
+        visible = (y + self.length > 0) & (y < HEIGHT)
+        x = self.x[visible].astype(np.int32) - 1
+        surface.blits([(streaks[length], (x, y)) for x, y, length in
+                       zip(x.tolist(), y[visible].tolist(), self.length[visible].tolist())], False)
+        return int(visible.sum())
+
+
+def pipe_columns():
+    import pygame
+
+    columns = []
+    for color in PIPE_COLORS:
+        column = pygame.Surface((PIPE_WIDTH, HEIGHT)).convert()
+        column.fill(color)
+        columns.append(column)
+    return columns
+
+
+def star_streaks():
+    import pygame
+
+    streaks = {}
+    for length in range(5, 16):
+        streak = pygame.Surface((2, length + 1)).convert()
+        streak.fill(STAR_COLOR)
+        streaks[length] = streak
+    return streaks
+
+
+class StressWorld:
+    # Мир для стресс-режима: scale раз больше объектов каждого вида, чем в обычной игре.
+    # Трубы и монеты распределены по ширине экрана и появляются справа взамен ушедших
+    def __init__(self, scale=STRESS_SCALE, seed=0, gap=200, speed=3):
+        self.gen = np.random.default_rng(seed)
+        self.gap = gap
+        self.speed = speed
+        self.frame = 0
+        self.counts = {name: count * scale for name, count in BASE_COUNTS.items()}
+        self.pipes = PipeStore()
+        self.coins = PickupStore(COIN_RADIUS)
+        self.hearts = PickupStore(HEART_RADIUS)
+        self.clouds = CloudStore()
+        self.stars = StarStore()
+        self.span = WIDTH + PIPE_WIDTH
+        self.pipes.spawn(np.sort(self.gen.uniform(-PIPE_WIDTH, WIDTH, self.counts["pipes"])), self.gen, gap)
+        for store, name in ((self.coins, "coins"), (self.hearts, "hearts")):
+            n = self.counts[name]
+            store.spawn(np.sort(self.gen.uniform(0, WIDTH, n)), self.gen.uniform(50, HEIGHT - 50, n))
+        self.clouds.spawn(self.counts["clouds"], self.gen)
+        self.stars.spawn(self.counts["stars"], self.gen)
+        self.bird_y = HEIGHT / 2
+        self.hits = self.collected = self.passed = 0
+
+    def refill(self, store, name, spawn):
+        missing = self.counts[name] - len(store)
+        if missing > 0:
+            spawn(np.sort(WIDTH + self.gen.uniform(0, self.span / self.counts[name] * missing, missing)), missing)
+
+    def update(self):
+        gen = self.gen
+        self.bird_y = HEIGHT / 2 + np.sin(self.frame / 40) * HEIGHT / 4
+        self.pipes.update(self.speed, self.frame, self.gap)
+        self.pipes.cull()
+        self.refill(self.pipes, "pipes", lambda x, n: self.pipes.spawn(x, gen, self.gap))
+        for store, name in ((self.coins, "coins"), (self.hearts, "hearts")):
+            store.update(self.speed)
+            self.collected += store.collect(BIRD_X, self.bird_y, BIRD_RADIUS)
+            store.cull()
+            self.refill(store, name, lambda x, n: store.spawn(x, gen.uniform(50, HEIGHT - 50, n)))
+        self.hits += int(self.pipes.hits(BIRD_X, self.bird_y, BIRD_RADIUS, self.gap).any())
+        self.passed += self.pipes.pass_bird(BIRD_X)
+        self.clouds.move(gen)
+        self.stars.update(gen)
+        self.frame += 1
+
+    def draw(self, surface, assets, columns, streaks, alpha=1.0):
+        drawn = self.clouds.draw(surface, assets.cloud)
+        drawn += self.stars.draw(surface, streaks, alpha)
+        drawn += self.pipes.draw(surface, columns, self.gap, alpha)
+        drawn += self.hearts.draw(surface, assets.heart(24), alpha)
+        drawn += self.coins.draw(surface, assets.coin(COIN_RADIUS), alpha)
+        assets.blit(surface, assets.bird(), BIRD_X, self.bird_y)
+        return drawn
+
+
+def stress(scale=STRESS_SCALE, seconds=10.0):
+    # Кадр: обновление, столкновения и полная отрисовка; FPS держится, если p99 кадра < 1/FPS.
+    # Перцентили считаются после разогрева из WARMUP_FRAMES кадров
+    import pygame
+    from assets import AssetCache, get_font
+    from background import Background
+
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption(f"Stress x{scale}")
+    assets = AssetCache()
+    font = get_font(None, 24)
+    background = Background([]).surface(True)
+    world = StressWorld(scale)
+    columns = pipe_columns()
+    streaks = star_streaks()
+    clock = pygame.time.Clock()
+    budget = 1000 / FPS
+    samples = []
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                end = 0
+        start = time.perf_counter()
+        world.update()
+        screen.blit(background, (0, 0))
+        drawn = world.draw(screen, assets, columns, streaks)
+        work = (time.perf_counter() - start) * 1000
+        samples.append(work)
+        label = assets.text(font, f"{drawn} объектов, {work:.1f} мс", (255, 255, 255))
+        screen.blit(label, (10, 10))
+        pygame.display.update()
+        clock.tick(FPS)
+    pygame.quit()
+    warmup = samples[:WARMUP_FRAMES]
+    samples = sorted(samples[WARMUP_FRAMES:] or warmup)
+    result = {"objects": sum(world.counts.values()), "frames": len(samples),
+              "hits": world.hits, "collected": world.collected, "passed": world.passed}
+    if not samples:
+        # --seconds 0 или окно закрыто сразу: ни одного кадра не измерено
+        return dict(result, warmup_max_ms=0.0, mean_ms=0.0, p99_ms=0.0, max_ms=0.0, holds_fps=False)
+    p99 = samples[int(len(samples) * 0.99)]
+    return dict(result, warmup_max_ms=max(warmup), mean_ms=sum(samples) / len(samples), p99_ms=p99,
+                max_ms=samples[-1], holds_fps=p99 < budget)
+
+
+def main(argv):
+    # python entities.py [--scale N] [--seconds S]
+    options = {"--scale": STRESS_SCALE, "--seconds": 10.0}
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = type(options[arg])(next(args))
+    r = stress(options["--scale"], options["--seconds"])
+    if not r["frames"]:
+        print(f"x{options['--scale']}: кадров не было — задайте --seconds больше нуля")
+        return 1
+    print(f"x{options['--scale']}: {r['objects']} объектов, {r['frames']} кадров после разогрева "
+          f"(в разогреве до {r['warmup_max_ms']:.1f} мс); "
+          f"работа кадра {r['mean_ms']:.2f} мс в среднем, p99 {r['p99_ms']:.2f} мс, макс {r['max_ms']:.2f} мс; "
+          f"{FPS} FPS {'держится' if r['holds_fps'] else 'НЕ держится'}")
+    return 0 if r["holds_fps"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
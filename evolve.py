@@ -0,0 +1,250 @@
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool, cpu_count, shared_memory
+
+import numpy as np
+
+from config import WIDTH, HEIGHT, MAX_LIVES
+from flappy_sim import FlappySim, OBS_SIZE
+
+# Правила берутся из FlappySim: он покадрово сверяется с update_game из praktik.py (python flappy_sim.py)
+HIDDEN = 8
+GENOME_SIZE = OBS_SIZE * HIDDEN + HIDDEN + HIDDEN + 1
+OBS_SCALE = np.array([HEIGHT, 15, WIDTH, HEIGHT, HEIGHT, MAX_LIVES, 100], dtype=np.float32)
+
+POPULATION = 256
+ELITE = 8
+TOURNAMENT = 4
+SIGMA = 0.1
+EPISODES = 3
+MAX_FRAMES = 5000
+# Геномы делятся на куски фиксированного размера со своим зерном: результат оценки
+# не зависит от числа процессов
+CHUNK = 16
+
+
+def decode(genomes):
+    n = len(genomes)
+    i = OBS_SIZE * HIDDEN
+    w1 = genomes[:, :i].reshape(n, OBS_SIZE, HIDDEN)
+    b1 = genomes[:, i:i + HIDDEN]
+    w2 = genomes[:, i + HIDDEN:i + 2 * HIDDEN]
+    b2 = genomes[:, -1]
+    return w1, b1, w2, b2
+
+
+def act(params, obs):
+    w1, b1, w2, b2 = params
+    h = np.tanh(np.einsum("ni,nih->nh", obs / OBS_SCALE, w1) + b1)
+    return (h * w2).sum(axis=1) + b2 > 0
+
+
+def evaluate(genomes, difficulty="normal", seed=0, episodes=EPISODES, max_frames=MAX_FRAMES):
+    # Каждый геном играет episodes партий; приспособленность — очки плюс выживание
+    n = len(genomes)
+    params = decode(np.repeat(genomes, episodes, axis=0))
+    sim = FlappySim(n * episodes, difficulty, seed)
+    obs = sim.observe()
+    fitness = np.zeros(n * episodes)
+    for _ in range(max_frames):
+        obs, reward, done = sim.step(act(params, obs))
+        fitness += reward
+        if done.all():
+            break
+    fitness += sim.frame / 100
+    return fitness.reshape(n, episodes).mean(axis=1), int(sim.frame.sum())
+
+
+# Общая память с геномами и приспособленностью; процессы пула подключаются к ней один раз
+_shared = {}
+
+
+def _attach(name, population):
+    shm = shared_memory.SharedMemory(name=name)
+    _shared["shm"] = shm
+    _shared["genomes"], _shared["fitness"] = _views(shm, population)
+
+
+def _views(shm, population):
+    genomes = np.ndarray((population, GENOME_SIZE), dtype=np.float64, buffer=shm.buf)
+    fitness = np.ndarray((population,), dtype=np.float64, buffer=shm.buf,
+                         offset=genomes.nbytes)
+    return genomes, fitness
+
+
+def _evaluate_chunk(task):
+    start, end, difficulty, seed, episodes, max_frames = task
+    fitness, frames = evaluate(_shared["genomes"][start:end], difficulty, seed, episodes, max_frames)
+    _shared["fitness"][start:end] = fitness
+    return frames
+
+
+def _tasks(population, difficulty, seed, episodes, max_frames):
+    return [(start, min(start + CHUNK, population), difficulty, seed * 100003 + start, episodes, max_frames)
+            for start in range(0, population, CHUNK)]
+
+
+class Trainer:
+    def __init__(self, population=POPULATION, difficulty="normal", seed=0, workers=None,
+                 episodes=EPISODES, max_frames=MAX_FRAMES):
+        self.population = population
+        self.difficulty = difficulty
+        self.episodes = episodes
+        self.max_frames = max_frames
+        self.workers = workers or cpu_count()
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.generation = 0
+        self.history = []
+
+        size = population * (GENOME_SIZE + 1) * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=size)
+        self.genomes, self.fitness = _views(self.shm, population)
+        self.genomes[:] = self.rng.normal(0, 1, (population, GENOME_SIZE))
+        self.fitness[:] = 0
+        self.pool = Pool(self.workers, initializer=_attach, initargs=(self.shm.name, population))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        # Представления держат буфер — их нужно отпустить до закрытия памяти
+        del self.genomes, self.fitness
+        self.shm.close()
+        self.shm.unlink()
+
+    def evaluate(self, seed):
+        tasks = _tasks(self.population, self.difficulty, seed, self.episodes, self.max_frames)
+        return sum(self.pool.map(_evaluate_chunk, tasks))
+
+    def breed(self):
+        order = np.argsort(-self.fitness)
+        parents = self.genomes.copy()
+        fitness = self.fitness.copy()
+        children = np.empty_like(parents)
+        children[:ELITE] = parents[order[:ELITE]]
+        count = self.population - ELITE
+        # Турнирный отбор, равномерное скрещивание и гауссова мутация
+        picks = self.rng.integers(0, self.population, (count, 2, TOURNAMENT))
+        winners = np.take_along_axis(picks, fitness[picks].argmax(axis=2)[..., None], axis=2)[..., 0]
+        mask = self.rng.random((count, GENOME_SIZE)) < 0.5
+        children[ELITE:] = np.where(mask, parents[winners[:, 0]], parents[winners[:, 1]])
+        children[ELITE:] += self.rng.normal(0, SIGMA, (count, GENOME_SIZE))
+        self.genomes[:] = children
+
+    def step(self):
+        start = time.perf_counter()
+        frames = self.evaluate(self.seed * 1000003 + self.generation)
+        elapsed = time.perf_counter() - start
+        stats = {"generation": self.generation, "best": float(self.fitness.max()),
+                 "mean": float(self.fitness.mean()), "evals_per_sec": self.population / elapsed,
+                 "frames_per_sec": frames / elapsed}
+        self.history.append(stats)
+        self.best = self.genomes[self.fitness.argmax()].copy()
+        self.breed()
+        self.generation += 1
+        return stats
+
+    def save(self, path):
+        # Запись во временный файл и rename: прерванный запуск не портит прежний чекпойнт
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, genomes=self.genomes, best=self.best, generation=self.generation,
+                 meta=json.dumps({"seed": self.seed, "difficulty": self.difficulty, "episodes": self.episodes,
+                                  "max_frames": self.max_frames, "history": self.history,
+                                  "rng": self.rng.bit_generator.state}))
+        os.replace(tmp, path)
+
+    def load(self, path, seed=None):
+        # Эпизоды поколения выводятся из зерна, поэтому продолжение идёт с зерном чекпойнта;
+        # явно заданное другое зерно — ошибка, а не молча другой забег
+        with np.load(path) as data:
+            if data["genomes"].shape != self.genomes.shape:
+                raise ValueError("checkpoint population does not match")
+            self.genomes[:] = data["genomes"]
+            self.best = data["best"]
+            self.generation = int(data["generation"])
+            meta = json.loads(str(data["meta"]))
+        # В чекпойнтах без зерна оно не сохранялось — остаётся заданное при запуске
+        if seed is not None and seed != meta.get("seed", seed):
+            raise ValueError(f"checkpoint was trained with --seed {meta['seed']}, not {seed}")
+        self.seed = meta.get("seed", self.seed)
+        self.difficulty = meta["difficulty"]
+        self.episodes = meta["episodes"]
+        self.max_frames = meta["max_frames"]
+        self.history = meta["history"]
+        self.rng.bit_generator.state = meta["rng"]
+
+
+def load_policy(path):
+    # Лучший геном из чекпойнта как функция obs -> прыгать ли
+    with np.load(path) as data:
+        params = decode(data["best"][None, :])
+    return lambda obs: bool(act(params, np.asarray(obs, dtype=np.float32)[None, :])[0])
+
+
+def scaling(population=POPULATION, difficulty="normal", max_frames=1000):
+    # Оценки в секунду для 1, 2, 4, ... процессов и для всех ядер
+    counts = []
+    n = 1
+    while n < cpu_count():
+        counts.append(n)
+        n *= 2
+    counts.append(cpu_count())
+    rows = []
+    for workers in counts:
+        trainer = Trainer(population, difficulty, seed=0, workers=workers, max_frames=max_frames)
+        try:
+            trainer.evaluate(0)
+            start = time.perf_counter()
+            frames = trainer.evaluate(1)
+            elapsed = time.perf_counter() - start
+        finally:
+            trainer.close()
+        rows.append((workers, population / elapsed, frames / elapsed))
+    return rows
+
+
+def main(argv):
+    # python evolve.py [--generations N] [--population N] [--difficulty easy|normal|hard]
+    #                  [--workers N] [--checkpoint путь] [--resume] [--seed N] | --scaling
+    options = {"--generations": 50, "--population": POPULATION, "--difficulty": "normal",
+               "--workers": 0, "--checkpoint": "evolve.npz", "--seed": 0}
+    flags = set()
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = type(options[arg])(next(args))
+        else:
+            flags.add(arg)
+
+    if "--scaling" in flags:
+        base = None
+        for workers, evals, frames in scaling(options["--population"], options["--difficulty"]):
+            base = base or evals
+            print(f"{workers:3d} процессов: {evals:8.1f} оценок/с, {frames:12,.0f} кадров/с, x{evals / base:.2f}")
+        return 0
+
+    trainer = Trainer(options["--population"], options["--difficulty"], options["--seed"],
+                      options["--workers"] or None)
+    try:
+        path = options["--checkpoint"]
+        if "--resume" in flags and os.path.exists(path):
+            try:
+                trainer.load(path, options["--seed"] if "--seed" in argv else None)
+            except ValueError as error:
+                print(error)
+                return 2
+            print(f"продолжаем с поколения {trainer.generation}")
+        while trainer.generation < options["--generations"]:
+            stats = trainer.step()
+            trainer.save(path)
+            print(f"поколение {stats['generation']:4d}: лучший {stats['best']:8.2f}, средний {stats['mean']:8.2f}, "
+                  f"{stats['evals_per_sec']:.1f} оценок/с")
+    finally:
+        trainer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
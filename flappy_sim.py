@@ -0,0 +1,388 @@
+import math
+import os
+import sys
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+from config import (
+    WIDTH, HEIGHT, MS_PER_FRAME, BIRD_X, BIRD_RADIUS, PIPE_WIDTH, DIFFICULTIES,
+    PIPE_SPAWN_DISTANCE, COIN_SPAWN_DISTANCE, HEART_SPAWN_DISTANCE, HEART_SPAWN_CHANCE,
+    COIN_RADIUS, COIN_VALUE, HEART_RADIUS, MAX_LIVES,
+)
+from collision import FAR
+
+OBS_SIZE = 7
+
+
+def _capacity(spawn_x, size, spacing):
+    # Сколько объектов одновременно может быть на экране при данном шаге появления
+    return int(math.ceil((spawn_x + size) / spacing)) + 2
+
+
+def _last_x(x, live):
+    # Аналог pipes[-1].x: самый новый объект всегда правее остальных
+    return np.where(live, x, -np.inf).max(axis=1)
+
+
+def _box_distance2(px, py, xmin, ymin, xmax, ymax):
+    dx = np.maximum(np.maximum(xmin - px, 0), px - xmax)
+    dy = np.maximum(np.maximum(ymin - py, 0), py - ymax)
+    return dx * dx + dy * dy
+
+
+def _swept_circle_box(x0, y0, x1, y1, r, xmin, ymin, xmax, ymax):
+    # Векторная версия collision.swept_circle_box с теми же кандидатами t
+    dx = x1 - x0
+    dy = y1 - y0
+    length2 = dx * dx + dy * dy
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ts = [0.0, 1.0,
+              np.where(dx != 0, (xmin - x0) / dx, 0.0), np.where(dx != 0, (xmax - x0) / dx, 0.0),
+              np.where(dy != 0, (ymin - y0) / dy, 0.0), np.where(dy != 0, (ymax - y0) / dy, 0.0)]
+        for cx in (xmin, xmax):
+            for cy in (ymin, ymax):
+                ts.append(np.where(length2 != 0, ((cx - x0) * dx + (cy - y0) * dy) / length2, 0.0))
+    r2 = r * r
+    hit = False
+    for t in ts:
+        t = np.minimum(np.maximum(t, 0.0), 1.0)
+        hit = hit | (_box_distance2(x0 + t * dx, y0 + t * dy, xmin, ymin, xmax, ymax) < r2)
+    return hit
+
+
+class FlappySim:
+    def __init__(self, n, difficulty="normal", seed=None):
+        preset = DIFFICULTIES[difficulty]
+        self.n = n
+        self.difficulty = difficulty
+        self.pipe_speed = preset["pipe_speed"]
+        self.pipe_gap = preset["pipe_gap"]
+        self.gravity = preset["gravity"]
+        self.jump_strength = preset["jump_strength"]
+        self.rng = np.random.default_rng(seed)
+
+        kp = _capacity(WIDTH, PIPE_WIDTH, PIPE_SPAWN_DISTANCE)
+        kc = _capacity(WIDTH + 20, COIN_RADIUS, COIN_SPAWN_DISTANCE)
+        kh = _capacity(WIDTH + 30, HEART_RADIUS, HEART_SPAWN_DISTANCE)
+
+        self.bird_y = np.zeros(n)
+        self.bird_velocity = np.zeros(n)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.lives = np.zeros(n, dtype=np.int64)
+        self.frame = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)
+
+        self.pipe_x = np.zeros((n, kp))
+        self.pipe_top = np.zeros((n, kp))
+        self.pipe_current_top = np.zeros((n, kp))
+        self.pipe_prev_top = np.zeros((n, kp))
+        self.pipe_amplitude = np.zeros((n, kp))
+        self.pipe_move_speed = np.zeros((n, kp))
+        self.pipe_move_offset = np.zeros((n, kp))
+        self.pipe_moving = np.zeros((n, kp), dtype=bool)
+        self.pipe_passed = np.zeros((n, kp), dtype=bool)
+        self.pipe_live = np.zeros((n, kp), dtype=bool)
+
+        self.coin_x = np.zeros((n, kc))
+        self.coin_y = np.zeros((n, kc))
+        self.coin_collected = np.zeros((n, kc), dtype=bool)
+        self.coin_live = np.zeros((n, kc), dtype=bool)
+
+        self.heart_x = np.zeros((n, kh))
+        self.heart_y = np.zeros((n, kh))
+        self.heart_collected = np.zeros((n, kh), dtype=bool)
+        self.heart_live = np.zeros((n, kh), dtype=bool)
+
+        self._rows = np.arange(n)
+        self.reset()
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        self.bird_y[mask] = HEIGHT // 2
+        self.bird_velocity[mask] = 0
+        self.score[mask] = 0
+        self.lives[mask] = MAX_LIVES
+        self.frame[mask] = 0
+        self.done[mask] = False
+        self.pipe_live[mask] = False
+        self.coin_live[mask] = False
+        self.heart_live[mask] = False
+        return self.observe()
+
+    def observe(self):
+        # Ближайшая труба, которую птица ещё не пролетела
+        ahead = self.pipe_live & (self.pipe_x + PIPE_WIDTH > BIRD_X - BIRD_RADIUS)
+        nearest = np.where(ahead, self.pipe_x, np.inf).argmin(axis=1)
+        has_pipe = ahead[self._rows, nearest]
+        top = np.where(has_pipe, self.pipe_current_top[self._rows, nearest], (HEIGHT - self.pipe_gap) / 2)
+        dx = np.where(has_pipe, self.pipe_x[self._rows, nearest] - BIRD_X, WIDTH - BIRD_X)
+
+        obs = np.empty((self.n, OBS_SIZE), dtype=np.float32)
+        obs[:, 0] = self.bird_y
+        obs[:, 1] = self.bird_velocity
+        obs[:, 2] = dx
+        obs[:, 3] = top
+        obs[:, 4] = top + self.pipe_gap
+        obs[:, 5] = self.lives
+        obs[:, 6] = self.score
+        return obs
+
+    def _spawn_slot(self, live, need):
+        slot = live.argmin(axis=1)
+        rows = self._rows[need]
+        return rows, slot[need]
+
+    def _gap_position(self, rows, radius):
+        # Coin.find_position / Heart.find_position: ближайшая труба у правого края
+        cand = self.pipe_live[rows] & (self.pipe_x[rows] + PIPE_WIDTH > WIDTH)
+        nearest = np.where(cand, self.pipe_x[rows], np.inf).argmin(axis=1)
+        found = cand[np.arange(len(rows)), nearest]
+        top = self.pipe_current_top[rows[found], nearest[found]]
+        low = np.floor(top + radius).astype(np.int64)
+        high = np.floor(top + self.pipe_gap - radius).astype(np.int64)
+        y = np.full(len(rows), HEIGHT // 2, dtype=np.float64)
+        y[found] = self.rng.integers(low, high, endpoint=True)
+        return y
+
+    def _spawn_pipes(self, active):
+        need = active & (~self.pipe_live.any(axis=1) |
+                         (_last_x(self.pipe_x, self.pipe_live) < WIDTH - PIPE_SPAWN_DISTANCE))
+        if not need.any():
+            return
+        rows, slot = self._spawn_slot(self.pipe_live, need)
+        k = len(rows)
+        moving = self.rng.random(k) < 0.4
+        top = self.rng.integers(50, HEIGHT - self.pipe_gap - 50, endpoint=True, size=k)
+        self.pipe_x[rows, slot] = WIDTH
+        self.pipe_top[rows, slot] = top
+        self.pipe_current_top[rows, slot] = top
+        self.pipe_moving[rows, slot] = moving
+        self.pipe_amplitude[rows, slot] = np.where(moving, self.rng.integers(10, 30, endpoint=True, size=k), 0)
+        self.pipe_move_speed[rows, slot] = np.where(moving, self.rng.uniform(0.01, 0.03, size=k), 0)
+        self.pipe_move_offset[rows, slot] = np.where(moving, self.rng.uniform(0, 2 * math.pi, size=k), 0)
+        self.pipe_passed[rows, slot] = False
+        self.pipe_live[rows, slot] = True
+
+    def _update_pipes(self, active):
+        rows = active[:, None] & self.pipe_live
+        self.pipe_x -= np.where(rows, self.pipe_speed, 0)
+        ticks = (self.frame * MS_PER_FRAME)[:, None]
+        offset = np.where(self.pipe_moving,
+                          np.sin(ticks * self.pipe_move_speed + self.pipe_move_offset) * self.pipe_amplitude, 0)
+        current = np.clip(self.pipe_top + offset, 40, HEIGHT - self.pipe_gap - 40)
+        np.copyto(self.pipe_prev_top, self.pipe_current_top, where=rows)
+        np.copyto(self.pipe_current_top, current, where=rows)
+        self.pipe_live &= self.pipe_x + PIPE_WIDTH > 0
+
+    def _spawn_pickups(self, x, y, live, collected, need, spawn_x, radius):
+        if not need.any():
+            return
+        rows, slot = self._spawn_slot(live, need)
+        x[rows, slot] = spawn_x
+        y[rows, slot] = self._gap_position(rows, radius)
+        collected[rows, slot] = False
+        live[rows, slot] = True
+
+    def _collect(self, x, y, live, collected, active, radius):
+        moving = active[:, None] & live & ~collected
+        x -= np.where(moving, self.pipe_speed, 0)
+        live &= (x + radius > 0) & ~collected
+        dist2 = (BIRD_X - x) ** 2 + (self.bird_y[:, None] - y) ** 2
+        hit = active[:, None] & live & (dist2 < (BIRD_RADIUS + radius) ** 2)
+        collected |= hit
+        return hit.sum(axis=1)
+
+    def _pipe_collision(self, prev_y):
+        gap_bottom = self.pipe_current_top + self.pipe_gap
+        by = self.bird_y[:, None]
+        overlap_x = (BIRD_X + BIRD_RADIUS > self.pipe_x) & (BIRD_X - BIRD_RADIUS < self.pipe_x + PIPE_WIDTH)
+        overlap_y = (by - BIRD_RADIUS < self.pipe_current_top) | (by + BIRD_RADIUS > gap_bottom)
+
+        hit = self.pipe_live & overlap_x & overlap_y
+
+        # То же, что collision.swept_pipe_hit, но только для труб рядом с птицей
+        x0 = BIRD_X - self.pipe_speed
+        xmax = self.pipe_x + PIPE_WIDTH
+        near = self.pipe_live & ~hit & (self.pipe_x < BIRD_X + BIRD_RADIUS) & (xmax > x0 - BIRD_RADIUS)
+        rows, cols = np.nonzero(near)
+        if len(rows):
+            top = self.pipe_current_top[rows, cols]
+            # Начало пути — в системе отсчёта трубы, которая за кадр могла сдвинуться и по вертикали
+            y0 = prev_y[rows] + top - self.pipe_prev_top[rows, cols]
+            y1 = self.bird_y[rows]
+            xmin = self.pipe_x[rows, cols]
+            swept = (_swept_circle_box(x0, y0, BIRD_X, y1, BIRD_RADIUS, xmin, -FAR, xmin + PIPE_WIDTH, top) |
+                     _swept_circle_box(x0, y0, BIRD_X, y1, BIRD_RADIUS, xmin, top + self.pipe_gap, xmin + PIPE_WIDTH, FAR))
+            hit[rows[swept], cols[swept]] = True
+        hit = hit.any(axis=1)
+        out = (self.bird_y - BIRD_RADIUS < 0) | (self.bird_y + BIRD_RADIUS > HEIGHT)
+        return hit | out
+
+    def step(self, actions):
+        active = ~self.done
+        prev_score = self.score.copy()
+        prev_y = self.bird_y.copy()
+        jump = np.asarray(actions, dtype=bool) & active
+
+        self.bird_velocity[jump] = self.jump_strength
+        self.bird_velocity += np.where(active, self.gravity, 0)
+        self.bird_y += np.where(active, self.bird_velocity, 0)
+
+        self._spawn_pipes(active)
+        self._update_pipes(active)
+
+        need = active & (~self.coin_live.any(axis=1) |
+                         (_last_x(self.coin_x, self.coin_live) < WIDTH - COIN_SPAWN_DISTANCE))
+        self._spawn_pickups(self.coin_x, self.coin_y, self.coin_live, self.coin_collected,
+                            need, WIDTH + 20, COIN_RADIUS)
+
+        any_heart = self.heart_live.any(axis=1)
+        far = _last_x(self.heart_x, self.heart_live) < WIDTH - HEART_SPAWN_DISTANCE
+        chance = np.zeros(self.n, dtype=bool)
+        # random() вызывается только если первое условие выполнено, как в main()
+        roll = active & any_heart & far
+        chance[roll] = self.rng.random(int(roll.sum())) < HEART_SPAWN_CHANCE
+        need = active & (~any_heart | chance)
+        self._spawn_pickups(self.heart_x, self.heart_y, self.heart_live, self.heart_collected,
+                            need, WIDTH + 30, HEART_RADIUS)
+
+        hearts = self._collect(self.heart_x, self.heart_y, self.heart_live, self.heart_collected,
+                               active, HEART_RADIUS)
+        self.lives = np.where(hearts > 0, np.minimum(self.lives + hearts, MAX_LIVES), self.lives)
+
+        coins = self._collect(self.coin_x, self.coin_y, self.coin_live, self.coin_collected,
+                              active, COIN_RADIUS)
+        self.score += coins * COIN_VALUE
+
+        hit = active & self._pipe_collision(prev_y)
+        self.lives -= hit
+        dead = hit & (self.lives <= 0)
+        respawn = hit & ~dead
+        self.bird_y[respawn] = HEIGHT // 2
+        self.bird_velocity[respawn] = 0
+
+        passed = active[:, None] & self.pipe_live & ~self.pipe_passed & (self.pipe_x + PIPE_WIDTH < BIRD_X)
+        self.pipe_passed |= passed
+        self.score += passed.sum(axis=1)
+
+        self.frame += active
+        self.done |= dead
+        reward = (self.score - prev_score).astype(np.float32)
+        return self.observe(), reward, self.done.copy()
+
+
+def benchmark(n=4096, steps=2000, difficulty="normal", seed=0):
+    sim = FlappySim(n, difficulty, seed)
+    rng = np.random.default_rng(seed)
+    frames = 0
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, done = sim.step(rng.random(n) < 0.08)
+        frames += n
+        if done.any():
+            sim.reset(done)
+    elapsed = time.perf_counter() - start
+    return frames / elapsed
+
+
+class _Recorder:
+    # Обёртка над ГСЧ FlappySim: выпавшие значения копятся по видам, чтобы _Replay выдал их
+    # update_game в том же порядке. Амплитуда и параметры колебаний FlappySim тянет для всех
+    # новых труб, а Pipe.spawn — только для подвижных, поэтому остальные не запоминаются
+    def __init__(self, rng):
+        self.rng = rng
+        self.queues = defaultdict(deque)
+        self.moving = None
+
+    def random(self, size):
+        v = self.rng.random(size)
+        self.queues["random"].extend(v.tolist())
+        self.moving = v < 0.4
+        return v
+
+    def integers(self, low, high, endpoint=False, size=None):
+        v = self.rng.integers(low, high, endpoint=endpoint, size=size)
+        if np.ndim(low) == 0 and low == 10:
+            self.queues["amplitude"].extend(v[self.moving].tolist())
+        else:
+            self.queues["top" if np.ndim(low) == 0 and low == 50 else "gap"].extend(np.atleast_1d(v).tolist())
+        return v
+
+    def uniform(self, low, high, size=None):
+        v = self.rng.uniform(low, high, size=size)
+        self.queues["move_speed" if low == 0.01 else "move_offset"].extend(v[self.moving].tolist())
+        return v
+
+
+class _Replay:
+    # Вместо random.Random в praktik: те же значения, что выпали FlappySim
+    def __init__(self, queues, pipe_gap):
+        self.queues = queues
+        self.pipe_gap = pipe_gap
+
+    def seed(self, seed=None):
+        pass
+
+    def choice(self, seq):
+        # Цвет трубы FlappySim не моделирует
+        return seq[0]
+
+    def random(self):
+        return self.queues["random"].popleft()
+
+    def randint(self, a, b):
+        if (a, b) == (50, HEIGHT - self.pipe_gap - 50):
+            return self.queues["top"].popleft()
+        return self.queues["amplitude" if (a, b) == (10, 30) else "gap"].popleft()
+
+    def uniform(self, a, b):
+        return self.queues["move_speed" if a == 0.01 else "move_offset"].popleft()
+
+
+def _parity_check(seeds=5, frames=3000):
+    # Покадровая сверка с update_game из praktik.py: одна строка FlappySim и игра получают одни
+    # и те же прыжки и случайные числа; сравниваются птица, очки, жизни, трубы и конец забега
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import praktik
+
+    original = praktik.rng
+    checked = mismatches = 0
+    try:
+        for difficulty in DIFFICULTIES:
+            for seed in range(seeds):
+                sim = FlappySim(1, difficulty, seed)
+                sim.rng = _Recorder(sim.rng)
+                praktik.rng = _Replay(sim.rng.queues, sim.pipe_gap)
+                praktik.start_game(difficulty, seed)
+                jumps = np.random.default_rng(seed + 1)
+                for _ in range(frames):
+                    obs = sim.observe()[0]
+                    jump = bool(obs[0] + obs[1] * 3 > obs[4] - 45) and jumps.random() < 0.9
+                    _, _, done = sim.step(np.array([jump]))
+                    dead = praktik.update_game(jump)
+                    checked += 1
+                    live = sim.pipe_live[0]
+                    order = np.argsort(sim.pipe_x[0][live])
+                    if ((sim.bird_y[0], sim.bird_velocity[0], sim.score[0], sim.lives[0], bool(done[0]))
+                            != (praktik.bird_y, praktik.bird_velocity, praktik.score, praktik.lives, dead)
+                            or sim.pipe_x[0][live][order].tolist() != [p.x for p in praktik.pipes]
+                            or sim.pipe_current_top[0][live][order].tolist()
+                            != [p.current_top_height for p in praktik.pipes]):
+                        mismatches += 1
+                        break
+                    if dead:
+                        break
+    finally:
+        praktik.rng = original
+    return checked, mismatches
+
+
+if __name__ == "__main__":
+    checked, mismatches = _parity_check()
+    print(f"сверка с update_game: {checked} кадров, расхождений {mismatches}")
+    rate = benchmark()
+    print(f"{rate:,.0f} кадров/с ({rate * 60 / 1e6:.1f} млн кадров/мин)")
+    sys.exit(1 if mismatches else 0)
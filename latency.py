@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+
+from profiler import percentile
+
+# Пока кадр ждёт своей очереди, события снимаются с очереди SDL каждые POLL_INTERVAL секунд
+# и получают время, когда их увидели: pygame не отдаёт отметки времени событий
+POLL_INTERVAL = 0.001
+WINDOW = 600
+
+
+class InputClock:
+    # Замена pygame.time.Clock: tick(fps) ждёт следующего кадра так же, но сон нарезан
+    # на короткие куски с опросом ввода; drain() отдаёт события вместе с отметками времени
+    def __init__(self):
+        # Модуль событий берётся один раз: poll вызывается каждую миллисекунду ожидания
+        import pygame
+
+        self.event_queue = pygame.event
+        self.last = time.perf_counter()
+        self.events = []
+        self.frame_times = [0.0] * 10
+        self.frames = 0
+
+    def poll(self):
+        now = time.perf_counter()
+        self.events.extend((now, event) for event in self.event_queue.get())
+        return now
+
+    def tick(self, fps=0):
+        deadline = self.last + (1 / fps if fps else 0)
+        now = self.poll()
+        while now < deadline:
+            time.sleep(min(POLL_INTERVAL, deadline - now))
+            now = self.poll()
+        dt = now - self.last
+        self.last = now
+        self.frame_times[self.frames % len(self.frame_times)] = dt
+        self.frames += 1
+        return dt * 1000
+
+    def drain(self):
+        # Последний опрос — непосредственно перед симуляцией
+        self.poll()
+        events, self.events = self.events, []
+        return events
+
+    def get_fps(self):
+        total = sum(self.frame_times[:self.frames])
+        return min(self.frames, len(self.frame_times)) / total if total else 0.0
+
+
+class LatencyProbe:
+    # Задержка от нажатия до показанного кадра: отметка события -> шаг симуляции,
+    # в котором применён прыжок -> present() кадра с его результатом
+    def __init__(self, output=None, window=WINDOW):
+        self.window = window
+        self.to_step = []
+        self.to_present = []
+        self.pending = []
+        self.count = 0
+        self.file = None
+        if output:
+            self.file = open(output, "w")
+            self.file.write("pressed,to_step_ms,to_present_ms\n")
+
+    def applied(self, stamp):
+        self.pending.append((stamp, time.perf_counter()))
+
+    def presented(self):
+        if not self.pending:
+            return
+        now = time.perf_counter()
+        for stamp, applied in self.pending:
+            to_step = (applied - stamp) * 1000
+            to_present = (now - stamp) * 1000
+            if len(self.to_present) < self.window:
+                self.to_step.append(to_step)
+                self.to_present.append(to_present)
+            else:
+                self.to_step[self.count % self.window] = to_step
+                self.to_present[self.count % self.window] = to_present
+            self.count += 1
+            if self.file:
+                self.file.write(f"{stamp:.6f},{to_step:.3f},{to_present:.3f}\n")
+        self.pending.clear()
+
+    def stats(self):
+        return summarize(self.to_step, self.to_present)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def summarize(to_step, to_present):
+    present = sorted(to_present)
+    step = sorted(to_step)
+    return {"count": len(present),
+            "step_p50": percentile(step, 0.5), "step_p95": percentile(step, 0.95),
+            "p50": percentile(present, 0.5), "p95": percentile(present, 0.95),
+            "p99": percentile(present, 0.99), "max": present[-1] if present else 0.0}
+
+
+def load_log(path):
+    to_step = []
+    to_present = []
+    with open(path) as f:
+        next(f)
+        for line in f:
+            _, step, present = line.split(",")
+            to_step.append(float(step))
+            to_present.append(float(present))
+    return to_step, to_present
+
+
+def probe(seconds=10.0, interval=0.3):
+    # Нажатия приходят из другого потока в случайные моменты внутри кадра, как от живого игрока;
+    # поток только кладёт события в очередь SDL, замер кончается по времени или со смертью птицы
+    import random
+    import threading
+    import pygame
+    import praktik
+
+    praktik.app.screen
+    praktik.start_game("easy", 0)
+    praktik.menu = praktik.difficulty_menu = False
+    praktik.playing = True
+    stop = threading.Event()
+
+    def press():
+        rnd = random.Random(0)
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end and not stop.is_set():
+            time.sleep(interval * rnd.uniform(0.5, 1.5))
+            if not praktik.playing:
+                break
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+
+    thread = threading.Thread(target=press, daemon=True)
+    thread.start()
+    try:
+        praktik.main()
+    except SystemExit:
+        pass
+    stop.set()
+    return praktik.app.latency.stats()
+
+
+def main(argv):
+    # python latency.py журнал.csv     — сводка по журналу FLAPPY_LATENCY
+    # python latency.py --probe [сек]  — игра без окна с нажатиями в случайные моменты
+    if argv and argv[0] == "--probe":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        s = probe(float(argv[1]) if len(argv) > 1 else 10.0)
+    elif argv:
+        s = summarize(*load_log(argv[0]))
+    else:
+        print("usage: latency.py журнал.csv | --probe [секунд]")
+        return 2
+    print(f"{s['count']} нажатий: до шага симуляции p50 {s['step_p50']:.1f} мс, p95 {s['step_p95']:.1f} мс; "
+          f"до кадра p50 {s['p50']:.1f} мс, p95 {s['p95']:.1f} мс, p99 {s['p99']:.1f} мс, макс {s['max']:.1f} мс")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,239 @@
+import math
+import os
+import sys
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import (
+    WIDTH, HEIGHT, MS_PER_FRAME, PIPE_WIDTH, COIN_RADIUS, HEART_RADIUS,
+    PIPE_SPAWN_DISTANCE, COIN_SPAWN_DISTANCE, HEART_SPAWN_DISTANCE, DIFFICULTIES,
+)
+
+# Координата трассы x — экранная координата объекта в момент, когда пройдено 0 пикселей;
+# пройдя d пикселей, объект виден на x - d. Трубы, монеты и сердца стоят на своих сетках:
+# i-я труба на PIPE_START + i * PIPE_SPAWN_DISTANCE и т. д., поэтому поиск по x — арифметика
+PIPE_START = WIDTH
+COIN_START = WIDTH + 20
+HEART_START = WIDTH + 30
+# Сердце есть не в каждой ячейке сетки: в среднем раз в 800 пикселей, как примерно и в игре
+HEART_SLOT_CHANCE = 0.5
+
+# Куски по 4800 пикселей: 24 трубы, 32 монеты, 12 ячеек сердец
+CHUNK_LENGTH = 4800
+PIPES_PER_CHUNK = CHUNK_LENGTH // PIPE_SPAWN_DISTANCE
+COINS_PER_CHUNK = CHUNK_LENGTH // COIN_SPAWN_DISTANCE
+HEARTS_PER_CHUNK = CHUNK_LENGTH // HEART_SPAWN_DISTANCE
+CACHE_CHUNKS = 64
+
+KINDS = {"pipes": 0, "coins": 1, "hearts": 2}
+
+
+class Level:
+    # Трасса как функция (зерно, сложность, номер куска): каждый кусок порождается своим ГСЧ
+    # при первом обращении и кэшируется, поэтому любую точку можно получить без симуляции
+    def __init__(self, seed, difficulty="normal", cache_size=CACHE_CHUNKS):
+        self.seed = seed
+        self.difficulty = difficulty
+        preset = DIFFICULTIES[difficulty]
+        self.pipe_gap = preset["pipe_gap"]
+        self.pipe_speed = preset["pipe_speed"]
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.generated = 0
+
+    def _rng(self, kind, chunk):
+        return np.random.default_rng([self.seed, list(DIFFICULTIES).index(self.difficulty), KINDS[kind], chunk])
+
+    def _chunk(self, kind, chunk):
+        key = (kind, chunk)
+        data = self.cache.get(key)
+        if data is not None:
+            self.cache.move_to_end(key)
+            return data
+        data = self.cache[key] = getattr(self, "_make_" + kind)(chunk)
+        self.generated += 1
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return data
+
+    def _make_pipes(self, chunk):
+        # Те же распределения, что в Pipe.spawn
+        rng = self._rng("pipes", chunk)
+        n = PIPES_PER_CHUNK
+        moving = rng.random(n) < 0.4
+        return {"top": rng.integers(50, HEIGHT - self.pipe_gap - 50, n, endpoint=True),
+                "color": rng.integers(0, 3, n),
+                "moving": moving,
+                "amplitude": np.where(moving, rng.integers(10, 30, n, endpoint=True), 0),
+                "move_speed": np.where(moving, rng.uniform(0.01, 0.03, n), 0.0),
+                "move_offset": np.where(moving, rng.uniform(0, 2 * math.pi, n), 0.0)}
+
+    def _make_pickups(self, kind, chunk, count, start, radius, chance=1.0):
+        rng = self._rng(kind, chunk)
+        x = start + (chunk * count + np.arange(count)) * (CHUNK_LENGTH // count)
+        present = rng.random(count) < chance
+        y = np.full(count, HEIGHT // 2, dtype=np.int64)
+        roll = rng.random(count)
+        for i in range(count):
+            gap = self.gap_for_spawn(int(x[i]), start)
+            if gap is not None:
+                low, high = int(gap[0] + radius), int(gap[1] - radius)
+                y[i] = low + int(roll[i] * (high - low + 1))
+        return {"x": x, "y": y, "present": present}
+
+    def _make_coins(self, chunk):
+        return self._make_pickups("coins", chunk, COINS_PER_CHUNK, COIN_START, COIN_RADIUS)
+
+    def _make_hearts(self, chunk):
+        return self._make_pickups("hearts", chunk, HEARTS_PER_CHUNK, HEART_START, HEART_RADIUS, HEART_SLOT_CHANCE)
+
+    def pipe(self, i):
+        # Труба i: (x трассы, базовая высота верха, цвет, амплитуда, скорость и фаза колебаний)
+        data = self._chunk("pipes", i // PIPES_PER_CHUNK)
+        j = i % PIPES_PER_CHUNK
+        return (PIPE_START + i * PIPE_SPAWN_DISTANCE, int(data["top"][j]), int(data["color"][j]),
+                int(data["amplitude"][j]), float(data["move_speed"][j]), float(data["move_offset"][j]))
+
+    def pipe_top(self, i, frame):
+        # Высота верха трубы i на кадре frame — та же формула, что в Pipe.update
+        _, top, _, amplitude, speed, offset = self.pipe(i)
+        if amplitude:
+            top = top + math.sin(frame * MS_PER_FRAME * speed + offset) * amplitude
+        return min(max(top, 40), HEIGHT - self.pipe_gap - 40)
+
+    def pipe_index(self, x):
+        # Первая труба, правый край которой правее x
+        return max(0, math.floor((x - PIPE_WIDTH - PIPE_START) / PIPE_SPAWN_DISTANCE) + 1)
+
+    def gap_at(self, x, frame=None):
+        # Зазор трубы, перекрывающей x трассы, или None, если x между трубами
+        i = self.pipe_index(x)
+        px = PIPE_START + i * PIPE_SPAWN_DISTANCE
+        if px > x:
+            return None
+        top = self.pipe_top(i, frame) if frame is not None else self.pipe(i)[1]
+        return top, top + self.pipe_gap
+
+    def gap_for_spawn(self, x, start):
+        # Как gap_position в praktik: ближайшая уже появившаяся труба, торчащая за правый край экрана,
+        # в момент, когда предмет с координатой x появляется на start; высота — на том же кадре
+        distance = x - start
+        i = self.pipe_index(distance + WIDTH)
+        if PIPE_START + i * PIPE_SPAWN_DISTANCE > distance + PIPE_START:
+            return None
+        top = self.pipe_top(i, distance / self.pipe_speed)
+        return top, top + self.pipe_gap
+
+    def _pickup(self, kind, k, per_chunk):
+        data = self._chunk(kind, k // per_chunk)
+        j = k % per_chunk
+        if not data["present"][j]:
+            return None
+        return int(data["x"][j]), int(data["y"][j])
+
+    def coin(self, k):
+        return self._pickup("coins", k, COINS_PER_CHUNK)
+
+    def heart(self, k):
+        return self._pickup("hearts", k, HEARTS_PER_CHUNK)
+
+    def coin_index(self, x):
+        # Первая монета, правый край которой правее x, — как pickup_alive: x + radius > 0
+        return max(0, math.floor((x - COIN_RADIUS - COIN_START) / COIN_SPAWN_DISTANCE) + 1)
+
+    def heart_index(self, x):
+        return max(0, math.floor((x - HEART_RADIUS - HEART_START) / HEART_SPAWN_DISTANCE) + 1)
+
+    def at(self, x):
+        # Что впереди начиная с x трассы: ближайшие труба, монета и ячейка сердца
+        i = self.pipe_index(x)
+        return {"pipe": (i,) + self.pipe(i),
+                "coin": self.coin(self.coin_index(x)),
+                "heart": self.heart(self.heart_index(x))}
+
+    def window(self, x0, x1):
+        # Трубы, задевающие [x0, x1), и предметы с правым краем в (x0, x1] — для ботов, планирующих вперёд
+        end = max(0, math.ceil((x1 - PIPE_START) / PIPE_SPAWN_DISTANCE))
+        pipes = [(i,) + self.pipe(i) for i in range(self.pipe_index(x0), end)]
+        coins = [c for c in map(self.coin, range(self.coin_index(x0), self.coin_index(x1))) if c]
+        hearts = [h for h in map(self.heart, range(self.heart_index(x0), self.heart_index(x1))) if h]
+        return pipes, coins, hearts
+
+
+def _course_state(game):
+    # Трубы и предметы забега с точностью, не чувствительной к порядку сложения расстояния
+    return ([(round(p.x, 6), round(p.current_top_height, 6), p.index) for p in game.pipes],
+            [(round(c.x, 6), c.y) for c in game.coins], [(round(h.x, 6), h.y) for h in game.hearts])
+
+
+def _jump_check(seed=7, frames=(1, 40, 333, 1000, 2500)):
+    # Старт трассы с расстояния d даёт то же, что забег с нуля до d. Птица держится за экраном,
+    # чтобы ничего не собирать: иначе собранные в забеге предметы отличали бы его от прыжка
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import praktik
+
+    def step():
+        praktik.bird_y = -1000
+        praktik.bird_velocity = 0
+        praktik.update_game()
+
+    ok = True
+    for difficulty in DIFFICULTIES:
+        for frame in frames:
+            praktik.start_course(difficulty, seed)
+            for _ in range(frame):
+                step()
+            pipes = _course_state(praktik)[0]
+            step()
+            ran = _course_state(praktik)
+            # Предметы появляются на первом шаге после старта, поэтому они сравниваются после него.
+            # Труба, которая в забеге появилась бы на этом шаге, при старте уже стоит в точке появления
+            praktik.start_course(difficulty, seed, frame * praktik.pipe_speed)
+            ok &= [p for p in _course_state(praktik)[0] if p[0] < PIPE_START] == pipes
+            step()
+            ok &= _course_state(praktik) == ran
+    return ok
+
+
+def _self_check(seed=7):
+    # Случайный доступ даёт то же, что последовательный; запросы не зависят от порядка и кэша
+    ok = True
+    for difficulty in DIFFICULTIES:
+        a = Level(seed, difficulty)
+        b = Level(seed, difficulty, cache_size=2)
+        far = [a.pipe(i) for i in range(2000)]
+        ok &= all(b.pipe(i) == far[i] for i in reversed(range(2000)))
+        ok &= [a.coin(k) for k in range(500)] == [b.coin(k) for k in range(499, -1, -1)][::-1]
+        # Монеты лежат в зазоре своей трубы
+        for k in range(500):
+            coin = a.coin(k)
+            gap = a.gap_for_spawn(coin[0], COIN_START)
+            ok &= gap is None or int(gap[0] + COIN_RADIUS) <= coin[1] <= int(gap[1] - COIN_RADIUS)
+
+    # Запрос по уже порождённым кускам и порождение нового куска всех трёх видов
+    level = Level(seed)
+    span = CHUNK_LENGTH * 16
+    for d in range(0, span, 1000):
+        level.at(d)
+    queries = range(0, span, 7)
+    start = time.perf_counter()
+    for d in queries:
+        level.at(d)
+    per_query = (time.perf_counter() - start) / len(queries)
+    start = time.perf_counter()
+    for d in range(10 ** 9, 10 ** 9 + span, CHUNK_LENGTH):
+        level.at(d)
+    per_chunk = (time.perf_counter() - start) / 16
+    return ok, per_query, per_chunk
+
+
+if __name__ == "__main__":
+    ok, per_query, per_chunk = _self_check()
+    jump_ok = _jump_check()
+    print(f"старт с расстояния {'совпадает' if jump_ok else 'РАСХОДИТСЯ'} с забегом до него")
+    ok = ok and jump_ok
+    print(f"трасса {'детерминирована' if ok else 'РАСХОДИТСЯ'}; запрос at(d) — {per_query * 1e6:.1f} мкс, "
+          f"новый кусок — {per_chunk * 1e3:.2f} мс")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,257 @@
+import glob
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from stream_stats import CHUNK, Welford, Distribution, Hundreds, open_values, iter_chunks, write_sorted
+
+# Отчёт praktik1.py без окон: бэкенд Agg, графики в PNG и SVG. Линия любой длины прореживается
+# до POINTS точек — по две на пиксель картинки шириной 1000 — и рисуется за одно и то же время
+POINTS = 2000
+# Перед LTTB ряд сжимается минимумами и максимумами корзин до MINMAX_RATIO * POINTS кандидатов
+MINMAX_RATIO = 4
+FORMATS = ("png", "svg")
+# Столько корзин у гистограммы, когда сотен слишком много для отдельных столбцов
+HIST_BINS = 1000
+FIGSIZE = (10, 4)
+DPI = 100
+
+
+def _minmax(x, bucket):
+    # Индексы минимума и максимума каждой корзины из bucket значений, по порядку в ряду
+    rows = len(x) // bucket
+    parts = []
+    if rows:
+        block = x[:rows * bucket].reshape(rows, bucket)
+        offsets = np.arange(rows) * bucket
+        pairs = np.stack((block.argmin(axis=1) + offsets, block.argmax(axis=1) + offsets), axis=1)
+        parts.append(np.sort(pairs, axis=1).ravel())
+    if len(x) % bucket:
+        tail = x[rows * bucket:]
+        parts.append(np.sort([rows * bucket + tail.argmin(), rows * bucket + tail.argmax()]))
+    return np.concatenate(parts)
+
+
+def lttb(x, y, points):
+    # Largest-Triangle-Three-Buckets: крайние точки остаются, из каждой корзины берётся точка,
+    # дающая наибольший треугольник с точкой прошлой корзины и средним следующей
+    if len(x) <= points:
+        return x, y
+    edges = np.linspace(1, len(x) - 1, points - 1).astype(np.int64)
+    chosen = np.empty(points, dtype=np.int64)
+    chosen[0] = a = 0
+    chosen[-1] = len(x) - 1
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else len(x)
+        cx = x[hi:next_hi].mean()
+        cy = y[hi:next_hi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        chosen[i + 1] = a
+    return x[chosen], y[chosen]
+
+
+def _bucket(count, points):
+    return max(1, -(-count // (points * MINMAX_RATIO // 2)))
+
+
+def decimate(values, points=POINTS):
+    # MinMaxLTTB для ряда в памяти: (индексы, значения) не длиннее points
+    values = np.asarray(values)
+    if len(values) <= points:
+        return np.arange(len(values)), values
+    index = np.unique(np.concatenate(([0], _minmax(values, _bucket(len(values), points)), [len(values) - 1])))
+    return lttb(index, values[index].astype(np.float64), points)
+
+
+def sorted_samples(values, dist, points=POINTS, chunk=CHUNK):
+    # Отсортированный ряд монотонен, поэтому его форму точно передают значения на равномерных
+    # рангах. Сортировка одна: у целых это частоты из Distribution, у прочих — внешняя сортировка
+    # по возрастанию; убывающий ряд — те же значения с рангов count - 1 - r
+    ranks = np.unique(np.linspace(0, dist.count - 1, points).round().astype(np.int64))
+    if dist.exact:
+        keys, freq = dist.counts.nonzero()
+        cum = np.cumsum(freq)
+        return (ranks, keys[np.searchsorted(cum, ranks, side="right")].astype(np.float64),
+                keys[np.searchsorted(cum, dist.count - 1 - ranks, side="right")].astype(np.float64))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ascending.npy")
+        write_sorted(values, dist, path, False, chunk)
+        ascending = np.load(path, mmap_mode="r")
+        return ranks, np.asarray(ascending[ranks]), np.asarray(ascending[dist.count - 1 - ranks])
+
+
+def save_figure(fig, out_dir, name, formats=FORMATS):
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for fmt in formats:
+        paths.append(os.path.join(out_dir, f"{name}.{fmt}"))
+        fig.savefig(paths[-1], dpi=DPI)
+    return paths
+
+
+def render(path, out_dir, dtype=None, formats=FORMATS, points=POINTS, chunk=CHUNK):
+    # Статистика, гистограмма сотен и кандидаты для линии — один проход по mmap кусками,
+    # выровненными по корзинам; дальше рисуются только тысячи точек
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    timings = {}
+    start = time.perf_counter()
+    values = open_values(path, dtype)
+    count = len(values)
+    name = os.path.splitext(os.path.basename(path))[0]
+    os.makedirs(out_dir, exist_ok=True)
+    if count == 0:
+        # Пустой набор: рисовать нечего, в отчёте только сводка
+        with open(os.path.join(out_dir, f"{name}_summary.txt"), "w") as f:
+            f.write("Значений нет\n")
+        return path, {"count": 0}, {"scan": time.perf_counter() - start, "sort": 0.0, "draw": 0.0}
+    bucket = _bucket(count, points)
+    chunk = bucket * max(1, chunk // bucket)
+    stats = Welford()
+    dist = Distribution()
+    hundreds = Hundreds()
+    index_parts = [np.array([0, count - 1])]
+    for offset, x in zip(range(0, count, chunk), iter_chunks(values, chunk)):
+        stats.update(x)
+        dist.add(x)
+        hundreds.add(x)
+        index_parts.append(offset + _minmax(x, bucket))
+    if dist.exact:
+        keys, freq = dist.counts.nonzero()
+        greater = int(freq[keys > stats.mean].sum())
+    else:
+        greater = sum(int((x > stats.mean).sum()) for x in iter_chunks(values, chunk))
+    index = np.unique(np.concatenate(index_parts))
+    line_x, line_y = lttb(index, np.asarray(values[index], dtype=np.float64), points)
+    timings["scan"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranks, ascending, descending = sorted_samples(values, dist, points, chunk)
+    timings["sort"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # У целых минимум печатается целым, как у pandas
+    summary = {"count": count, "median": dist.median(), "greater_than_mean": greater,
+               "min": int(stats.min) if np.issubdtype(values.dtype, np.integer) else stats.min,
+               "std": stats.std(), "median_exact": dist.exact}
+    with open(os.path.join(out_dir, f"{name}_summary.txt"), "w") as f:
+        f.write(f"Медиана ряда: {summary['median']}{'' if dist.exact else ' (оценка)'}\n"
+                f"Количество чисел, больше среднего: {greater}\n"
+                f"Минимальное значение: {summary['min']}\n"
+                f"Среднеквадратическое отклонение: {summary['std']:.2f}\n")
+
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    ax.plot(line_x, line_y, label='Исходные данные')
+    ax.set_title('Линейный график данных')
+    ax.set_xlabel('Индекс')
+    ax.set_ylabel('Значение')
+    ax.legend()
+    save_figure(fig, out_dir, f"{name}_line", formats)
+    plt.close(fig)
+
+    # Корзины plt.hist по сотням, как в praktik1.py: последняя закрыта справа и вбирает две сотни
+    edges, counts = hundreds.result()
+    if len(counts) > 1 and edges[-1] - edges[0] != (len(edges) - 1) * 100:
+        # Разреженный счёт — размах слишком широк для корзин по сотне; сотни сводятся в HIST_BINS корзин
+        counts, edges = np.histogram(edges, bins=HIST_BINS, weights=counts)
+    elif len(counts) > 1:
+        counts = np.concatenate((counts[:-2], [counts[-2] + counts[-1]]))
+    else:
+        edges = np.append(edges, edges[-1] + 100)
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    ax.stairs(counts, edges, fill=True, edgecolor='black')
+    ax.set_title('Гистограмма округленных данных')
+    ax.set_xlabel('Значение (округлено до сотен)')
+    ax.set_ylabel('Частота')
+    save_figure(fig, out_dir, f"{name}_hundreds", formats)
+    plt.close(fig)
+
+    fig, ax = plt.subplots(figsize=FIGSIZE)
+    ax.plot(ranks, ascending, label='По возрастанию')
+    ax.plot(ranks, descending, label='По убыванию')
+    ax.set_title('Сравнение отсортированных данных')
+    ax.set_xlabel('Индекс')
+    ax.set_ylabel('Значение')
+    ax.legend()
+    save_figure(fig, out_dir, f"{name}_sorted", formats)
+    plt.close(fig)
+    timings["draw"] = time.perf_counter() - start
+    return path, summary, timings
+
+
+def render_dir(in_dir, out_dir, workers=None, dtype=None, formats=FORMATS):
+    # Наборы каталога — в отдельных процессах: проход по данным и отрисовка упираются в процессор.
+    # Ошибка одного набора не останавливает остальные: вместо сводки отдаётся исключение
+    paths = sorted(glob.glob(os.path.join(in_dir, "*.npy")))
+    if dtype:
+        paths += sorted(p for p in glob.glob(os.path.join(in_dir, "*")) if not p.endswith(".npy"))
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {pool.submit(render, p, out_dir, dtype, formats): p for p in paths}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as error:
+                yield futures[future], None, error
+
+
+def bench(count, out_dir=None, chunk=CHUNK):
+    # Отчёт по count случайным целым, как в praktik1.py, записанным кусками в .npy
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"bench{count}.npy")
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.int32, shape=(count,))
+        rng = np.random.default_rng(42)
+        for start in range(0, count, chunk):
+            out[start:start + chunk] = rng.integers(-10000, 10001, min(chunk, count - start))
+        out.flush()
+        del out
+        start = time.perf_counter()
+        _, summary, timings = render(path, out_dir or tmp)
+        return time.perf_counter() - start, summary, timings
+
+
+def main(argv):
+    # python plot_report.py каталог_данных каталог_отчёта [--workers N] [--dtype float32] [--formats png,svg]
+    # python plot_report.py --bench [N]  — время отчёта по N значениям (по умолчанию 100 млн)
+    options = {"--workers": os.cpu_count(), "--dtype": "", "--formats": ",".join(FORMATS), "--bench": 0}
+    positional = []
+    args = iter(argv)
+    for arg in args:
+        if arg == "--bench":
+            options[arg] = 100_000_000
+        elif arg in options:
+            options[arg] = type(options[arg])(next(args))
+        elif options["--bench"] and arg.isdigit():
+            options["--bench"] = int(arg)
+        else:
+            positional.append(arg)
+    if options["--bench"]:
+        total, summary, timings = bench(options["--bench"])
+        print(f"{summary['count']} значений: отчёт за {total:.2f} с (проход {timings['scan']:.2f} с, "
+              f"сортировка {timings['sort']:.2f} с, графики {timings['draw']:.2f} с)")
+        return 0
+    if len(positional) != 2:
+        print("usage: plot_report.py каталог_данных каталог_отчёта [--workers N] [--dtype float32] | --bench [N]")
+        return 2
+    start = time.perf_counter()
+    failed = 0
+    for path, summary, timings in render_dir(*positional, options["--workers"], options["--dtype"] or None,
+                                             options["--formats"].split(",")):
+        if summary is None:
+            failed += 1
+            print(f"{os.path.basename(path)}: ошибка: {timings!r}")
+        else:
+            print(f"{os.path.basename(path)}: {summary['count']} значений, {sum(timings.values()):.2f} с")
+    print(f"всего {time.perf_counter() - start:.2f} с" + (f", с ошибками: {failed}" if failed else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,97 @@
+class Pool:
+    # Свободные объекты переиспользуются через spawn() вместо создания новых
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.created = 0
+
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.spawn(*args)
+            return obj
+        self.created += 1
+        return self.cls(*args)
+
+    def release(self, obj):
+        self.free.append(obj)
+
+
+def compact(items, alive, pool):
+    # Фильтрация списка на месте: живые сдвигаются к началу, остальные уходят в пул
+    keep = 0
+    for i in range(len(items)):
+        obj = items[i]
+        if alive(obj):
+            items[keep] = obj
+            keep += 1
+        else:
+            pool.release(obj)
+    while len(items) > keep:
+        items.pop()
+
+
+def release_all(items, pool):
+    while items:
+        pool.release(items.pop())
+
+
+ALLOCATION_LIMIT = 16 * 1024
+
+
+def autopilot(game):
+    # Простой бот для замеров: держится чуть выше низа зазора ближайшей трубы
+    target = game.HEIGHT // 2
+    for pipe in game.pipes:
+        if pipe.x + pipe.width > game.bird_x - game.BIRD_RADIUS:
+            target = pipe.current_top_height + game.pipe_gap - 35
+            break
+    return game.bird_y + game.bird_velocity * 2 > target and game.bird_velocity > -2
+
+
+def allocation_check(frames=10000, warmup=3000):
+    # После прогрева кадр не должен ни занимать память, ни запускать сборщик мусора,
+    # ни создавать новые трубы, монеты и сердца мимо пулов
+    import gc
+    import os
+    import tracemalloc
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import praktik
+
+    def run(count):
+        for _ in range(count):
+            if praktik.update_game(autopilot(praktik)):
+                praktik.start_game(praktik.difficulty, 0)
+
+    pools = (praktik.pipe_pool, praktik.coin_pool, praktik.heart_pool)
+    praktik.start_game("normal", 0)
+    run(warmup)
+    created = sum(pool.created for pool in pools)
+
+    collections = [0]
+
+    def on_gc(phase, info):
+        if phase == "start":
+            collections[0] += 1
+
+    gc.collect()
+    gc.callbacks.append(on_gc)
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        run(frames)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        gc.callbacks.remove(on_gc)
+    return current - base, peak - base, collections[0], sum(pool.created for pool in pools) - created
+
+
+if __name__ == "__main__":
+    import sys
+
+    growth, peak, collections, created = allocation_check()
+    print(f"прирост памяти: {growth} Б, пик: {peak} Б, сборок мусора: {collections}, новых объектов: {created}")
+    sys.exit(0 if growth < ALLOCATION_LIMIT and peak < ALLOCATION_LIMIT and collections == 0 and created == 0
+             else 1)
@@ -3,40 +3,43 @@ import random
 import sys
 import os
 import math
+from functools import cached_property
+
+from config import (
+    WIDTH, HEIGHT, FPS, MS_PER_FRAME, BIRD_X, BIRD_RADIUS, PIPE_WIDTH, COIN_RADIUS, HEART_RADIUS,
+    DIFFICULTIES, PIPE_SPAWN_DISTANCE, COIN_SPAWN_DISTANCE, HEART_SPAWN_DISTANCE,
+    WHITE, GREEN, DARK_GREEN, RED, BLACK, ORANGE, STAR_COLOR,
+)
+from assets import AssetCache, get_font
+from renderer import DirtyRenderer
+from replay import Recorder, save_recording
+import collision
+from pools import Pool, compact, release_all
+from profiler import FrameProfiler
+from scores import ScoreStore, import_legacy
+from latency import InputClock, LatencyProbe
 
-pygame.init()
-
-WIDTH, HEIGHT = 400, 600
-FPS = 60
-
-WHITE = (255, 255, 255)
-BLUE = (135, 206, 250)
-GREEN = (0, 200, 0)
-DARK_GREEN = (0, 150, 0)
-RED = (255, 0, 0)
-BLACK = (0, 0, 0)
-YELLOW = (255, 223, 0)
-LIGHT_GRAY = (220, 220, 220)
-ORANGE = (255, 165, 0)
-
-NIGHT_SKY = (10, 10, 40)
-MOON_COLOR = (230, 230, 210)
-STAR_COLOR = (255, 255, 200)
-
-BIRD_RADIUS = 20
-
-PIPE_WIDTH = 70
 PIPE_GAP_MIN = 120
 PIPE_SPEED_MAX = 8
 
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Flappy Bird with Moving Pipes and Coins")
-clock = pygame.time.Clock()
-font = pygame.font.SysFont(None, 36)
-small_font = pygame.font.SysFont(None, 32)
-
-bird_x = 100
+# Шаг симуляции фиксирован, частота отрисовки от него не зависит (0 — без ограничения)
+SIM_DT = 1 / FPS
+RENDER_FPS = int(os.environ.get("FLAPPY_RENDER_FPS", FPS))
+VSYNC = os.environ.get("FLAPPY_VSYNC") == "1"
+# FLAPPY_OUTPUT=1920x1080 (окно) или desktop (весь экран): логический кадр WIDTH x HEIGHT
+# масштабирует рендерер SDL; FLAPPY_SCALE_MODE=fit|integer|stretch (display.py)
+OUTPUT = os.environ.get("FLAPPY_OUTPUT")
+SCALE_MODE = os.environ.get("FLAPPY_SCALE_MODE", "fit")
+MAX_CATCH_UP_STEPS = 5
+MAX_FRAME_TIME = 0.25
+# Backspace во время игры или после смерти — назад на REWIND_FRAMES шагов (rewind.py)
+REWIND_FRAMES = 2 * FPS
+# A во время игры — автопилот (autopilot.py); бюджет поиска на кадр, мс
+AUTOPILOT_BUDGET = float(os.environ.get("FLAPPY_AUTOPILOT_BUDGET", 2)) / 1000
+
+bird_x = BIRD_X
 bird_y = HEIGHT // 2
+prev_bird_y = bird_y
 bird_velocity = 0
 
 score = 0
@@ -47,6 +50,9 @@ menu = True
 playing = False
 game_over = False
 difficulty_menu = True
+# После перемотки или с автопилотом забег тренировочный: не попадает в рекорды
+practice = False
+autopilot_enabled = False
 
 pipe_gap = 200
 pipe_speed = 3
@@ -54,122 +60,279 @@ GRAVITY = 0.5
 JUMP_STRENGTH = -10
 
 HIGHSCORE_FILE = "highscore.txt"
+SCORES_FILE = os.environ.get("FLAPPY_SCORES", "scores.log")
+RECORD_DIR = os.environ.get("FLAPPY_RECORD_DIR")
+CAPTURE_FILE = os.environ.get("FLAPPY_CAPTURE")
+LATENCY_FILE = os.environ.get("FLAPPY_LATENCY")
+
+# Игровой ГСЧ (трубы, монеты, сердца) отделён от декораций,
+# чтобы забег определялся только зерном, сложностью и прыжками
+rng = random.Random()
+scenery_rng = random.Random()
+game_seed = None
+recorder = None
+# Трасса из level.py вместо живого ГСЧ (start_course); course_distance — пройденные пиксели,
+# course_next — номера следующих трубы, монеты и ячейки сердца
+course = None
+course_distance = 0
+course_next = [0, 0, 0]
 
 is_night = False
+difficulty = "normal"
 
 NUM_STARS = 50
-stars = []
-for _ in range(NUM_STARS):
-    x = random.randint(0, WIDTH)
-    y = random.randint(0, HEIGHT // 2)
-    brightness = random.randint(150, 255)
-    stars.append([x, y, brightness, random.choice([1, -1])])
-
-def load_highscore():
-    if os.path.exists(HIGHSCORE_FILE):
-        with open(HIGHSCORE_FILE, "r") as f:
-            try:
-                return int(f.read())
-            except:
-                return 0
-    return 0
-
-def save_highscore(score):
-    with open(HIGHSCORE_FILE, "w") as f:
-        f.write(str(score))
-
-highscore = load_highscore()
+
+highscore = 0
+leaderboard = []
+
+class App:
+    # Окно, шрифты, декорации и рекорды создаются при первом обращении: импорт модуля
+    # ничего не открывает, и правилам игры (update_game, Pipe, check_collision) дисплей не нужен
+    @cached_property
+    def screen(self):
+        if OUTPUT:
+            return self.display.surface
+        pygame.display.init()
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.SCALED if VSYNC else 0, vsync=int(VSYNC))
+        pygame.display.set_caption("Flappy Bird with Moving Pipes and Coins")
+        return screen
+
+    @cached_property
+    def display(self):
+        if not OUTPUT:
+            self.screen
+            return pygame.display
+        from display import ScaledDisplay, parse_size
+        return ScaledDisplay((WIDTH, HEIGHT), None if OUTPUT == "desktop" else parse_size(OUTPUT), SCALE_MODE,
+                             VSYNC, "Flappy Bird with Moving Pipes and Coins")
+
+    def mouse_pos(self):
+        pos = pygame.mouse.get_pos()
+        return self.display.to_logical(pos) if OUTPUT else pos
+
+    @cached_property
+    def clock(self):
+        # Ввод опрашивается и во время ожидания кадра — у каждого нажатия есть отметка времени
+        return InputClock()
+
+    @cached_property
+    def latency(self):
+        # FLAPPY_LATENCY=файл.csv — журнал задержки от нажатия до кадра (latency.py)
+        return LatencyProbe(LATENCY_FILE)
+
+    @cached_property
+    def rewind(self):
+        # Снимки состояния после каждого шага, последние десять секунд
+        from rewind import Rewind
+        return Rewind(sys.modules[__name__])
+
+    @cached_property
+    def autopilot(self):
+        from autopilot import Planner
+        return Planner(sys.modules[__name__], AUTOPILOT_BUDGET)
+
+    @cached_property
+    def font(self):
+        return get_font(None, 36)
+
+    @cached_property
+    def small_font(self):
+        return get_font(None, 32)
+
+    @cached_property
+    def profiler_font(self):
+        return get_font(None, 18)
+
+    @cached_property
+    def assets(self):
+        return AssetCache()
+
+    @cached_property
+    def renderer(self):
+        return DirtyRenderer(self.screen, full_repaint=os.environ.get("FLAPPY_FULL_REPAINT") == "1",
+                             output=self.display)
+
+    @cached_property
+    def profiler(self):
+        # F3 — оверлей с временем фаз; FLAPPY_PROFILE=файл.csv (или .bin) — запись каждого кадра
+        return FrameProfiler(output=os.environ.get("FLAPPY_PROFILE"))
+
+    @cached_property
+    def capture(self):
+        # FLAPPY_CAPTURE=файл.flpv — запись видео; сжатие в фоновом потоке (capture.py)
+        from capture import Capture
+        return Capture(CAPTURE_FILE, self.screen, FPS)
+
+    @cached_property
+    def star_specs(self):
+        star_specs = []
+        for _ in range(NUM_STARS):
+            x = scenery_rng.randint(0, WIDTH)
+            y = scenery_rng.randint(0, HEIGHT // 2)
+            brightness = scenery_rng.randint(150, 255)
+            star_specs.append((x, y, brightness, scenery_rng.choice([1, -1])))
+        return star_specs
+
+    @cached_property
+    def clouds(self):
+        # Порядок обращений к scenery_rng прежний: звёзды, облака, падающие звёзды
+        self.star_specs
+        return [Cloud() for _ in range(5)]
+
+    @cached_property
+    def falling_stars(self):
+        self.clouds
+        return [FallingStar() for _ in range(20)]  # 20 падающих звезд
+
+    @cached_property
+    def background(self):
+        # numpy нужен только фону, поэтому и импорт здесь
+        from background import Background
+        self.screen
+        return Background(self.star_specs)
+
+    @cached_property
+    def score_store(self):
+        # Рекорды по уровням сложности; на диск пишет фоновый поток
+        score_store = ScoreStore(SCORES_FILE)
+        import_legacy(score_store, HIGHSCORE_FILE)
+        # Поток стартует сразу: он же подтягивает рекорды других киосков
+        score_store.start()
+        return score_store
+
+app = App()
+
+def lerp(a, b, t):
+    return a + (b - a) * t
 
 def draw_button(text, x, y, w, h, color, text_color):
-    pygame.draw.rect(screen, color, (x, y, w, h), border_radius=10)
-    label = small_font.render(text, True, text_color)
-    label_rect = label.get_rect(center=(x + w // 2, y + h // 2))
-    screen.blit(label, label_rect)
+    app.screen.blit(app.assets.button(app.small_font, text, w, h, color, text_color)[0], (x, y))
     return pygame.Rect(x, y, w, h)
 
 def draw_bird(x, y):
-    pygame.draw.circle(screen, RED, (int(x), int(y)), BIRD_RADIUS)
-    eye_radius = 5
-    pupil_radius = 2
-    eye_x = int(x + BIRD_RADIUS // 2)
-    eye_y = int(y - BIRD_RADIUS // 2)
-    pygame.draw.circle(screen, WHITE, (eye_x, eye_y), eye_radius)
-    pygame.draw.circle(screen, BLACK, (eye_x, eye_y), pupil_radius)
-
-    wing_width = 16
-    wing_height = 10
-    wing_x = int(x - BIRD_RADIUS // 2)
-    wing_y = int(y)
-    pygame.draw.ellipse(screen, (200, 0, 0), (wing_x, wing_y, wing_width, wing_height))
-
-    beak_length = 8
-    beak_height = 6
-    beak_x = int(x + BIRD_RADIUS)
-    beak_y = int(y)
-    points = [
-        (beak_x, beak_y),
-        (beak_x - beak_length, beak_y - beak_height // 2),
-        (beak_x - beak_length, beak_y + beak_height // 2)
-    ]
-    pygame.draw.polygon(screen, BLACK, points)
+    return app.assets.blit(app.screen, app.assets.bird(), x, y)
 
 def draw_heart(surface, x, y, size=20):
-    radius = size // 4
-    pygame.draw.circle(surface, RED, (x - radius, y), radius)
-    pygame.draw.circle(surface, RED, (x + radius, y), radius)
-    points = [(x - size // 2, y), (x + size // 2, y), (x, y + size // 1.3)]
-    pygame.draw.polygon(surface, RED, points)
-
-def draw_ground():
-    ground_height = 60
-    grass_height = 20
-    ground_y = HEIGHT - ground_height
-
-    # Почва
-    pygame.draw.rect(screen, (139, 69, 19), (0, ground_y, WIDTH, ground_height))  # Коричневая почва
+    return app.assets.blit(surface, app.assets.heart(size), x, y)
 
-    # Трава
-    pygame.draw.rect(screen, (34, 139, 34), (0, ground_y, WIDTH, grass_height))   # Зеленая трава
+def get_background(night):
+    return app.background.surface(night)
 
-    # Немного деталей: травинки
-    for i in range(0, WIDTH, 15):
-        pygame.draw.line(screen, (0, 100, 0), (i, ground_y), (i, ground_y - 5), 2)
-
-def check_collision(bird_y, pipes):
-    for pipe in pipes:
-        if pipe.collides_with(bird_x, bird_y, BIRD_RADIUS):
-            return True
+def check_collision(bird_y, pipes, prev_y=None):
+    # prev_y включает проверку вдоль пути птицы за кадр, чтобы она не проскакивала углы труб
+    if collision.pipe_collision(pipes, bird_x, bird_y, BIRD_RADIUS, pipe_gap, PIPE_WIDTH, prev_y, pipe_speed):
+        return True
     if bird_y - BIRD_RADIUS < 0 or bird_y + BIRD_RADIUS > HEIGHT:
         return True
     return False
 
 def reset_game():
-    global bird_y, bird_velocity, score, frame_count
+    global bird_y, prev_bird_y, bird_velocity, score, frame_count
     global pipe_gap, pipe_speed, GRAVITY, JUMP_STRENGTH
     global lives
     bird_y = HEIGHT // 2
+    prev_bird_y = bird_y
     bird_velocity = 0
     score = 0
     frame_count = 0
     lives = 3
+    release_all(pipes, pipe_pool)
+    release_all(coins, coin_pool)
+    release_all(hearts, heart_pool)
+
+def seed_game(seed=None):
+    global game_seed
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    game_seed = seed
+    rng.seed(seed)
+
+def start_game(name, seed=None):
+    global course
+    apply_difficulty(name)
+    seed_game(seed)
+    reset_game()
+    course = None
+
+def start_course(name, seed=None, distance=0):
+    # Забег по трассе Level(seed, name) сразу с пройденного расстояния distance
+    global course, course_distance, frame_count
+    # numpy нужен только трассе, поэтому и импорт здесь
+    from level import Level
+    start_game(name, seed)
+    course = Level(game_seed, name)
+    course_distance = distance
+    frame_count = round(distance / pipe_speed)
+    course_next[:] = [course.pipe_index(distance), course.coin_index(distance), course.heart_index(distance)]
+    spawn_course()
+    for pipe in pipes:
+        # Верх — как после последнего Pipe.update, который считал его на кадре frame_count - 1
+        pipe.current_top_height = pipe.prev_top = course.pipe_top(pipe.index, frame_count - 1)
+        pipe.passed = pipe.x + pipe.width < bird_x
+
+def spawn_course():
+    # Появляется всё, что к этому кадру доехало до точки появления; каждый объект — O(1)
+    d = course_distance
+    while course_next[0] * PIPE_SPAWN_DISTANCE <= d:
+        spec = course.pipe(course_next[0])
+        pipes.append(pipe_pool.acquire(spec[0] - d, spec))
+        pipes[-1].index = course_next[0]
+        course_next[0] += 1
+
+def spawn_course_pickups(items, pool, index, spawn, spacing):
+    d = course_distance
+    while course_next[index] * spacing <= d:
+        item = spawn(course_next[index])
+        if item is not None:
+            items.append(pool.acquire(pipes, item[1]))
+            items[-1].x = items[-1].prev_x = item[0] - d
+        course_next[index] += 1
+
+def apply_difficulty(name):
+    global pipe_gap, pipe_speed, GRAVITY, JUMP_STRENGTH, difficulty
+    difficulty = name
+    preset = DIFFICULTIES[name]
+    pipe_speed = preset["pipe_speed"]
+    pipe_gap = preset["pipe_gap"]
+    GRAVITY = preset["gravity"]
+    JUMP_STRENGTH = preset["jump_strength"]
+
+PIPE_COLORS = (GREEN, DARK_GREEN, ORANGE)
 
 class Pipe:
-    def __init__(self, x):
+    __slots__ = ("x", "width", "color", "top_height", "passed", "is_moving",
+                 "move_amplitude", "move_speed", "move_offset", "current_top_height", "prev_x", "prev_top", "index")
+
+    def __init__(self, x, spec=None):
+        self.spawn(x, spec)
+
+    def spawn(self, x, spec=None):
         self.x = x
         self.width = PIPE_WIDTH
-        self.color = random.choice([GREEN, DARK_GREEN, ORANGE])
-        self.top_height = random.randint(50, HEIGHT - pipe_gap - 50)
         self.passed = False
-        self.is_moving = random.random() < 0.4
-        self.move_amplitude = random.randint(10, 30) if self.is_moving else 0
-        self.move_speed = random.uniform(0.01, 0.03) if self.is_moving else 0
-        self.move_offset = random.uniform(0, 2*math.pi) if self.is_moving else 0
+        self.index = None
+        if spec is None:
+            self.color = rng.choice(PIPE_COLORS)
+            self.top_height = rng.randint(50, HEIGHT - pipe_gap - 50)
+            self.is_moving = rng.random() < 0.4
+            self.move_amplitude = rng.randint(10, 30) if self.is_moving else 0
+            self.move_speed = rng.uniform(0.01, 0.03) if self.is_moving else 0
+            self.move_offset = rng.uniform(0, 2*math.pi) if self.is_moving else 0
+        else:
+            # Готовая труба из Level.pipe()
+            _, self.top_height, color, self.move_amplitude, self.move_speed, self.move_offset = spec
+            self.color = PIPE_COLORS[color]
+            self.is_moving = self.move_amplitude > 0
         self.current_top_height = self.top_height
+        self.prev_x = x
+        self.prev_top = self.current_top_height
 
     def update(self):
+        self.prev_x = self.x
+        self.prev_top = self.current_top_height
         self.x -= pipe_speed
         if self.is_moving:
-            offset = math.sin(pygame.time.get_ticks() * self.move_speed + self.move_offset) * self.move_amplitude
+            offset = math.sin(frame_count * MS_PER_FRAME * self.move_speed + self.move_offset) * self.move_amplitude
         else:
             offset = 0
         self.current_top_height = self.top_height + offset
@@ -178,126 +341,125 @@ class Pipe:
         if self.current_top_height > HEIGHT - pipe_gap - 40:
             self.current_top_height = HEIGHT - pipe_gap - 40
 
-    def draw(self, surface):
-        bottom_y = self.current_top_height + pipe_gap
-        pygame.draw.rect(surface, self.color, (self.x, 0, self.width, int(self.current_top_height)))
-        pygame.draw.rect(surface, self.color, (self.x, int(bottom_y), self.width, HEIGHT - int(bottom_y)))
+    def draw(self, surface, alpha=1.0):
+        x = lerp(self.prev_x, self.x, alpha)
+        top_height = lerp(self.prev_top, self.current_top_height, alpha)
+        bottom_y = top_height + pipe_gap
+        top = pygame.draw.rect(surface, self.color, (x, 0, self.width, int(top_height)))
+        return top.union(pygame.draw.rect(surface, self.color, (x, int(bottom_y), self.width, HEIGHT - int(bottom_y))))
 
     def collides_with(self, bx, by, br):
         bottom_y = self.current_top_height + pipe_gap
-        if bx + br > self.x and bx - br < self.x + self.width:
-            if by - br < self.current_top_height or by + br > bottom_y:
-                return True
-        return False
+        return collision.box_hit(bx, by, br, self.x, self.width, self.current_top_height, bottom_y)
+
+def gap_position(pipes, radius):
+    # Найти ближайшую трубу, торчащую за правый край экрана (где будет монета или сердце).
+    # Трубы отсортированы по x, подходящие идут хвостом списка — смотрим с конца
+    nearest_pipe = None
+    for i in range(len(pipes) - 1, -1, -1):
+        if pipes[i].x + pipes[i].width <= WIDTH:
+            break
+        nearest_pipe = pipes[i]
+
+    if nearest_pipe:
+        pipe_top = nearest_pipe.current_top_height
+        pipe_bottom = pipe_top + pipe_gap
+        # Размещаем предмет в пределах зазора
+        return rng.randint(int(pipe_top + radius), int(pipe_bottom - radius))
+
+    # Если подходящей трубы нет — центр экрана
+    return HEIGHT // 2
 
 class Coin:
-    def __init__(self, pipes):
-        self.radius = 10
-        self.x = WIDTH + 20
-        self.y = self.find_position(pipes)
-        self.collected = False
+    __slots__ = ("radius", "x", "y", "collected", "prev_x")
 
-    def find_position(self, pipes):
-        # Найти ближайшую трубу справа (где будет монета)
-        nearest_pipe = None
-        for pipe in pipes:
-            if pipe.x + pipe.width > WIDTH and (nearest_pipe is None or pipe.x < nearest_pipe.x):
-                nearest_pipe = pipe
+    def __init__(self, pipes, y=None):
+        self.spawn(pipes, y)
 
-        if nearest_pipe:
-            pipe_top = nearest_pipe.current_top_height
-            pipe_bottom = pipe_top + pipe_gap
-            # Размещаем монету в пределах зазора
-            return random.randint(int(pipe_top + self.radius), int(pipe_bottom - self.radius))
-
-        # Если подходящей трубы нет — центр экрана
-        return HEIGHT // 2
+    def spawn(self, pipes, y=None):
+        self.radius = COIN_RADIUS
+        self.x = WIDTH + 20
+        self.prev_x = self.x
+        self.y = gap_position(pipes, self.radius) if y is None else y
+        self.collected = False
 
     def update(self):
+        self.prev_x = self.x
         self.x -= pipe_speed
 
-    def draw(self, surface):
-        pygame.draw.circle(surface, YELLOW, (int(self.x), int(self.y)), self.radius)
-        pygame.draw.circle(surface, WHITE, (int(self.x - self.radius//3), int(self.y - self.radius//3)), self.radius//3)
+    def draw(self, surface, alpha=1.0):
+        return app.assets.blit(surface, app.assets.coin(self.radius), lerp(self.prev_x, self.x, alpha), self.y)
 
     def collides_with(self, bx, by, br):
-        dist = ((bx - self.x) ** 2 + (by - self.y) ** 2) ** 0.5
-        return dist < br + self.radius
+        return collision.circle_hit(bx, by, br, self.x, self.y, self.radius)
 
 class Heart:
-    def __init__(self, pipes):
-        self.radius = 12
-        self.x = WIDTH + 30
-        self.y = self.find_position(pipes)
-        self.collected = False
+    __slots__ = ("radius", "x", "y", "collected", "prev_x")
 
-    def find_position(self, pipes):
-        nearest_pipe = None
-        for pipe in pipes:
-            if pipe.x + pipe.width > WIDTH and (nearest_pipe is None or pipe.x < nearest_pipe.x):
-                nearest_pipe = pipe
+    def __init__(self, pipes, y=None):
+        self.spawn(pipes, y)
 
-        if nearest_pipe:
-            pipe_top = nearest_pipe.current_top_height
-            pipe_bottom = pipe_top + pipe_gap
-            return random.randint(int(pipe_top + self.radius), int(pipe_bottom - self.radius))
-
-        return HEIGHT // 2
+    def spawn(self, pipes, y=None):
+        self.radius = HEART_RADIUS
+        self.x = WIDTH + 30
+        self.prev_x = self.x
+        self.y = gap_position(pipes, self.radius) if y is None else y
+        self.collected = False
 
     def update(self):
+        self.prev_x = self.x
         self.x -= pipe_speed
 
-    def draw(self, surface):
-        draw_heart(surface, int(self.x), int(self.y), size=24)
+    def draw(self, surface, alpha=1.0):
+        return draw_heart(surface, int(lerp(self.prev_x, self.x, alpha)), int(self.y), size=24)
 
     def collides_with(self, bx, by, br):
-        dist = ((bx - self.x) ** 2 + (by - self.y) ** 2) ** 0.5
-        return dist < br + self.radius
+        return collision.circle_hit(bx, by, br, self.x, self.y, self.radius)
 
 class Cloud:
     def __init__(self):
-        self.x = random.randint(0, WIDTH)
-        self.y = random.randint(20, 100)
-        self.speed = random.uniform(0.2, 0.5)
-        self.size = random.randint(30, 60)
+        self.x = scenery_rng.randint(0, WIDTH)
+        self.y = scenery_rng.randint(20, 100)
+        self.speed = scenery_rng.uniform(0.2, 0.5)
+        self.size = scenery_rng.randint(30, 60)
+        self.prev_x = self.x
 
     def move(self):
+        self.prev_x = self.x
         self.x -= self.speed
         if self.x < -self.size * 3:
-            self.x = WIDTH + random.randint(50, 150)
-            self.y = random.randint(20, 100)
-            self.speed = random.uniform(0.2, 0.5)
-            self.size = random.randint(30, 60)
+            self.x = WIDTH + scenery_rng.randint(50, 150)
+            self.y = scenery_rng.randint(20, 100)
+            self.speed = scenery_rng.uniform(0.2, 0.5)
+            self.size = scenery_rng.randint(30, 60)
+            self.prev_x = self.x
 
-    def draw(self, surface):
-        x, y, s = int(self.x), int(self.y), self.size
-        pygame.draw.ellipse(surface, LIGHT_GRAY, (x, y + s//3, s * 2, s))
-        pygame.draw.ellipse(surface, LIGHT_GRAY, (x + s//3, y, s, s))
-        pygame.draw.ellipse(surface, LIGHT_GRAY, (x + s, y - s//3, s, s))
-        pygame.draw.ellipse(surface, LIGHT_GRAY, (x + s + s//2, y + s//4, s, s))
+    def draw(self, surface, alpha=1.0):
+        return app.assets.blit(surface, app.assets.cloud(self.size), lerp(self.prev_x, self.x, alpha), self.y)
 
-clouds = [Cloud() for _ in range(5)]
 
 class FallingStar:
     def __init__(self):
-        self.x = random.randint(0, WIDTH)
-        self.y = random.randint(-HEIGHT, 0)  # стартует выше экрана
-        self.length = random.randint(5, 15)
-        self.speed = random.uniform(2, 5)
+        self.x = scenery_rng.randint(0, WIDTH)
+        self.y = scenery_rng.randint(-HEIGHT, 0)  # стартует выше экрана
+        self.length = scenery_rng.randint(5, 15)
+        self.speed = scenery_rng.uniform(2, 5)
         self.color = STAR_COLOR
+        self.prev_y = self.y
 
     def update(self):
+        self.prev_y = self.y
         self.y += self.speed
         if self.y > HEIGHT:
-            self.x = random.randint(0, WIDTH)
-            self.y = random.randint(-HEIGHT, 0)
-            self.speed = random.uniform(2, 5)
-            self.length = random.randint(5, 15)
+            self.x = scenery_rng.randint(0, WIDTH)
+            self.y = scenery_rng.randint(-HEIGHT, 0)
+            self.speed = scenery_rng.uniform(2, 5)
+            self.length = scenery_rng.randint(5, 15)
+            self.prev_y = self.y
 
-    def draw(self, surface):
-        end_y = self.y + self.length
-        pygame.draw.line(surface, self.color, (self.x, self.y), (self.x, end_y), 2)
-falling_stars = [FallingStar() for _ in range(20)]  # 20 падающих звезд
+    def draw(self, surface, alpha=1.0):
+        y = lerp(self.prev_y, self.y, alpha)
+        return pygame.draw.line(surface, self.color, (self.x, y), (self.x, y + self.length), 2)
 
 bird_y = HEIGHT // 2
 bird_velocity = 0
@@ -306,214 +468,309 @@ hearts = []
 pipes = []
 coins = []
 
+pipe_pool = Pool(Pipe)
+coin_pool = Pool(Coin)
+heart_pool = Pool(Heart)
+
+def pipe_alive(pipe):
+    return pipe.x + pipe.width > 0
+
+def pickup_alive(item):
+    return item.x + item.radius > 0 and not item.collected
+
 def check_coin_collection():
     global score
-    for coin in coins:
-        if not coin.collected and coin.collides_with(bird_x, bird_y, BIRD_RADIUS):
-            coin.collected = True
-            score += 10
+    for coin in collision.circle_collisions(coins, bird_x, bird_y, BIRD_RADIUS, COIN_RADIUS):
+        coin.collected = True
+        score += 10
+
 def check_heart_collection():
     global lives
+    for heart in collision.circle_collisions(hearts, bird_x, bird_y, BIRD_RADIUS, HEART_RADIUS):
+        heart.collected = True
+        if lives < 3:
+            lives += 1
+
+def update_game(jump=False):
+    global bird_y, prev_bird_y, bird_velocity, score, lives, frame_count, course_distance
+    prev_y = prev_bird_y = bird_y
+    if jump:
+        bird_velocity = JUMP_STRENGTH
+    bird_velocity += GRAVITY
+    bird_y += bird_velocity
+
+    if course is not None:
+        spawn_course()
+    elif len(pipes) == 0 or pipes[-1].x < WIDTH - 200:
+        pipes.append(pipe_pool.acquire(WIDTH))
+
+    for pipe in pipes:
+        pipe.update()
+
+    compact(pipes, pipe_alive, pipe_pool)
+
+    if course is not None:
+        spawn_course_pickups(coins, coin_pool, 1, course.coin, COIN_SPAWN_DISTANCE)
+        spawn_course_pickups(hearts, heart_pool, 2, course.heart, HEART_SPAWN_DISTANCE)
+    elif len(coins) == 0 or coins[-1].x < WIDTH - 150:
+        coins.append(coin_pool.acquire(pipes))
+
+    if course is None and (len(hearts) == 0 or (hearts[-1].x < WIDTH - 400 and rng.random() < 0.01)):
+        hearts.append(heart_pool.acquire(pipes))
+
     for heart in hearts:
-        if not heart.collected and heart.collides_with(bird_x, bird_y, BIRD_RADIUS):
-            heart.collected = True
-            if lives < 3:
-                lives += 1
+        if not heart.collected:
+            heart.update()
 
-def main():
-    global hearts
-    global lives
-    global bird_y, bird_velocity, pipes, coins, score, frame_count
-    global pipe_gap, pipe_speed, menu, playing, game_over, highscore, is_night, difficulty_menu
-    global GRAVITY, JUMP_STRENGTH
+    compact(hearts, pickup_alive, heart_pool)
+    app.profiler.mark("update")
+    check_heart_collection()
+    app.profiler.mark("collision")
 
-    running = True
+    for coin in coins:
+        if not coin.collected:
+            coin.update()
 
-    while running:
-        clock.tick(FPS)
-
-        if is_night:
-            screen.fill(NIGHT_SKY)
-            for star in stars:
-                x, y, brightness, direction = star
-                color = (brightness, brightness, int(brightness * 0.8))
-                pygame.draw.circle(screen, color, (x, y), 2)
-                star[2] += direction * 2
-                if star[2] >= 255:
-                    star[2] = 255
-                    star[3] = -1
-                elif star[2] <= 150:
-                    star[2] = 150
-                    star[3] = 1
-            moon_x, moon_y = WIDTH - 70, 70
-            pygame.draw.circle(screen, MOON_COLOR, (moon_x, moon_y), 40)
-            pygame.draw.circle(screen, NIGHT_SKY, (moon_x + 15, moon_y - 10), 30)
-            for fstar in falling_stars:
-                fstar.update()
-                fstar.draw(screen)
+    compact(coins, pickup_alive, coin_pool)
+    app.profiler.mark("update")
+
+    check_coin_collection()
 
+    dead = False
+    hit = check_collision(bird_y, pipes, prev_y)
+    app.profiler.mark("collision")
+    if hit:
+        lives -= 1
+        if lives <= 0:
+            dead = True
         else:
-            screen.fill(BLUE)
-            pygame.draw.circle(screen, YELLOW, (WIDTH - 70, 70), 40)
-            draw_ground()
+            bird_y = prev_bird_y = HEIGHT // 2
+            bird_velocity = 0
+
+    for pipe in pipes:
+        if not pipe.passed and pipe.x + pipe.width < bird_x:
+            pipe.passed = True
+            score += 1
+
+    frame_count += 1
+    course_distance += pipe_speed
+    return dead
+
+def draw_game(alpha=1.0):
+    # alpha — доля шага симуляции, прошедшая после последнего обновления
+    mark = app.renderer.mark
+    for pipe in pipes:
+        mark(pipe.draw(app.screen, alpha))
+    for heart in hearts:
+        if not heart.collected:
+            mark(heart.draw(app.screen, alpha))
+    for coin in coins:
+        if not coin.collected:
+            mark(coin.draw(app.screen, alpha))
+
+    mark(draw_bird(bird_x, lerp(prev_bird_y, bird_y, alpha)))
+    app.profiler.mark("draw")
+
+    score_label = app.assets.text(app.font, f"Score: {score}", BLACK)
+    mark(app.screen.blit(score_label, (10, 10)))
+
+    for i in range(lives):
+        mark(draw_heart(app.screen, 10 + i * 30, 50, 20))
+
+def finish_recording():
+    global recorder
+    if recorder is not None and RECORD_DIR:
+        os.makedirs(RECORD_DIR, exist_ok=True)
+        path = os.path.join(RECORD_DIR, f"{recorder.seed}_{recorder.difficulty}.flr")
+        save_recording(path, recorder.finish(score))
+    recorder = None
+
+def update_scenery():
+    for cloud in app.clouds:
+        cloud.move()
+    app.profiler.mark("clouds")
+    if is_night:
+        app.background.twinkle()
+        for fstar in app.falling_stars:
+            fstar.update()
+        app.profiler.mark("sky")
+
+def draw_scenery(alpha=1.0):
+    mark = app.renderer.mark
+    if is_night:
+        # Звёзды уже впечатаны в фон, их области лишь перевыводятся на экран
+        for rect in app.background.star_rects:
+            mark(rect)
+        for fstar in app.falling_stars:
+            mark(fstar.draw(app.screen, alpha))
+    app.profiler.mark("sky")
+    for cloud in app.clouds:
+        mark(cloud.draw(app.screen, alpha))
+    app.profiler.mark("clouds")
+
+def main():
+    global menu, playing, game_over, highscore, leaderboard, is_night, difficulty_menu, recorder, practice
+    global autopilot_enabled
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+    app.screen  # окно нужно до первого опроса событий
+    highscore = app.score_store.best(difficulty)
+    running = True
+    accumulator = 0.0
+    # Отметки времени нажатий, ещё не применённых в симуляции
+    jumps = []
+
+    while running:
+        accumulator += min(app.clock.tick(RENDER_FPS) / 1000, MAX_FRAME_TIME)
+        app.profiler.begin_frame()
+
+        for stamp, event in app.clock.drain():
+            if OUTPUT and event.type == pygame.WINDOWSIZECHANGED:
+                app.display.resized()
+            if event.type == pygame.QUIT or (OUTPUT and event.type == pygame.WINDOWCLOSE):
+                app.profiler.close()
+                app.score_store.close()
+                app.latency.close()
+                if CAPTURE_FILE:
+                    app.capture.close()
                 pygame.quit()
                 sys.exit()
 
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_n:
                     is_night = not is_night
+                    app.assets.set_theme("night" if is_night else "day")
+                elif event.key == pygame.K_F3:
+                    app.profiler.toggle()
 
             if difficulty_menu:
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    mx, my = pygame.mouse.get_pos()
-                    if easy_button.collidepoint(mx, my):
-                        pipe_speed = 2.5
-                        pipe_gap = 250
-                        GRAVITY = 0.4
-                        JUMP_STRENGTH = -9
-                        difficulty_menu = False
-                        menu = False
-                        playing = True
-                        reset_game()
-                        pipes.clear()
-                        coins.clear()
-                        hearts.clear()
-                    elif normal_button.collidepoint(mx, my):
-                        pipe_speed = 3
-                        pipe_gap = 200
-                        GRAVITY = 0.5
-                        JUMP_STRENGTH = -10
-                        difficulty_menu = False
-                        menu = False
-                        playing = True
-                        reset_game()
-                        pipes.clear()
-                        coins.clear()
-                        hearts.clear()
-                    elif hard_button.collidepoint(mx, my):
-                        pipe_speed = 4.5
-                        pipe_gap = 160
-                        GRAVITY = 0.6
-                        JUMP_STRENGTH = -11
-                        difficulty_menu = False
-                        menu = False
-                        playing = True
-                        reset_game()
-                        pipes.clear()
-                        coins.clear()
-                        hearts.clear()
+                    mx, my = app.mouse_pos()
+                    for name, button in (("easy", easy_button), ("normal", normal_button), ("hard", hard_button)):
+                        if button.collidepoint(mx, my):
+                            start_game(name)
+                            jumps.clear()
+                            app.rewind.clear()
+                            practice = False
+                            autopilot_enabled = False
+                            recorder = Recorder(game_seed, name)
+                            difficulty_menu = False
+                            menu = False
+                            playing = True
+                            break
 
             elif menu:
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    mx, my = pygame.mouse.get_pos()
+                    mx, my = app.mouse_pos()
                     if start_button.collidepoint(mx, my):
                         difficulty_menu = True
                         menu = False
 
             elif playing:
-                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                    bird_velocity = JUMP_STRENGTH
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE and not autopilot_enabled:
+                    jumps.append(stamp)
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_a:
+                    autopilot_enabled = not autopilot_enabled
+                    practice = True
+                    jumps.clear()
 
             elif game_over:
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
                     difficulty_menu = True
                     game_over = False
 
-        for cloud in clouds:
-            cloud.move()
-            cloud.draw(screen)
+            if (playing or game_over) and event.type == pygame.KEYDOWN and event.key == pygame.K_BACKSPACE:
+                if app.rewind.restore(REWIND_FRAMES) is not None:
+                    jumps.clear()
+                    recorder = None
+                    practice = True
+                    playing = True
+                    game_over = False
+
+        app.profiler.mark("events")
+
+        # Фиксированный шаг: догоняем накопленное время, но не больше MAX_CATCH_UP_STEPS шагов.
+        # Шаг k покрывает время до frame_start + (k + 1) * SIM_DT; нажатие применяется в первом
+        # шаге, закончившемся после него, а более поздние — в последнем шаге этого кадра
+        frame_start = app.clock.last - accumulator
+        steps = 0
+        # Бюджет автопилота — на кадр, при догоне он делится между шагами
+        frame_steps = min(int(accumulator / SIM_DT), MAX_CATCH_UP_STEPS)
+        while accumulator >= SIM_DT and steps < MAX_CATCH_UP_STEPS:
+            update_scenery()
+            if playing:
+                if autopilot_enabled:
+                    jump = app.autopilot.decide(AUTOPILOT_BUDGET / frame_steps)
+                else:
+                    last_step = accumulator < 2 * SIM_DT or steps == MAX_CATCH_UP_STEPS - 1
+                    jump = bool(jumps) and (last_step or jumps[0] < frame_start + (steps + 1) * SIM_DT)
+                    if jump:
+                        app.latency.applied(jumps.pop(0))
+                if recorder is not None:
+                    recorder.record(jump)
+                if update_game(jump):
+                    playing = False
+                    game_over = True
+                    jumps.clear()
+                    finish_recording()
+                    if not practice:
+                        app.score_store.submit(difficulty, score)
+                    highscore = app.score_store.best(difficulty)
+                    leaderboard = app.score_store.top(difficulty)[:5]
+                else:
+                    app.rewind.capture()
+                app.profiler.mark("update")
+            accumulator -= SIM_DT
+            steps += 1
+        if steps == MAX_CATCH_UP_STEPS:
+            accumulator = 0.0
+        alpha = accumulator / SIM_DT
+
+        mark = app.renderer.mark
+        app.renderer.set_background(get_background(is_night))
+        app.renderer.begin()
+        app.profiler.mark("sky")
+        draw_scenery(alpha)
 
         if difficulty_menu:
-            title = font.render("Выберите уровень сложности", True, BLACK)
-            screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//3))
-            easy_button = draw_button("Простой", WIDTH//2 - 195, HEIGHT//2, 120, 50, GREEN, WHITE)
-            normal_button = draw_button("Нормальный", WIDTH//2 - 70, HEIGHT//2, 140, 50, ORANGE, WHITE)
-            hard_button = draw_button("Сложный", WIDTH//2 + 75, HEIGHT//2, 120, 50, RED, WHITE)
-            info = small_font.render("Нажмите N для смены День/Ночь", True, BLACK)
-            screen.blit(info, (WIDTH//2 - info.get_width()//2, HEIGHT//2 + 70))
+            title = app.assets.text(app.font, "Выберите уровень сложности", BLACK)
+            mark(app.screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//3)))
+            easy_button = mark(draw_button("Простой", WIDTH//2 - 195, HEIGHT//2, 120, 50, GREEN, WHITE))
+            normal_button = mark(draw_button("Нормальный", WIDTH//2 - 70, HEIGHT//2, 140, 50, ORANGE, WHITE))
+            hard_button = mark(draw_button("Сложный", WIDTH//2 + 75, HEIGHT//2, 120, 50, RED, WHITE))
+            info = app.assets.text(app.small_font, "Нажмите N для смены День/Ночь", BLACK)
+            mark(app.screen.blit(info, (WIDTH//2 - info.get_width()//2, HEIGHT//2 + 70)))
 
         elif menu:
-            title = font.render("Flappy Bird", True, BLACK)
-            screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//3))
-            start_button = draw_button("Start Game", WIDTH//2 - 100, HEIGHT//2, 200, 50, GREEN, WHITE)
-            info = small_font.render("Нажмите N для смены День/Ночь", True, BLACK)
-            screen.blit(info, (WIDTH//2 - info.get_width()//2, HEIGHT//2 + 70))
+            title = app.assets.text(app.font, "Flappy Bird", BLACK)
+            mark(app.screen.blit(title, (WIDTH//2 - title.get_width()//2, HEIGHT//3)))
+            start_button = mark(draw_button("Start Game", WIDTH//2 - 100, HEIGHT//2, 200, 50, GREEN, WHITE))
+            info = app.assets.text(app.small_font, "Нажмите N для смены День/Ночь", BLACK)
+            mark(app.screen.blit(info, (WIDTH//2 - info.get_width()//2, HEIGHT//2 + 70)))
 
         elif playing:
-            bird_velocity += GRAVITY
-            bird_y += bird_velocity
-
-            if len(pipes) == 0 or pipes[-1].x < WIDTH - 200:
-                pipes.append(Pipe(WIDTH))
-
-            for pipe in pipes:
-                pipe.update()
-                pipe.draw(screen)
-
-            pipes = [p for p in pipes if p.x + p.width > 0]
-
-            if len(coins) == 0 or coins[-1].x < WIDTH - 150:
-                coins.append(Coin(pipes))
-
-            if len(hearts) == 0 or (hearts[-1].x < WIDTH - 400 and random.random() < 0.01):
-                hearts.append(Heart(pipes))
-
-            for heart in hearts:
-                if not heart.collected:
-                    heart.update()
-                    heart.draw(screen)
-
-            hearts = [h for h in hearts if h.x + h.radius > 0 and not h.collected]
-            check_heart_collection()
-
-            for coin in coins:
-                if not coin.collected:
-                    coin.update()
-                    coin.draw(screen)
-
-            coins = [c for c in coins if c.x + c.radius > 0 and not c.collected]
-
-            check_coin_collection()
-
-            draw_bird(bird_x, bird_y)
-
-            score_label = font.render(f"Score: {score}", True, BLACK)
-            screen.blit(score_label, (10, 10))
-
-            for i in range(lives):
-                draw_heart(screen, 10 + i * 30, 50, 20)
-
-            if check_collision(bird_y, pipes):
-                lives -= 1
-                if lives <= 0:
-                    playing = False
-                    game_over = True
-                    if score > highscore:
-                        highscore = score
-                        save_highscore(highscore)
-                else:
-                    bird_y = HEIGHT // 2
-                    bird_velocity = 0
-
-            for pipe in pipes:
-                if not pipe.passed and pipe.x + pipe.width < bird_x:
-                    pipe.passed = True
-                    score += 1
+            draw_game(alpha)
 
         elif game_over:
-            over_label = font.render("Game Over", True, RED)
-            screen.blit(over_label, (WIDTH//2 - over_label.get_width()//2, HEIGHT//3))
-            score_label = small_font.render(f"Score: {score}", True, BLACK)
-            screen.blit(score_label, (WIDTH//2 - score_label.get_width()//2, HEIGHT//3 + 60))
-            highscore_label = small_font.render(f"Highscore: {highscore}", True, BLACK)
-            screen.blit(highscore_label, (WIDTH//2 - highscore_label.get_width()//2, HEIGHT//3 + 90))
-            restart_label = small_font.render("Press SPACE to restart", True, BLACK)
-            screen.blit(restart_label, (WIDTH//2 - restart_label.get_width()//2, HEIGHT//3 + 140))
-
-        pygame.display.update()
+            over_label = app.assets.text(app.font, "Game Over", RED)
+            mark(app.screen.blit(over_label, (WIDTH//2 - over_label.get_width()//2, HEIGHT//3)))
+            score_label = app.assets.text(app.small_font, f"Score: {score}", BLACK)
+            mark(app.screen.blit(score_label, (WIDTH//2 - score_label.get_width()//2, HEIGHT//3 + 60)))
+            highscore_label = app.assets.text(app.small_font, f"Highscore: {highscore}", BLACK)
+            mark(app.screen.blit(highscore_label, (WIDTH//2 - highscore_label.get_width()//2, HEIGHT//3 + 90)))
+            restart_label = app.assets.text(app.small_font, "Press SPACE to restart", BLACK)
+            mark(app.screen.blit(restart_label, (WIDTH//2 - restart_label.get_width()//2, HEIGHT//3 + 140)))
+            for i, (best, when) in enumerate(leaderboard):
+                entry = app.assets.text(app.small_font, f"{i + 1}. {best}", BLACK)
+                mark(app.screen.blit(entry, (WIDTH//2 - entry.get_width()//2, HEIGHT//3 + 190 + i * 28)))
+
+        mark(app.profiler.draw(app.screen, app.profiler_font))
+        app.profiler.mark("hud")
+        app.renderer.present()
+        app.profiler.pushed(app.renderer.pixels_pushed)
+        app.latency.presented()
+        if CAPTURE_FILE:
+            app.capture.capture(app.screen)
+        app.profiler.mark("display")
 
 if __name__ == "__main__":
     main()
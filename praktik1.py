@@ -1,8 +1,30 @@
-python
+import sys
+
 import numpy as np
 import pandas as pd
+import matplotlib
+
+# python praktik1.py --report каталог — без окон: бэкенд Agg, графики пишутся в PNG и SVG
+REPORT_DIR = None
+if "--report" in sys.argv:
+    if sys.argv.index("--report") + 1 >= len(sys.argv):
+        sys.exit("usage: praktik1.py [--report каталог]")
+    REPORT_DIR = sys.argv[sys.argv.index("--report") + 1]
+if REPORT_DIR:
+    matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 
+from plot_report import decimate, save_figure
+
+
+def show(name):
+    if REPORT_DIR:
+        save_figure(plt.gcf(), REPORT_DIR, name)
+        plt.close()
+    else:
+        plt.show()
+
+
 #🟥 1. Получение Dataset (генерация случайных чисел)
 np.random.seed(42)  # для воспроизводимости
 data = np.random.randint(-10000, 10001, size=1000)
@@ -25,33 +47,36 @@ print(f"Среднеквадратическое отклонение: {std_dev:
 #🟥 4. Визуализация данных
 #🟥 Линейный график
 plt.figure(figsize=(10, 4))
-plt.plot(series, label='Исходные данные')
+# Длинный ряд прореживается MinMaxLTTB до пары точек на пиксель — картинка та же
+plt.plot(*decimate(series.to_numpy()), label='Исходные данные')
 plt.title('Линейный график данных')
 plt.xlabel('Индекс')
 plt.ylabel('Значение')
 plt.legend()
-plt.show()
+show('line')
 
 #🟥 Гистограмма с округлением до сотен по математическому правилу
 rounded_data = np.round(series / 100).astype(int) * 100
 plt.figure(figsize=(10, 4))
-plt.hist(roundeddata, bins=range(roundeddata.min(), rounded_data.max() + 100, 100), edgecolor='black')
+plt.hist(rounded_data, bins=range(rounded_data.min(), rounded_data.max() + 100, 100), edgecolor='black')
 plt.title('Гистограмма округленных данных')
 plt.xlabel('Значение (округлено до сотен)')
 plt.ylabel('Частота')
-plt.show()
+show('hundreds')
 
 #🟥 5. Создание DataFrame с добавлением отсортированных колонок
 df = pd.DataFrame({'Исходный Series': series})
-df['Отсортированный по возрастанию'] = df['Исходный Series'].sortvalues().resetindex(drop=True)
-df['Отсортированный по убыванию'] = df['Исходный Series'].sortvalues(ascending=False).resetindex(drop=True)
+# Одна сортировка: убывающий порядок — тот же массив задом наперёд
+ascending = np.sort(series.to_numpy())
+df['Отсортированный по возрастанию'] = ascending
+df['Отсортированный по убыванию'] = ascending[::-1]
 
 #🟥 6. Визуализация отсортированных данных
 plt.figure(figsize=(10, 4))
-plt.plot(df['Отсортированный по возрастанию'], label='По возрастанию')
-plt.plot(df['Отсортированный по убыванию'], label='По убыванию')
+plt.plot(*decimate(df['Отсортированный по возрастанию'].to_numpy()), label='По возрастанию')
+plt.plot(*decimate(df['Отсортированный по убыванию'].to_numpy()), label='По убыванию')
 plt.title('Сравнение отсортированных данных')
 plt.xlabel('Индекс')
 plt.ylabel('Значение')
 plt.legend()
-plt.show()
\ No newline at end of file
+show('sorted')
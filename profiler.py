@@ -0,0 +1,210 @@
+import struct
+import sys
+import time
+
+PHASES = ("events", "sky", "clouds", "update", "collision", "draw", "hud", "display")
+WINDOW = 600
+OVERLAY_REFRESH = 30
+BUDGET_MS = 1000.0 / 60
+
+MAGIC = b"FLPF"
+# magic, число фаз; дальше имена фаз через запятую и кадры: frame_ms + фазы в float32.
+# frame_ms — время от кадра до кадра вместе с ожиданием в clock.tick; работа кадра — сумма фаз
+FILE_HEADER = struct.Struct("<4sB")
+
+PHASE_COLORS = ((120, 120, 255), (80, 200, 255), (200, 200, 200), (80, 220, 80),
+                (255, 80, 80), (255, 200, 0), (255, 140, 0), (200, 80, 255))
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    i = min(int(q * len(sorted_values)), len(sorted_values) - 1)
+    return sorted_values[i]
+
+
+class FrameProfiler:
+    # mark(name) относит время с предыдущей отметки к фазе name; фазы суммируются за кадр.
+    # Кадр меряется двояко: work — сумма фаз, то есть время до последней отметки после вывода,
+    # frame — от начала кадра до начала следующего, с ожиданием ограничителя FPS
+    def __init__(self, window=WINDOW, output=None):
+        self.window = window
+        self.index = {name: i for i, name in enumerate(PHASES)}
+        self.current = [0.0] * len(PHASES)
+        self.samples = [[0.0] * window for _ in PHASES]
+        self.frame_samples = [0.0] * window
+        self.work_samples = [0.0] * window
+        # Сколько пикселей кадр вывел на экран (DirtyRenderer.present) — только для оверлея, в файл не пишется
+        self.pixel_samples = [0] * window
+        self.pixels = 0
+        self.count = 0
+        self.frame_start = None
+        self.last = time.perf_counter()
+        self.visible = False
+        self.overlay = None
+        self.writer = None
+        self.file = None
+        if output:
+            self.open(output)
+
+    def open(self, path):
+        if path.endswith(".csv"):
+            import csv
+            self.file = open(path, "w", newline="")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(("frame", "frame_ms") + PHASES)
+        else:
+            self.file = open(path, "wb")
+            names = ",".join(PHASES).encode()
+            self.file.write(FILE_HEADER.pack(MAGIC, len(PHASES)) + struct.pack("<H", len(names)) + names)
+            self.row = struct.Struct("<" + "f" * (len(PHASES) + 1))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.writer = None
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.end_frame(now)
+        self.frame_start = now
+        self.last = now
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.current[self.index[name]] += (now - self.last) * 1000
+        self.last = now
+
+    def pushed(self, pixels):
+        self.pixels = pixels
+
+    def end_frame(self, now):
+        slot = self.count % self.window
+        frame_ms = (now - self.frame_start) * 1000
+        self.frame_samples[slot] = frame_ms
+        self.pixel_samples[slot] = self.pixels
+        self.pixels = 0
+        current = self.current
+        self.work_samples[slot] = sum(current)
+        for i in range(len(current)):
+            self.samples[i][slot] = current[i]
+        if self.file is not None:
+            if self.writer is not None:
+                self.writer.writerow([self.count, f"{frame_ms:.4f}"] + [f"{v:.4f}" for v in current])
+            else:
+                self.file.write(self.row.pack(frame_ms, *current))
+        for i in range(len(current)):
+            current[i] = 0.0
+        self.count += 1
+        if self.visible and self.count % OVERLAY_REFRESH == 0:
+            self.overlay = None
+
+    def _filled(self, values):
+        return sorted(values[:min(self.count, self.window)])
+
+    def stats(self):
+        # p50/p95/p99 по скользящему окну
+        result = {}
+        for name, values in (("work", self.work_samples), ("frame", self.frame_samples),
+                             ("pixels", self.pixel_samples)):
+            values = self._filled(values)
+            result[name] = tuple(percentile(values, q) for q in (0.5, 0.95, 0.99))
+        for name, values in zip(PHASES, self.samples):
+            values = self._filled(values)
+            result[name] = tuple(percentile(values, q) for q in (0.5, 0.95, 0.99))
+        return result
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.overlay = None
+
+    def _render_overlay(self, font, area):
+        import pygame
+
+        stats = self.stats()
+        width, row, bar = 230, 16, 120
+        surface = pygame.Surface((width, row * (len(PHASES) + 4) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        p50, p95, p99 = stats["work"]
+        surface.blit(font.render(f"work {p50:.1f}/{p95:.1f}/{p99:.1f} ms", True, (255, 255, 255)), (4, 4))
+        p50, p95, p99 = stats["frame"]
+        surface.blit(font.render(f"frame {p50:.1f}/{p95:.1f}/{p99:.1f} ms", True, (200, 200, 200)), (4, 4 + row))
+        scale = bar / BUDGET_MS
+        for i, name in enumerate(PHASES):
+            y = 4 + row * (i + 2)
+            p50, p95, p99 = stats[name]
+            surface.blit(font.render(name, True, (255, 255, 255)), (4, y))
+            # Светлая полоса — p95, насыщенная — медиана; масштаб — бюджет кадра
+            pygame.draw.rect(surface, (90, 90, 90), (70, y + 3, min(int(p95 * scale), bar), row - 6))
+            pygame.draw.rect(surface, PHASE_COLORS[i], (70, y + 3, min(int(p50 * scale), bar), row - 6))
+            surface.blit(font.render(f"{p95:.2f}", True, (255, 255, 255)), (70 + bar + 6, y))
+        y = 4 + row * (len(PHASES) + 2)
+        pygame.draw.line(surface, (255, 0, 0), (70 + bar, 4 + row * 2), (70 + bar, y), 1)
+        surface.blit(font.render(f"{BUDGET_MS:.1f} ms budget, {min(self.count, self.window)} frames", True,
+                                 (200, 200, 200)), (4, y))
+        # Доля экрана, выведенная за кадр: у грязных прямоугольников она мала, у полной перерисовки — 100%
+        p50, p95, p99 = (p / area for p in stats["pixels"])
+        surface.blit(font.render(f"pixels {p50:.0%}/{p95:.0%}/{p99:.0%} of screen", True, (200, 200, 200)),
+                     (4, y + row))
+        return surface
+
+    def draw(self, surface, font, x=None, y=4):
+        if not self.visible:
+            return None
+        if self.overlay is None:
+            self.overlay = self._render_overlay(font, surface.get_width() * surface.get_height())
+        if x is None:
+            x = surface.get_width() - self.overlay.get_width() - 4
+        return surface.blit(self.overlay, (x, y))
+
+
+def load_samples(path):
+    # Возвращает имена фаз и строки (frame_ms, фазы...) из CSV или бинарного файла
+    if path.endswith(".csv"):
+        import csv
+        with open(path, newline="") as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            return tuple(header[2:]), [tuple(float(v) for v in r[1:]) for r in reader]
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, count = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a profile file")
+    offset = FILE_HEADER.size
+    (length,) = struct.unpack_from("<H", data, offset)
+    offset += 2
+    phases = tuple(data[offset:offset + length].decode().split(","))
+    offset += length
+    row = struct.Struct("<" + "f" * (count + 1))
+    usable = (len(data) - offset) // row.size * row.size
+    return phases, list(row.iter_unpack(data[offset:offset + usable]))
+
+
+def summarize(path):
+    # work выводится из фаз, поэтому есть и у файлов, записанных до его появления
+    phases, rows = load_samples(path)
+    columns = ("frame",) + phases
+    result = {"work": tuple(percentile(sorted(sum(r[1:]) for r in rows), q) for q in (0.5, 0.95, 0.99))}
+    for i, name in enumerate(columns):
+        values = sorted(r[i] for r in rows)
+        result[name] = tuple(percentile(values, q) for q in (0.5, 0.95, 0.99))
+    return len(rows), result
+
+
+if __name__ == "__main__":
+    # python profiler.py старый.csv новый.bin — сравнение p50/p95/p99 по фазам
+    summaries = [(path, *summarize(path)) for path in sys.argv[1:]]
+    for path, count, _ in summaries:
+        print(f"{path}: {count} frames")
+    names = []
+    for _, _, result in summaries:
+        names += [n for n in result if n not in names]
+    for name in names:
+        cells = []
+        for _, _, result in summaries:
+            p50, p95, p99 = result.get(name, (0.0, 0.0, 0.0))
+            cells.append(f"{p50:7.3f} {p95:7.3f} {p99:7.3f}")
+        print(f"{name:10s} " + " | ".join(cells))
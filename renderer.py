@@ -0,0 +1,53 @@
+import pygame
+
+
+class DirtyRenderer:
+    def __init__(self, screen, full_repaint=False, output=pygame.display):
+        # output — куда выводится кадр: модуль pygame.display или display.ScaledDisplay
+        self.screen = screen
+        self.output = output
+        self.screen_rect = screen.get_rect()
+        self.full_repaint = full_repaint
+        self.background = None
+        self.dirty = []
+        self.previous = []
+        self.force_full = True
+        self.pixels_pushed = 0
+
+    def set_background(self, background):
+        # Новый фон (смена дня и ночи) требует одной полной перерисовки
+        if background is not self.background:
+            self.background = background
+            self.force_full = True
+
+    def invalidate(self):
+        self.force_full = True
+
+    def begin(self):
+        if self.full_repaint or self.force_full:
+            self.screen.blit(self.background, (0, 0))
+        else:
+            # Стираем то, что было нарисовано в прошлом кадре
+            for rect in self.previous:
+                self.screen.blit(self.background, rect, rect)
+
+    def mark(self, rect):
+        if rect and rect.width > 0 and rect.height > 0:
+            self.dirty.append(rect)
+        return rect
+
+    def present(self):
+        if self.full_repaint or self.force_full:
+            self.output.update()
+            pushed = self.screen_rect.width * self.screen_rect.height
+            self.force_full = False
+        else:
+            rects = [r.clip(self.screen_rect) for r in self.previous + self.dirty]
+            rects = [r for r in rects if r.width and r.height]
+            self.output.update(rects)
+            pushed = sum(r.width * r.height for r in rects)
+
+        self.previous, self.dirty = self.dirty, self.previous
+        self.dirty.clear()
+        self.pixels_pushed = pushed
+        return pushed
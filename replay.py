@@ -0,0 +1,139 @@
+import os
+import struct
+import sys
+import time
+import zlib
+
+from config import DIFFICULTIES
+
+MAGIC = b"FLPR"
+VERSION = 1
+# magic, версия, зерно, сложность, кадров, очки, кадр смерти
+HEADER = struct.Struct("<4sBQBIIi")
+DIFFICULTY_NAMES = list(DIFFICULTIES)
+
+
+def pack_bits(bits):
+    out = bytearray((len(bits) + 7) // 8)
+    for i, bit in enumerate(bits):
+        if bit:
+            out[i >> 3] |= 1 << (i & 7)
+    return bytes(out)
+
+
+def unpack_bits(data, count):
+    return [bool(data[i >> 3] >> (i & 7) & 1) for i in range(count)]
+
+
+class Recording:
+    def __init__(self, seed, difficulty, jumps, score, death_frame):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.jumps = jumps
+        self.score = score
+        self.death_frame = death_frame
+
+    def __repr__(self):
+        return (f"Recording(seed={self.seed}, difficulty={self.difficulty!r}, "
+                f"frames={len(self.jumps)}, score={self.score}, death_frame={self.death_frame})")
+
+
+class Recorder:
+    def __init__(self, seed, difficulty):
+        self.seed = seed
+        self.difficulty = difficulty
+        self.jumps = []
+
+    def record(self, jump):
+        self.jumps.append(bool(jump))
+
+    def finish(self, score):
+        return Recording(self.seed, self.difficulty, self.jumps, score, len(self.jumps) - 1)
+
+
+def dump_recording(rec):
+    header = HEADER.pack(MAGIC, VERSION, rec.seed, DIFFICULTY_NAMES.index(rec.difficulty),
+                         len(rec.jumps), rec.score, rec.death_frame)
+    return header + zlib.compress(pack_bits(rec.jumps), 9)
+
+
+def parse_recording(data):
+    magic, version, seed, difficulty, frames, score, death_frame = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a replay file")
+    jumps = unpack_bits(zlib.decompress(data[HEADER.size:]), frames)
+    return Recording(seed, DIFFICULTY_NAMES[difficulty], jumps, score, death_frame)
+
+
+def save_recording(path, rec):
+    with open(path, "wb") as f:
+        f.write(dump_recording(rec))
+
+
+def load_recording(path):
+    with open(path, "rb") as f:
+        return parse_recording(f.read())
+
+
+def replay(rec, render=False):
+    # Без кадрового лимита: clock.tick не вызывается вовсе
+    import praktik
+
+    praktik.start_game(rec.difficulty, rec.seed)
+    death_frame = -1
+    for frame, jump in enumerate(rec.jumps):
+        dead = praktik.update_game(jump)
+        if render:
+            praktik.app.renderer.set_background(praktik.get_background(praktik.is_night))
+            praktik.app.renderer.begin()
+            praktik.draw_game()
+            praktik.app.renderer.present()
+        if dead:
+            death_frame = frame
+            break
+    return praktik.score, death_frame
+
+
+def verify(rec, render=False):
+    score, death_frame = replay(rec, render)
+    return score == rec.score and death_frame == rec.death_frame, score, death_frame
+
+
+def _verify_file(path):
+    ok, score, death_frame = verify(load_recording(path))
+    return path, ok, score, death_frame
+
+
+def main(argv):
+    render = "--render" in argv
+    paths = [a for a in argv if not a.startswith("--")]
+    if not render:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    start = time.perf_counter()
+    if render or len(paths) < 2:
+        results = [(p, *verify(load_recording(p), render)) for p in paths]
+    else:
+        # Пакетная перепроверка: каждый процесс держит свою копию глобального состояния игры
+        # SDL перехватывает SIGTERM, поэтому пул закрываем штатно, а не через terminate()
+        from multiprocessing import Pool
+        pool = Pool()
+        try:
+            results = pool.map(_verify_file, paths, chunksize=16)
+        finally:
+            pool.close()
+            pool.join()
+    elapsed = time.perf_counter() - start
+
+    failed = 0
+    for path, ok, score, death_frame in results:
+        if not ok:
+            failed += 1
+            rec = load_recording(path)
+            print(f"{path}: MISMATCH score {score} != {rec.score} or death frame {death_frame} != {rec.death_frame}")
+    print(f"{len(results)} replays, {failed} mismatched, {elapsed:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,199 @@
+import os
+import struct
+import sys
+import time
+from array import array
+
+from config import FPS, WIDTH, DIFFICULTIES
+from profiler import percentile
+
+# Перемотка назад: после каждого шага симуляции состояние забега упаковывается в строку байт
+# и кладётся в кольцо на HISTORY_SECONDS секунд, но не больше BUDGET байт
+HISTORY_SECONDS = 10
+BUDGET = 1024 * 1024
+
+# кадр, очки, жизни, y птицы, прошлый y, скорость, пройдено по трассе, следующие номера трассы,
+# число труб, монет и сердец
+HEADER = struct.Struct("<IIbdddd3IBBB")
+# x, текущий и прошлый верх, пройдена; базовый верх, цвет, амплитуда, скорость и фаза колебаний
+PIPE_RECORD = struct.Struct("<ddd?hBBdd")
+# x, y, собран
+PICKUP_RECORD = struct.Struct("<dh?")
+
+
+def save_state(game):
+    # prev_x не хранится: после шага у всех объектов в списках prev_x == x + pipe_speed
+    parts = [HEADER.pack(game.frame_count, game.score, game.lives, game.bird_y, game.prev_bird_y,
+                         game.bird_velocity, game.course_distance, *game.course_next,
+                         len(game.pipes), len(game.coins), len(game.hearts))]
+    colors = game.PIPE_COLORS
+    for pipe in game.pipes:
+        parts.append(PIPE_RECORD.pack(pipe.x, pipe.current_top_height, pipe.prev_top, pipe.passed,
+                                      pipe.top_height, colors.index(pipe.color), pipe.move_amplitude,
+                                      pipe.move_speed, pipe.move_offset))
+    for item in game.coins:
+        parts.append(PICKUP_RECORD.pack(item.x, item.y, item.collected))
+    for item in game.hearts:
+        parts.append(PICKUP_RECORD.pack(item.x, item.y, item.collected))
+    return b"".join(parts)
+
+
+def load_state(game, blob):
+    from pools import release_all
+
+    (game.frame_count, game.score, game.lives, game.bird_y, game.prev_bird_y, game.bird_velocity,
+     game.course_distance, *course_next, pipe_count, coin_count, heart_count) = HEADER.unpack_from(blob)
+    game.course_next[:] = course_next
+    speed = game.pipe_speed
+    offset = HEADER.size
+
+    release_all(game.pipes, game.pipe_pool)
+    for _ in range(pipe_count):
+        x, top, prev_top, passed, *spec = PIPE_RECORD.unpack_from(blob, offset)
+        offset += PIPE_RECORD.size
+        pipe = game.pipe_pool.acquire(x, (x, *spec))
+        pipe.current_top_height = top
+        pipe.prev_top = prev_top
+        pipe.prev_x = x + speed
+        pipe.passed = passed
+        game.pipes.append(pipe)
+
+    for items, pool, count in ((game.coins, game.coin_pool, coin_count),
+                               (game.hearts, game.heart_pool, heart_count)):
+        release_all(items, pool)
+        for _ in range(count):
+            x, y, collected = PICKUP_RECORD.unpack_from(blob, offset)
+            offset += PICKUP_RECORD.size
+            item = pool.acquire(game.pipes, y)
+            item.x = x
+            item.prev_x = x + speed
+            item.collected = collected
+            items.append(item)
+
+
+class Rewind:
+    # Кольцо снимков. Ключ вихря Мерсенна (624 слова, 2,5 КБ) — основная часть состояния ГСЧ, но
+    # он меняется раз в 624 выданных слова; снимок хранит позицию в ключе и ссылку на общий ключ,
+    # сам ключ копируется только когда сменился. Восстановление — одна распаковка, без досимуляции
+    def __init__(self, game, seconds=HISTORY_SECONDS, budget=BUDGET):
+        self.game = game
+        self.capacity = int(seconds * FPS)
+        self.budget = budget
+        self.slots = [None] * self.capacity
+        self.capture_times = [0.0] * 600
+        self.captures = 0
+        self.clear()
+
+    def clear(self):
+        for i in range(self.capacity):
+            self.slots[i] = None
+        self.head = 0
+        self.count = 0
+        self.bytes = 0
+        self.words = None
+        self.index = None
+
+    def _evict(self):
+        oldest = (self.head - self.count) % self.capacity
+        self.bytes -= self.slots[oldest][3]
+        self.slots[oldest] = None
+        self.count -= 1
+
+    def capture(self):
+        start = time.perf_counter()
+        blob = save_state(self.game)
+        version, key, gauss = self.game.rng.getstate()
+        index = key[-1]
+        size = len(blob)
+        # Ключ пересчитывается, когда позиция доходит до конца, — позиция при этом падает.
+        # За шаг игра берёт из ГСЧ единицы слов, так что пропустить смену ключа нельзя
+        if self.words is None or index < self.index:
+            self.words = array("I", key)
+            self.words.pop()
+            size += len(self.words) * self.words.itemsize
+        self.index = index
+        if self.count == self.capacity:
+            self._evict()
+        while self.count and self.bytes + size > self.budget:
+            self._evict()
+        self.slots[self.head] = (self.game.frame_count, blob, self.words, size, index)
+        self.head = (self.head + 1) % self.capacity
+        self.count += 1
+        self.bytes += size
+        self.capture_times[self.captures % len(self.capture_times)] = time.perf_counter() - start
+        self.captures += 1
+
+    def restore(self, frames_back):
+        # Вернуть состояние на frames_back снимков назад (0 — последний); более новые снимки
+        # отбрасываются, так что повторная перемотка идёт дальше в прошлое. Возвращает кадр или None
+        if not self.count:
+            return None
+        frames_back = min(frames_back, self.count - 1)
+        for _ in range(frames_back):
+            self.head = (self.head - 1) % self.capacity
+            self.bytes -= self.slots[self.head][3]
+            self.slots[self.head] = None
+            self.count -= 1
+        frame, blob, words, size, index = self.slots[(self.head - 1) % self.capacity]
+        load_state(self.game, blob)
+        self.game.rng.setstate((3, tuple(words) + (index,), None))
+        self.words = words
+        self.index = index
+        return frame
+
+    def stats(self):
+        times = sorted(self.capture_times[:min(self.captures, len(self.capture_times))])
+        return {"frames": self.count, "bytes": self.bytes,
+                "bytes_per_second": self.bytes / self.count * FPS if self.count else 0.0,
+                "capture_p50": percentile(times, 0.5) * 1e6, "capture_p99": percentile(times, 0.99) * 1e6}
+
+
+def _self_check(frames=3000, seed=3):
+    # Перемотка на 1 кадр, секунду и всю историю с досимуляцией тех же прыжков должна давать
+    # те же снимки байт в байт; заодно замеры снимка, восстановления и памяти на секунду
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import praktik
+    from pools import autopilot
+
+    rows = []
+    ok = True
+    for difficulty in DIFFICULTIES:
+        for course in (False, True):
+            if course:
+                praktik.start_course(difficulty, seed, WIDTH * 10)
+            else:
+                praktik.start_game(difficulty, seed)
+            rewind = Rewind(praktik)
+            jumps = {}
+            saved = {}
+            for _ in range(frames):
+                jump = autopilot(praktik)
+                jumps[praktik.frame_count] = jump
+                if praktik.update_game(jump):
+                    break
+                rewind.capture()
+                saved[praktik.frame_count] = save_state(praktik), praktik.rng.getstate()
+            end = max(saved)
+            stats = rewind.stats()
+            restore_times = []
+            for back in (1, FPS, rewind.count - 1):
+                start = time.perf_counter()
+                frame = rewind.restore(back)
+                restore_times.append(time.perf_counter() - start)
+                ok &= (save_state(praktik), praktik.rng.getstate()) == saved[frame]
+                while praktik.frame_count < end:
+                    praktik.update_game(jumps[praktik.frame_count])
+                    rewind.capture()
+                    ok &= (save_state(praktik), praktik.rng.getstate()) == saved[praktik.frame_count]
+            rows.append((difficulty, course, end, stats, max(restore_times)))
+    return ok, rows
+
+
+if __name__ == "__main__":
+    ok, rows = _self_check()
+    for difficulty, course, end, s, restore_time in rows:
+        print(f"{difficulty:6s} {'трасса' if course else 'ГСЧ   '} кадров {end:5d}: снимок p50 {s['capture_p50']:.1f} мкс, "
+              f"p99 {s['capture_p99']:.1f} мкс; восстановление {restore_time * 1e6:.0f} мкс; "
+              f"{s['frames']} снимков, {s['bytes'] / 1024:.1f} КБ, {s['bytes_per_second'] / 1024:.1f} КБ на секунду")
+    print("перемотка точна" if ok else "перемотка РАСХОДИТСЯ")
+    sys.exit(0 if ok else 1)
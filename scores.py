@@ -0,0 +1,260 @@
+import atexit
+import heapq
+import json
+import os
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from config import DIFFICULTIES
+
+DIFFICULTY_NAMES = list(DIFFICULTIES)
+TOP_N = 10
+SNAPSHOT_EVERY = 256
+# Как часто фоновый поток дочитывает журнал, когда своих записей нет
+REFRESH_SECONDS = 1.0
+
+MAGIC = 0xA5
+# magic, сложность, очки, сессия, время; последним идёт crc32 предыдущих байт
+RECORD = struct.Struct("<BBIIdI")
+BODY = struct.Struct("<BBIId")
+
+
+def pack_record(difficulty, score, session, when):
+    body = BODY.pack(MAGIC, DIFFICULTY_NAMES.index(difficulty), score, session, when)
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def parse_records(data, pos=0):
+    # Возвращает записи и позицию, до которой файл разобран. Мусор после оборванной записи
+    # пропускается побайтно до следующей целой; хвост короче записи оставляем на следующий раз
+    records = []
+    size = RECORD.size
+    end = len(data)
+    while pos + size <= end:
+        magic, difficulty, score, session, when, crc = RECORD.unpack_from(data, pos)
+        if magic == MAGIC and difficulty < len(DIFFICULTY_NAMES) and zlib.crc32(data[pos:pos + size - 4]) == crc:
+            records.append((difficulty, score, session, when))
+            pos += size
+        else:
+            pos += 1
+    return records, pos
+
+
+class ScoreStore:
+    # Журнал только дописывается (O_APPEND, запись целиком одним write), поэтому его могут делить
+    # несколько киосков. Снимок лучших результатов с позицией в журнале пишется через rename.
+    # Записи других киосков дочитывает фоновый поток — после каждой своей записи и раз в
+    # refresh_every секунд, — так что top() и best() актуальны без чтения диска в кадре
+    def __init__(self, path, top_n=TOP_N, refresh_every=REFRESH_SECONDS):
+        self.path = path
+        self.snapshot_path = path + ".top"
+        self.top_n = top_n
+        self.session = random.getrandbits(32)
+        self.tables = {name: [] for name in DIFFICULTY_NAMES}
+        self.offset = 0
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = None
+        self.refresh_every = refresh_every
+        self.written = 0
+        self._load_snapshot()
+        self.refresh()
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            tables = {name: [tuple(e) for e in snapshot["top"].get(name, [])] for name in DIFFICULTY_NAMES}
+            offset = int(snapshot["offset"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        for table in tables.values():
+            heapq.heapify(table)
+        self.tables = tables
+        self.offset = offset
+
+    def _add(self, difficulty, score, when):
+        # Мин-куча из top_n записей (очки, -время): при равенстве выше тот, кто раньше
+        table = self.tables[difficulty]
+        entry = (score, -when)
+        if len(table) < self.top_n:
+            heapq.heappush(table, entry)
+        elif entry > table[0]:
+            heapq.heapreplace(table, entry)
+
+    def refresh(self):
+        # Дочитывает журнал с последней разобранной позиции (в том числе записи других киосков)
+        with self.refresh_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        try:
+            with open(self.path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                if size < self.offset:
+                    # Журнал заменили или обрезали — снимок к нему не относится
+                    self.tables = {name: [] for name in DIFFICULTY_NAMES}
+                    self.offset = 0
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        records, parsed = parse_records(data)
+        with self.lock:
+            for difficulty, score, session, when in records:
+                if session != self.session:
+                    self._add(DIFFICULTY_NAMES[difficulty], score, when)
+            self.offset += parsed
+        return len(records)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._writer, name="score-writer", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+
+    def submit(self, difficulty, score):
+        # Таблица обновляется сразу, а на диск запись уходит из фонового потока
+        when = time.time()
+        self.start()
+        with self.lock:
+            self._add(difficulty, score, when)
+            self.queue.put(pack_record(difficulty, score, self.session, when))
+
+    def _writer(self):
+        # Журнал открывается при первой записи: пока своих записей нет, поток только читает
+        fd = None
+        try:
+            while True:
+                try:
+                    record = self.queue.get(timeout=self.refresh_every)
+                except queue.Empty:
+                    self.refresh()
+                    continue
+                if record is None:
+                    break
+                if fd is None:
+                    fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                os.write(fd, record)
+                self.written += 1
+                if self.written % SNAPSHOT_EVERY == 0:
+                    os.fsync(fd)
+                    self.save_snapshot()
+                else:
+                    self.refresh()
+            if fd is not None:
+                os.fsync(fd)
+                self.save_snapshot()
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def save_snapshot(self):
+        self.refresh()
+        with self.lock:
+            # Записи из очереди уже в таблицах, но ещё не в журнале — такой снимок посчитал бы их дважды
+            if not self.queue.empty():
+                return False
+            snapshot = {"offset": self.offset,
+                        "top": {name: sorted(table, reverse=True) for name, table in self.tables.items()}}
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_path)
+        return True
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+            atexit.unregister(self.close)
+
+    def top(self, difficulty):
+        with self.lock:
+            return [(score, -when) for score, when in sorted(self.tables[difficulty], reverse=True)]
+
+    def best(self, difficulty):
+        with self.lock:
+            table = self.tables[difficulty]
+            return max(table)[0] if table else 0
+
+
+def import_legacy(store, path, difficulty="normal"):
+    # Однократный перенос рекорда из старого highscore.txt
+    if not os.path.exists(path) or os.path.exists(store.path):
+        return
+    try:
+        with open(path) as f:
+            score = int(f.read().strip())
+    except (OSError, ValueError):
+        return
+    if score > 0:
+        store.submit(difficulty, score)
+
+
+def _self_check(runs=300000):
+    import tempfile
+
+    rnd = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "scores.log")
+        names = [rnd.choice(DIFFICULTY_NAMES) for _ in range(runs)]
+        scores = [rnd.randint(0, 10000) for _ in range(runs)]
+        with open(path, "wb") as f:
+            for i, (name, score) in enumerate(zip(names, scores)):
+                f.write(pack_record(name, score, 1, float(i)))
+
+        start = time.perf_counter()
+        store = ScoreStore(path)
+        cold = time.perf_counter() - start
+        expected = {name: sorted((s for n, s in zip(names, scores) if n == name), reverse=True)[:TOP_N]
+                    for name in DIFFICULTY_NAMES}
+        ok = all([s for s, _ in store.top(name)] == expected[name] for name in DIFFICULTY_NAMES)
+
+        store.save_snapshot()
+        start = time.perf_counter()
+        warm_store = ScoreStore(path)
+        warm = time.perf_counter() - start
+        ok = ok and warm_store.top("hard") == store.top("hard")
+
+        # Оборванная запись посреди журнала и недописанный хвост
+        with open(path, "ab") as f:
+            f.write(pack_record("hard", 99999, 2, 0.0)[:7])
+            f.write(pack_record("hard", 88888, 2, 0.0))
+            f.write(pack_record("easy", 77777, 2, 0.0)[:10])
+        warm_store.refresh()
+        ok = ok and warm_store.best("hard") == 88888 and warm_store.best("easy") == expected["easy"][0]
+
+        store.submit("easy", 123456)
+        store.close()
+        reloaded = ScoreStore(path)
+        ok = ok and reloaded.best("easy") == 123456 and reloaded.best("hard") == 88888
+        ok = ok and [s for s, _ in reloaded.top("easy")].count(123456) == 1
+
+        # Другой киоск на том же журнале видит новую запись без явного refresh()
+        watcher = ScoreStore(path, refresh_every=0.05)
+        watcher.start()
+        kiosk = ScoreStore(path)
+        kiosk.submit("normal", 654321)
+        kiosk.close()
+        deadline = time.perf_counter() + 2
+        while watcher.best("normal") != 654321 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        ok = ok and watcher.best("normal") == 654321
+        watcher.close()
+    return ok, cold, warm
+
+
+if __name__ == "__main__":
+    ok, cold, warm = _self_check()
+    print(f"300000 записей: загрузка журнала {cold:.2f} с, со снимком {warm * 1000:.1f} мс, {'ok' if ok else 'FAIL'}")
+    sys.exit(0 if ok else 1)
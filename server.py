@@ -0,0 +1,547 @@
+import asyncio
+import json
+import os
+import random
+import struct
+import subprocess
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from config import HEIGHT, FPS, MS_PER_FRAME, PIPE_WIDTH, COIN_RADIUS, HEART_RADIUS, DIFFICULTIES
+from flappy_sim import FlappySim
+
+HOST = "127.0.0.1"
+PORT = 8765
+TICK = 1 / FPS
+CAPACITY = 256
+MAX_CATCH_UP_TICKS = 5
+# Зритель, не успевающий читать, отключается, а не копит очередь на сервере
+MAX_BUFFER = 256 * 1024
+DIFFICULTY_NAMES = list(DIFFICULTIES)
+
+# Клиент -> сервер: один байт команды и аргументы
+PLAY = b"P"      # + сложность (u8); ответ WELCOME
+WATCH = b"W"     # + сессия (u32); ответ SNAPSHOT, затем DELTA каждый тик
+JUMP = b"J"
+RESTART = b"R"
+QUERY = b"Q"     # ответ STATS
+
+# Сервер -> клиент: u16 длина, затем тип и данные
+WELCOME = ord("H")
+SNAPSHOT = ord("S")
+DELTA = ord("D")
+STATS = ord("T")
+
+FRAME = struct.Struct("<H")
+WELCOME_MSG = struct.Struct("<BIB")
+# тип, сессия, кадр, y, скорость, очки, жизни, флаги, число событий
+STATE = struct.Struct("<BIIffIBBB")
+DONE_FLAG = 1
+
+# События дельты: появление трубы, монеты, сердца и сбор предмета
+EV_PIPE, EV_COIN, EV_HEART, EV_COLLECT = 1, 2, 3, 4
+PIPE_EVENT = struct.Struct("<BBffBdd")     # слот, x, верх, амплитуда, скорость и фаза колебаний
+PICKUP_EVENT = struct.Struct("<BBff")      # слот, x, y
+COLLECT_EVENT = struct.Struct("<BBB")      # вид (EV_COIN/EV_HEART), слот
+
+
+class Arena:
+    # Сессии одной сложности — строки общего FlappySim, все шагают одним векторным вызовом
+    def __init__(self, difficulty, capacity=CAPACITY, seed=None):
+        self.difficulty = difficulty
+        self.sim = FlappySim(capacity, difficulty, seed)
+        self.sim.done[:] = True
+        self.free = list(range(capacity - 1, -1, -1))
+        self.jumps = np.zeros(capacity, dtype=bool)
+        self.open = np.zeros(capacity, dtype=bool)
+
+    def allocate(self):
+        if not self.free:
+            return None
+        row = self.free.pop()
+        self.open[row] = True
+        self.restart(row)
+        return row
+
+    def release(self, row):
+        self.open[row] = False
+        self.sim.done[row] = True
+        self.free.append(row)
+
+    def restart(self, row):
+        mask = np.zeros(self.sim.n, dtype=bool)
+        mask[row] = True
+        self.sim.reset(mask)
+
+    def step(self):
+        sim = self.sim
+        prev = (sim.pipe_live.copy(), sim.coin_live.copy(), sim.heart_live.copy(),
+                sim.coin_collected.copy(), sim.heart_collected.copy())
+        sim.step(self.jumps)
+        self.jumps[:] = False
+
+        # События по всем строкам сразу; дальше они раскладываются по сессиям
+        events = {}
+        pipe_live, coin_live, heart_live, coin_collected, heart_collected = prev
+        for row, slot in zip(*np.nonzero(sim.pipe_live & ~pipe_live)):
+            events.setdefault(row, []).append(PIPE_EVENT.pack(
+                EV_PIPE, slot, sim.pipe_x[row, slot], sim.pipe_top[row, slot],
+                int(sim.pipe_amplitude[row, slot]), sim.pipe_move_speed[row, slot], sim.pipe_move_offset[row, slot]))
+        for kind, x, y, live, before in ((EV_COIN, sim.coin_x, sim.coin_y, sim.coin_live, coin_live),
+                                         (EV_HEART, sim.heart_x, sim.heart_y, sim.heart_live, heart_live)):
+            for row, slot in zip(*np.nonzero(live & ~before)):
+                events.setdefault(row, []).append(PICKUP_EVENT.pack(kind, slot, x[row, slot], y[row, slot]))
+        for kind, collected, before in ((EV_COIN, sim.coin_collected, coin_collected),
+                                        (EV_HEART, sim.heart_collected, heart_collected)):
+            for row, slot in zip(*np.nonzero(collected & ~before)):
+                events.setdefault(row, []).append(COLLECT_EVENT.pack(EV_COLLECT, kind, slot))
+        return events
+
+    def delta(self, session, row, events):
+        sim = self.sim
+        header = STATE.pack(DELTA, session, sim.frame[row], sim.bird_y[row], sim.bird_velocity[row],
+                            sim.score[row], sim.lives[row], DONE_FLAG if sim.done[row] else 0, len(events))
+        return header + b"".join(events)
+
+    def snapshot(self, session, row):
+        # Полное состояние сессии — как дельта, в которой все живые объекты только что появились
+        sim = self.sim
+        events = []
+        for slot in np.flatnonzero(sim.pipe_live[row]):
+            events.append(PIPE_EVENT.pack(EV_PIPE, slot, sim.pipe_x[row, slot], sim.pipe_top[row, slot],
+                                          int(sim.pipe_amplitude[row, slot]), sim.pipe_move_speed[row, slot],
+                                          sim.pipe_move_offset[row, slot]))
+        for kind, x, y, live, collected in ((EV_COIN, sim.coin_x, sim.coin_y, sim.coin_live, sim.coin_collected),
+                                            (EV_HEART, sim.heart_x, sim.heart_y, sim.heart_live, sim.heart_collected)):
+            for slot in np.flatnonzero(live[row] & ~collected[row]):
+                events.append(PICKUP_EVENT.pack(kind, slot, x[row, slot], y[row, slot]))
+        header = STATE.pack(SNAPSHOT, session, sim.frame[row], sim.bird_y[row], sim.bird_velocity[row],
+                            sim.score[row], sim.lives[row], DONE_FLAG if sim.done[row] else 0, len(events))
+        return header + b"".join(events)
+
+
+class Replica:
+    # Состояние сессии на стороне клиента: снимок, затем дельты. Трубы и предметы двигаются
+    # локально по тем же правилам, что в FlappySim, — по сети идут только появления и сборы
+    def __init__(self, difficulty="normal"):
+        preset = DIFFICULTIES[difficulty]
+        self.pipe_speed = preset["pipe_speed"]
+        self.pipe_gap = preset["pipe_gap"]
+        self.frame = 0
+        self.bird_y = self.bird_velocity = 0.0
+        self.score = self.lives = 0
+        self.done = False
+        self.pipes = {}
+        self.coins = {}
+        self.hearts = {}
+
+    def pipe_top(self, pipe, frame):
+        x, top, amplitude, speed, offset = pipe
+        if amplitude:
+            top = top + np.sin(frame * MS_PER_FRAME * speed + offset) * amplitude
+        return min(max(top, 40), HEIGHT - self.pipe_gap - 40)
+
+    def apply(self, message):
+        kind, session, frame, y, velocity, score, lives, flags, count = STATE.unpack_from(message)
+        if kind == SNAPSHOT:
+            self.pipes.clear()
+            self.coins.clear()
+            self.hearts.clear()
+        elif frame != self.frame:
+            # Сдвиг за шаг: трубы — пока живы, предметы — пока не собраны
+            for slot, pipe in list(self.pipes.items()):
+                pipe[0] -= self.pipe_speed
+                if pipe[0] + PIPE_WIDTH <= 0:
+                    del self.pipes[slot]
+            for items, radius in ((self.coins, COIN_RADIUS), (self.hearts, HEART_RADIUS)):
+                for slot, item in list(items.items()):
+                    item[0] -= self.pipe_speed
+                    if item[0] + radius <= 0:
+                        del items[slot]
+        self.frame, self.bird_y, self.bird_velocity = frame, y, velocity
+        self.score, self.lives, self.done = score, lives, bool(flags & DONE_FLAG)
+
+        pos = STATE.size
+        for _ in range(count):
+            event = message[pos]
+            if event == EV_PIPE:
+                _, slot, x, top, amplitude, speed, offset = PIPE_EVENT.unpack_from(message, pos)
+                self.pipes[slot] = [x, top, amplitude, speed, offset]
+                pos += PIPE_EVENT.size
+            elif event == EV_COLLECT:
+                _, what, slot = COLLECT_EVENT.unpack_from(message, pos)
+                (self.coins if what == EV_COIN else self.hearts).pop(slot, None)
+                pos += COLLECT_EVENT.size
+            else:
+                _, slot, x, y = PICKUP_EVENT.unpack_from(message, pos)
+                (self.coins if event == EV_COIN else self.hearts)[slot] = [x, y]
+                pos += PICKUP_EVENT.size
+        return session
+
+    def pipe_state(self):
+        # Верх трубы считается по кадру, на котором она в последний раз сдвигалась
+        return {slot: (pipe[0], self.pipe_top(pipe, self.frame - 1)) for slot, pipe in self.pipes.items()}
+
+
+class Server:
+    def __init__(self, capacity=CAPACITY, seed=None):
+        self.capacity = capacity
+        self.seed = seed
+        self.arenas = {}
+        self.sessions = {}
+        self.listeners = {}
+        self.next_session = 1
+        self.ticks = 0
+        self.lateness = deque(maxlen=FPS * 60)
+        self.bytes_sent = 0
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+
+    def arena(self, difficulty):
+        if difficulty not in self.arenas:
+            self.arenas[difficulty] = Arena(difficulty, self.capacity, self.seed)
+        return self.arenas[difficulty]
+
+    def open_session(self, difficulty):
+        arena = self.arena(difficulty)
+        row = arena.allocate()
+        if row is None:
+            return None
+        session = self.next_session
+        self.next_session += 1
+        self.sessions[session] = (arena, row)
+        self.listeners[session] = []
+        return session
+
+    def close_session(self, session):
+        arena, row = self.sessions.pop(session)
+        arena.release(row)
+        # Зрители закрытой сессии отключаются; соединение игрока закрывает его обработчик
+        for writer in self.listeners.pop(session):
+            if not writer.player:
+                writer.close()
+
+    def restart_session(self, session):
+        # Новый снимок нужен всем получателям сессии: зрители иначе остаются со старыми трубами
+        arena, row = self.sessions[session]
+        arena.restart(row)
+        payload = arena.snapshot(session, row)
+        for writer in self.listeners[session]:
+            self.send(writer, payload)
+
+    def send(self, writer, payload):
+        writer.write(FRAME.pack(len(payload)) + payload)
+        self.bytes_sent += FRAME.size + len(payload)
+
+    def tick(self):
+        for arena in self.arenas.values():
+            events = arena.step()
+            for session, (a, row) in self.sessions.items():
+                if a is not arena:
+                    continue
+                listeners = self.listeners[session]
+                if not listeners:
+                    continue
+                payload = arena.delta(session, row, events.get(row, ()))
+                for writer in list(listeners):
+                    if writer.transport.get_write_buffer_size() > MAX_BUFFER:
+                        listeners.remove(writer)
+                        writer.close()
+                    else:
+                        self.send(writer, payload)
+        self.ticks += 1
+
+    async def run(self):
+        # Общий планировщик с фиксированным шагом: отставание догоняется не более чем
+        # на MAX_CATCH_UP_TICKS шагов, опоздание каждого тика записывается
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            next_tick += TICK
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            late = loop.time() - next_tick
+            self.lateness.append(late)
+            if late > TICK * MAX_CATCH_UP_TICKS:
+                next_tick = loop.time()
+            self.tick()
+
+    def stats(self):
+        late = sorted(self.lateness) or [0.0]
+        return {"ticks": self.ticks, "sessions": len(self.sessions),
+                "listeners": sum(len(v) for v in self.listeners.values()),
+                "wall": time.perf_counter() - self.started, "cpu": time.process_time() - self.cpu_started,
+                "late_p50_ms": late[len(late) // 2] * 1000, "late_p99_ms": late[int(len(late) * 0.99)] * 1000,
+                "late_max_ms": late[-1] * 1000, "bytes_sent": self.bytes_sent}
+
+    async def handle(self, reader, writer):
+        writer.session = None
+        writer.player = False
+        try:
+            while True:
+                command = await reader.readexactly(1)
+                if command == JUMP and writer.player:
+                    arena, row = self.sessions[writer.session]
+                    arena.jumps[row] = True
+                elif command == RESTART and writer.player:
+                    self.restart_session(writer.session)
+                elif command == PLAY and writer.session is None:
+                    index = (await reader.readexactly(1))[0]
+                    if index >= len(DIFFICULTY_NAMES):
+                        break
+                    difficulty = DIFFICULTY_NAMES[index]
+                    session = self.open_session(difficulty)
+                    self.send(writer, WELCOME_MSG.pack(WELCOME, session or 0, DIFFICULTY_NAMES.index(difficulty)))
+                    if session is None:
+                        break
+                    writer.session = session
+                    writer.player = True
+                    self.listeners[session].append(writer)
+                    arena, row = self.sessions[session]
+                    self.send(writer, arena.snapshot(session, row))
+                elif command == WATCH:
+                    (session,) = struct.unpack("<I", await reader.readexactly(4))
+                    if session not in self.sessions:
+                        break
+                    arena, row = self.sessions[session]
+                    self.listeners[session].append(writer)
+                    self.send(writer, WELCOME_MSG.pack(WELCOME, session, DIFFICULTY_NAMES.index(arena.difficulty)))
+                    self.send(writer, arena.snapshot(session, row))
+                elif command == QUERY:
+                    self.send(writer, bytes([STATS]) + json.dumps(self.stats()).encode())
+                else:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if writer.player and writer.session in self.sessions:
+                self.close_session(writer.session)
+            for listeners in self.listeners.values():
+                if writer in listeners:
+                    listeners.remove(writer)
+            writer.close()
+
+
+async def serve(host=HOST, port=PORT, capacity=CAPACITY, ready=None):
+    server = Server(capacity)
+    listener = await asyncio.start_server(server.handle, host, port)
+    if ready:
+        ready(listener.sockets[0].getsockname()[1])
+    async with listener:
+        await asyncio.gather(listener.serve_forever(), server.run())
+
+
+async def read_message(reader):
+    (length,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return await reader.readexactly(length)
+
+
+async def _player(host, port, difficulty, stop, counts):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(PLAY + bytes([DIFFICULTY_NAMES.index(difficulty)]))
+    welcome = await read_message(reader)
+    _, session, _ = WELCOME_MSG.unpack(welcome)
+    if not session:
+        writer.close()
+        return None
+    rnd = random.Random(session)
+
+    async def consume():
+        while not stop.is_set():
+            message = await read_message(reader)
+            counts["messages"] += 1
+            counts["bytes"] += len(message) + FRAME.size
+            if message[0] == DELTA and STATE.unpack_from(message)[7] & DONE_FLAG:
+                writer.write(RESTART)
+
+    task = asyncio.create_task(consume())
+    while not stop.is_set():
+        await asyncio.sleep(TICK * rnd.uniform(8, 24))
+        writer.write(JUMP)
+    task.cancel()
+    writer.close()
+    return session
+
+
+async def _spectator(host, port, session, stop, counts):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(WATCH + struct.pack("<I", session))
+    welcome = await read_message(reader)
+    replica = Replica(DIFFICULTY_NAMES[WELCOME_MSG.unpack(welcome)[2]])
+    while not stop.is_set():
+        try:
+            message = await asyncio.wait_for(read_message(reader), 1)
+        except asyncio.TimeoutError:
+            continue
+        replica.apply(message)
+        counts["spectated"] += 1
+    writer.close()
+
+
+async def _query(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(QUERY)
+    message = await read_message(reader)
+    writer.close()
+    return json.loads(message[1:])
+
+
+async def load_test(host, port, sessions, spectators, seconds, difficulty="normal"):
+    stop = asyncio.Event()
+    counts = {"messages": 0, "bytes": 0, "spectated": 0}
+    players = [asyncio.create_task(_player(host, port, difficulty, stop, counts)) for _ in range(sessions)]
+    await asyncio.sleep(0.5)
+    ids = list(range(1, sessions + 1))
+    watchers = [asyncio.create_task(_spectator(host, port, ids[i % len(ids)], stop, counts))
+                for i in range(spectators)]
+    await asyncio.sleep(0.5)
+    before = await _query(host, port)
+    await asyncio.sleep(seconds)
+    after = await _query(host, port)
+    stop.set()
+    await asyncio.gather(*players, *watchers, return_exceptions=True)
+
+    wall = after["wall"] - before["wall"]
+    cpu = after["cpu"] - before["cpu"]
+    ticks = after["ticks"] - before["ticks"]
+    return {"sessions": after["sessions"], "listeners": after["listeners"], "ticks_per_sec": ticks / wall,
+            "cpu_share": cpu / wall, "sessions_per_core": after["sessions"] / max(cpu / wall, 1e-9),
+            "late_p50_ms": after["late_p50_ms"], "late_p99_ms": after["late_p99_ms"],
+            "late_max_ms": after["late_max_ms"],
+            "bytes_per_session_tick": (after["bytes_sent"] - before["bytes_sent"]) / max(ticks * after["listeners"], 1)}
+
+
+def run_load(sessions=200, spectators=50, seconds=5.0, difficulty="normal"):
+    # Сервер — отдельный процесс на loopback, чтобы его CPU не смешивался с нагрузкой
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", "--port", "0",
+                             "--capacity", str(max(sessions, CAPACITY))],
+                            stdout=subprocess.PIPE, text=True)
+    try:
+        port = int(proc.stdout.readline())
+        return asyncio.run(load_test(HOST, port, sessions, spectators, seconds, difficulty))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def _self_check(ticks=3000, sessions=8, seed=0):
+    # Реплики, собранные только из снимка и дельт, должны совпадать с состоянием симуляции
+    arena = Arena("normal", sessions, seed)
+    rows = [arena.allocate() for _ in range(sessions)]
+    replicas = [Replica("normal") for _ in rows]
+    for session, row in enumerate(rows):
+        replicas[session].apply(arena.snapshot(session, row))
+    rnd = np.random.default_rng(seed)
+    worst = 0.0
+    total = 0
+    for _ in range(ticks):
+        arena.jumps[:] = rnd.random(sessions) < 0.07
+        events = arena.step()
+        for session, row in enumerate(rows):
+            message = arena.delta(session, row, events.get(row, ()))
+            total += len(message)
+            replica = replicas[session]
+            replica.apply(message)
+            sim = arena.sim
+            live = set(np.flatnonzero(sim.pipe_live[row]).tolist())
+            if set(replica.pipes) != live:
+                return False, worst, total / (ticks * sessions)
+            for slot, (x, top) in replica.pipe_state().items():
+                worst = max(worst, abs(x - sim.pipe_x[row, slot]), abs(top - sim.pipe_current_top[row, slot]))
+            coins = set(np.flatnonzero(sim.coin_live[row] & ~sim.coin_collected[row]).tolist())
+            if set(replica.coins) != coins:
+                return False, worst, total / (ticks * sessions)
+            if sim.done[row]:
+                arena.restart(row)
+                replica.apply(arena.snapshot(session, row))
+    return worst < 1e-3, worst, total / (ticks * sessions)
+
+
+class _Sink:
+    # Соединение для самопроверки: кадры копятся в списке вместо сокета
+    def __init__(self, player=False):
+        self.player = player
+        self.transport = self
+        self.messages = []
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def write(self, data):
+        self.messages.append(data[FRAME.size:])
+
+    def close(self):
+        pass
+
+
+def _restart_check(ticks=1200, seed=0, every=150):
+    # Зритель, подключённый к серверу, после каждого перезапуска сессии должен получить новый
+    # снимок: его реплика совпадает с симуляцией и после перезапусков, в том числе посреди забега
+    server = Server(1, seed)
+    session = server.open_session("normal")
+    player, spectator = _Sink(True), _Sink()
+    server.listeners[session] += [player, spectator]
+    arena, row = server.sessions[session]
+    server.send(spectator, arena.snapshot(session, row))
+    replica = Replica("normal")
+    rnd = np.random.default_rng(seed)
+    restarts = 0
+    for t in range(ticks):
+        arena.jumps[row] = rnd.random() < 0.07
+        server.tick()
+        if arena.sim.done[row] or t % every == every - 1:
+            server.restart_session(session)
+            restarts += 1
+        for message in spectator.messages:
+            replica.apply(message)
+        spectator.messages.clear()
+        sim = arena.sim
+        if (set(replica.pipes) != set(np.flatnonzero(sim.pipe_live[row]).tolist())
+                or set(replica.coins) != set(np.flatnonzero(sim.coin_live[row] & ~sim.coin_collected[row]).tolist())):
+            return False, restarts
+    return True, restarts
+
+
+def main(argv):
+    # python server.py --serve [--port N] [--capacity N]                 — сервер на loopback
+    # python server.py --load [--sessions N] [--spectators N] [--seconds S] — нагрузочный тест
+    # python server.py                                                   — самопроверка дельт
+    options = {"--port": PORT, "--capacity": CAPACITY, "--sessions": 200, "--spectators": 50,
+               "--seconds": 5.0, "--difficulty": "normal"}
+    flags = set()
+    args = iter(argv)
+    for arg in args:
+        if arg in options:
+            options[arg] = type(options[arg])(next(args))
+        else:
+            flags.add(arg)
+
+    if "--serve" in flags:
+        try:
+            asyncio.run(serve(HOST, options["--port"], options["--capacity"],
+                              ready=lambda port: print(port, flush=True)))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if "--load" in flags:
+        r = run_load(options["--sessions"], options["--spectators"], options["--seconds"], options["--difficulty"])
+        print(f"{r['sessions']} сессий, {r['listeners']} получателей: {r['ticks_per_sec']:.1f} тиков/с, "
+              f"CPU {r['cpu_share']:.0%}, ~{r['sessions_per_core']:.0f} сессий на ядро")
+        print(f"опоздание тика p50 {r['late_p50_ms']:.2f} мс, p99 {r['late_p99_ms']:.2f} мс, "
+              f"макс {r['late_max_ms']:.2f} мс; {r['bytes_per_session_tick']:.1f} Б на получателя за тик")
+        return 0
+    ok, worst, size = _self_check()
+    print(f"реплики {'совпадают' if ok else 'РАСХОДЯТСЯ'} с симуляцией (макс. ошибка {worst:.2e}), "
+          f"в среднем {size:.1f} Б на сессию за тик")
+    restart_ok, restarts = _restart_check()
+    print(f"зритель после {restarts} перезапусков {'совпадает' if restart_ok else 'РАСХОДИТСЯ'} с симуляцией")
+    ok = ok and restart_ok
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+# Сколько импорт praktik может добавлять сверх импорта самого pygame
+IMPORT_BUDGET_MS = 60
+RUNS = 5
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import pygame
+base = time.perf_counter()
+import praktik
+end = time.perf_counter()
+side_effects = [name for name, busy in (("display", pygame.display.get_init()), ("font", pygame.font.get_init()),
+                                        ("mixer", pygame.mixer.get_init() is not None)) if busy]
+print((base - start) * 1000, (end - base) * 1000, ",".join(side_effects))
+"""
+
+
+def import_cost(runs=RUNS):
+    # Каждый замер — в свежем процессе без дисплея; берём минимум, он меньше всего зашумлён
+    env = dict(os.environ)
+    env.pop("SDL_VIDEODRIVER", None)
+    env["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", _PROBE], cwd=here, env=env,
+                             capture_output=True, text=True, check=True).stdout.split()
+        samples.append((float(out[0]), float(out[1]), out[2] if len(out) > 2 else ""))
+    pygame_ms = min(s[0] for s in samples)
+    praktik_ms = min(s[1] for s in samples)
+    side_effects = {name for s in samples for name in s[2].split(",") if name}
+    return pygame_ms, praktik_ms, sorted(side_effects)
+
+
+if __name__ == "__main__":
+    pygame_ms, praktik_ms, side_effects = import_cost()
+    print(f"import pygame: {pygame_ms:.1f} мс, import praktik сверх того: {praktik_ms:.1f} мс "
+          f"(бюджет {IMPORT_BUDGET_MS} мс)")
+    if side_effects:
+        print("при импорте инициализированы: " + ", ".join(side_effects))
+    sys.exit(0 if praktik_ms <= IMPORT_BUDGET_MS and not side_effects else 1)
@@ -0,0 +1,433 @@
+import math
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+CHUNK = 1 << 20
+WINDOW = 37
+# Точный подсчёт значений ведётся, пока диапазон целых не шире этого числа корзин
+EXACT_RANGE = 1 << 22
+SKETCH_ALPHA = 0.001
+
+
+def open_values(path, dtype=None):
+    # .npy открывается через mmap, сырой двоичный файл — как memmap заданного типа
+    if path.endswith(".npy"):
+        return np.load(path, mmap_mode="r")
+    return np.memmap(path, dtype=np.dtype(dtype or np.float64), mode="r")
+
+
+def iter_chunks(values, chunk=CHUNK):
+    for start in range(0, len(values), chunk):
+        yield np.asarray(values[start:start + chunk])
+
+
+class Welford:
+    # Среднее, дисперсия, минимум и максимум за один проход; куски сливаются формулой Чана
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, x):
+        n = len(x)
+        if n == 0:
+            return
+        x = x.astype(np.float64, copy=False)
+        mean = x.mean()
+        m2 = ((x - mean) ** 2).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, x.min())
+        self.max = max(self.max, x.max())
+
+    def std(self, ddof=1):
+        if self.count <= ddof:
+            return math.nan
+        return math.sqrt(self.m2 / (self.count - ddof))
+
+
+class Counts:
+    # Частоты целых значений в растущем окне [lo, lo + len(counts)). Если окно стало бы шире
+    # max_span, счёт переходит в разреженный вид — отсортированные ключи и их частоты, — и память
+    # растёт с числом разных значений, а не с размахом
+    def __init__(self, max_span=EXACT_RANGE):
+        self.lo = 0
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.max_span = max_span
+        self.keys = None
+        self.freq = None
+
+    @property
+    def dense(self):
+        return self.keys is None
+
+    def add(self, ints):
+        if len(ints) == 0:
+            return
+        if self.dense and self.span(ints) > self.max_span:
+            self.keys, self.freq = self.nonzero()
+            self.counts = None
+        if not self.dense:
+            # Ключи куска сливаются с накопленными одной сортировкой, без цикла по значениям
+            keys, freq = np.unique(ints, return_counts=True)
+            self.keys, inverse = np.unique(np.concatenate((self.keys, keys)), return_inverse=True)
+            self.freq = np.bincount(inverse, np.concatenate((self.freq, freq))).astype(np.int64)
+            return
+        lo = int(ints.min())
+        hi = int(ints.max())
+        if len(self.counts) == 0:
+            self.lo = lo
+            self.counts = np.zeros(hi - lo + 1, dtype=np.int64)
+        elif lo < self.lo or hi >= self.lo + len(self.counts):
+            new_lo = min(lo, self.lo)
+            new_hi = max(hi, self.lo + len(self.counts) - 1)
+            grown = np.zeros(new_hi - new_lo + 1, dtype=np.int64)
+            grown[self.lo - new_lo:self.lo - new_lo + len(self.counts)] = self.counts
+            self.lo, self.counts = new_lo, grown
+        self.counts += np.bincount(ints - self.lo, minlength=len(self.counts))
+
+    def span(self, ints):
+        if not self.dense:
+            lo = min(int(ints.min()), int(self.keys[0])) if len(ints) else int(self.keys[0])
+            return max(int(ints.max()) if len(ints) else lo, int(self.keys[-1])) - lo + 1
+        if len(ints) == 0:
+            return len(self.counts)
+        lo = min(int(ints.min()), self.lo if len(self.counts) else int(ints.min()))
+        hi = max(int(ints.max()), self.lo + len(self.counts) - 1)
+        return hi - lo + 1
+
+    def nonzero(self):
+        if not self.dense:
+            return self.keys.copy(), self.freq.copy()
+        index = np.flatnonzero(self.counts)
+        return index + self.lo, self.counts[index]
+
+
+class QuantileSketch:
+    # Логарифмические корзины с относительной ошибкой alpha (как DDSketch); память фиксирована
+    def __init__(self, alpha=SKETCH_ALPHA, min_value=1e-9, max_value=1e300):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.offset = math.ceil(math.log(min_value) / self.log_gamma)
+        size = math.ceil(math.log(max_value) / self.log_gamma) - self.offset + 1
+        self.pos = np.zeros(size, dtype=np.int64)
+        self.neg = np.zeros(size, dtype=np.int64)
+        self.zero = 0
+
+    def _index(self, magnitude):
+        index = np.ceil(np.log(magnitude) / self.log_gamma).astype(np.int64) - self.offset
+        return np.clip(index, 0, len(self.pos) - 1)
+
+    def add(self, x, weights=None):
+        x = np.asarray(x, dtype=np.float64)
+        if weights is None:
+            weights = np.ones(len(x), dtype=np.int64)
+        small = np.abs(x) < self.min_value
+        self.zero += int(weights[small].sum())
+        for sign, buckets in ((x > 0, self.pos), (x < 0, self.neg)):
+            sel = sign & ~small
+            if sel.any():
+                buckets += np.bincount(self._index(np.abs(x[sel])), weights[sel],
+                                       minlength=len(buckets)).astype(np.int64)
+
+    def _value(self, index):
+        return 2 * self.gamma ** (index + self.offset) / (self.gamma + 1)
+
+    def at_rank(self, rank):
+        # Порядок: отрицательные по убыванию модуля, нули, положительные по возрастанию
+        neg_total = int(self.neg.sum())
+        if rank < neg_total:
+            cum = np.cumsum(self.neg[::-1])
+            i = len(self.neg) - 1 - int(np.searchsorted(cum, rank, side="right"))
+            return -self._value(i)
+        rank -= neg_total
+        if rank < self.zero:
+            return 0.0
+        rank -= self.zero
+        i = int(np.searchsorted(np.cumsum(self.pos), rank, side="right"))
+        return self._value(i)
+
+
+class Distribution:
+    # Точные частоты для целых с узким диапазоном, иначе скетч с ограниченной ошибкой
+    def __init__(self, exact_range=EXACT_RANGE):
+        self.exact_range = exact_range
+        self.counts = Counts(exact_range)
+        self.sketch = None
+        self.count = 0
+
+    @property
+    def exact(self):
+        return self.sketch is None
+
+    def add(self, x):
+        self.count += len(x)
+        if self.sketch is None:
+            if np.issubdtype(x.dtype, np.integer) and self.counts.span(x) <= self.exact_range:
+                self.counts.add(x.astype(np.int64, copy=False))
+                return
+            self.sketch = QuantileSketch()
+            values, counts = self.counts.nonzero()
+            self.sketch.add(values, counts)
+            self.counts = None
+        self.sketch.add(x)
+
+    def at_rank(self, rank):
+        if self.sketch is not None:
+            return self.sketch.at_rank(rank)
+        cum = np.cumsum(self.counts.counts)
+        return float(self.counts.lo + int(np.searchsorted(cum, rank, side="right")))
+
+    def quantile(self, q):
+        # Линейная интерполяция между соседними рангами, как у pandas
+        if self.count == 0:
+            return math.nan
+        h = (self.count - 1) * q
+        lo = math.floor(h)
+        low = self.at_rank(lo)
+        if h == lo:
+            return low
+        return low + (h - lo) * (self.at_rank(lo + 1) - low)
+
+    def median(self):
+        return self.quantile(0.5)
+
+
+class Hundreds:
+    # Гистограмма значений, округлённых до сотен (np.round, как в praktik1.py)
+    def __init__(self):
+        self.counts = Counts()
+
+    def add(self, x):
+        self.counts.add(np.round(x / 100).astype(np.int64))
+
+    def result(self):
+        # Все сотни от наименьшей до наибольшей; в разреженном счёте — только встретившиеся
+        if not self.counts.dense:
+            values, counts = self.counts.nonzero()
+            return values * 100, counts
+        values = (np.arange(len(self.counts.counts)) + self.counts.lo) * 100
+        return values, self.counts.counts.copy()
+
+
+def rolling_mean(chunks, window=WINDOW):
+    # O(1) на элемент: суммы окна через префиксные суммы куска с хвостом из window - 1 значений.
+    # Префиксы начинаются заново в каждом куске, поэтому погрешность не копится по всему потоку
+    tail = np.zeros(0)
+    for x in chunks:
+        x = x.astype(np.float64, copy=False)
+        buf = np.concatenate((tail, x))
+        prefix = np.concatenate(([0.0], np.cumsum(buf)))
+        out = np.full(len(x), np.nan)
+        first = max(window - 1 - len(tail), 0)
+        if first < len(x):
+            ends = np.arange(len(tail) + first, len(buf)) + 1
+            out[first:] = (prefix[ends] - prefix[ends - window]) / window
+        tail = buf[len(buf) - (window - 1):] if window > 1 else buf[:0]
+        yield out
+
+
+def _write_blocks(blocks, out_path, count):
+    out = np.lib.format.open_memmap(out_path, mode="w+", dtype=np.float64, shape=(count,))
+    pos = 0
+    for block in blocks:
+        out[pos:pos + len(block)] = block
+        pos += len(block)
+    out.flush()
+    del out
+
+
+def _counts_blocks(counts, descending, chunk):
+    values, freq = counts.nonzero()
+    if descending:
+        values, freq = values[::-1], freq[::-1]
+    start = 0
+    while start < len(values):
+        # Набираем значения, пока их повторения укладываются в кусок
+        cum = np.cumsum(freq[start:])
+        end = start + max(1, int(np.searchsorted(cum, chunk, side="right")))
+        yield np.repeat(values[start:end], freq[start:end]).astype(np.float64)
+        start = end
+
+
+def _merge_blocks(values, chunk, tmp):
+    # Внешняя сортировка: отсортированные куски на диск, затем слияние блоками. От каждого куска
+    # в памяти окно из chunk / k значений; всё, что не больше наименьшего из последних значений
+    # окон, уже не встретится дальше ни в одном куске и выдаётся одной сортировкой склейки.
+    # Окно с этим наименьшим значением выбирается целиком, так что каждый шаг — минимум одно окно
+    runs = []
+    for i, x in enumerate(iter_chunks(values, chunk)):
+        path = os.path.join(tmp, f"run{i}.npy")
+        np.save(path, np.sort(x.astype(np.float64)))
+        runs.append(np.load(path, mmap_mode="r"))
+    window = max(1, chunk // max(1, len(runs)))
+    loaded = [min(window, len(run)) for run in runs]
+    buffers = [np.asarray(run[:n]) for run, n in zip(runs, loaded)]
+    while True:
+        live = [i for i, buffer in enumerate(buffers) if len(buffer)]
+        if not live:
+            return
+        bound = min(buffers[i][-1] for i in live)
+        parts = []
+        for i in live:
+            k = int(np.searchsorted(buffers[i], bound, side="right"))
+            parts.append(buffers[i][:k])
+            buffers[i] = buffers[i][k:]
+            if not len(buffers[i]):
+                buffers[i] = np.asarray(runs[i][loaded[i]:loaded[i] + window])
+                loaded[i] += len(buffers[i])
+        yield np.sort(np.concatenate(parts))
+
+
+def reverse_file(src_path, out_path, chunk=CHUNK):
+    # Убывающий порядок из готового возрастающего — чтение mmap кусками с конца, без сортировки
+    source = np.load(src_path, mmap_mode="r")
+    blocks = (np.asarray(source[max(0, end - chunk):end][::-1]) for end in range(len(source), 0, -chunk))
+    _write_blocks(blocks, out_path, len(source))
+
+
+def write_sorted(values, dist, out_path, descending=False, chunk=CHUNK):
+    if dist.exact:
+        _write_blocks(_counts_blocks(dist.counts, descending, chunk), out_path, dist.count)
+        return
+    if not descending:
+        with tempfile.TemporaryDirectory() as tmp:
+            _write_blocks(_merge_blocks(values, chunk, tmp), out_path, dist.count)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        ascending = os.path.join(tmp, "ascending.npy")
+        write_sorted(values, dist, ascending, False, chunk)
+        reverse_file(ascending, out_path, chunk)
+
+
+def report(path, dtype=None, window=WINDOW, chunk=CHUNK, rolling_out=None, sorted_out=None):
+    # Тот же отчёт, что в praktik1.py, но по кускам: память ограничена размером куска
+    values = open_values(path, dtype)
+    stats = Welford()
+    dist = Distribution()
+    hundreds = Hundreds()
+    for x in iter_chunks(values, chunk):
+        stats.update(x)
+        dist.add(x)
+        hundreds.add(x)
+
+    # Для "больше среднего" среднее нужно знать заранее — второй проход по mmap
+    greater = 0
+    for x in iter_chunks(values, chunk):
+        greater += int((x > stats.mean).sum())
+
+    if rolling_out:
+        _write_blocks(rolling_mean(iter_chunks(values, chunk), window), rolling_out, len(values))
+    if sorted_out:
+        # Одна сортировка: убывающий файл — возрастающий, прочитанный с конца
+        ascending, descending = sorted_out
+        write_sorted(values, dist, ascending, False, chunk)
+        reverse_file(ascending, descending, chunk)
+
+    return {"count": stats.count, "median": dist.median(), "mean": stats.mean,
+            "greater_than_mean": greater, "min": stats.min, "std": stats.std(),
+            "median_exact": dist.exact, "hundreds": hundreds.result()}
+
+
+def _check_against_pandas(chunk=64):
+    # Сверка с pandas на том же наборе из 1000 чисел, что и в praktik1.py
+    import pandas as pd
+
+    np.random.seed(42)
+    data = np.random.randint(-10000, 10001, size=1000)
+    series = pd.Series(data)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.npy")
+        np.save(path, data)
+        paths = [os.path.join(tmp, name) for name in ("rolling.npy", "asc.npy", "desc.npy")]
+        result = report(path, chunk=chunk, rolling_out=paths[0], sorted_out=paths[1:])
+        rolling, ascending, descending = (np.load(p) for p in paths)
+
+        raw = os.path.join(tmp, "data.f32")
+        data.astype(np.float32).tofile(raw)
+        approx = report(raw, dtype=np.float32, chunk=chunk, sorted_out=[os.path.join(tmp, "fa.npy"),
+                                                                         os.path.join(tmp, "fd.npy")])
+        float_sorted = np.load(os.path.join(tmp, "fd.npy"))
+
+    rounded = np.round(series / 100).astype(int) * 100
+    bins = range(rounded.min(), rounded.max() + 100, 100)
+    expected_hist, _ = np.histogram(rounded, bins=bins)
+    values, counts = result["hundreds"]
+    # Последняя корзина plt.hist закрыта справа и вбирает две последние сотни
+    hist_ok = (list(values) == list(bins) and
+               list(counts[:-2]) == list(expected_hist[:-1]) and counts[-2] + counts[-1] == expected_hist[-1])
+
+    reference = series.rolling(window=WINDOW).mean().to_numpy()
+    checks = {
+        "median": result["median"] == series.median(),
+        "mean": math.isclose(result["mean"], series.mean(), rel_tol=1e-12),
+        "greater_than_mean": result["greater_than_mean"] == series[series > series.mean()].count(),
+        "min": result["min"] == series.min(),
+        "std": math.isclose(result["std"], series.std(), rel_tol=1e-12),
+        "rolling": bool(np.allclose(rolling, reference, equal_nan=True, rtol=1e-12, atol=1e-9)),
+        "hundreds": hist_ok,
+        "sorted": (ascending == series.sort_values().to_numpy()).all() and
+                  (descending == series.sort_values(ascending=False).to_numpy()).all(),
+        "sketch_median": abs(approx["median"] - series.median()) <= SKETCH_ALPHA * abs(series.median()) + 1e-9
+                         and not approx["median_exact"],
+        "external_sort": (float_sorted == series.sort_values(ascending=False).to_numpy()).all(),
+        "sparse_counts": _sparse_matches(data, chunk),
+    }
+    return checks
+
+
+def _sparse_matches(data, chunk):
+    # Разреженный счёт даёт те же частоты, что плотный, и не растёт с размахом значений
+    dense, sparse = Counts(), Counts(max_span=1000)
+    for start in range(0, len(data), chunk):
+        dense.add(data[start:start + chunk])
+        sparse.add(data[start:start + chunk])
+    wide = Counts(max_span=1000)
+    wide.add(np.array([-10 ** 15, 0, 10 ** 15, 0]))
+    return (not sparse.dense and all((a == b).all() for a, b in zip(dense.nonzero(), sparse.nonzero()))
+            and wide.nonzero()[0].tolist() == [-10 ** 15, 0, 10 ** 15] and wide.nonzero()[1].tolist() == [1, 2, 1])
+
+
+def _memory_check(count=20_000_000, chunk=CHUNK):
+    # Пик памяти не должен зависеть от длины файла — только от размера куска
+    import tracemalloc
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.npy")
+        out = np.lib.format.open_memmap(path, mode="w+", dtype=np.int32, shape=(count,))
+        rng = np.random.default_rng(0)
+        for start in range(0, count, chunk):
+            out[start:start + chunk] = rng.integers(-10000, 10001, min(chunk, count - start))
+        out.flush()
+        del out
+        tracemalloc.start()
+        report(path, chunk=chunk, rolling_out=os.path.join(tmp, "rolling.npy"))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return peak
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and not sys.argv[1].startswith("--"):
+        r = report(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+        print(f"Медиана ряда: {r['median']}{'' if r['median_exact'] else ' (оценка)'}")
+        print(f"Количество чисел, больше среднего: {r['greater_than_mean']}")
+        print(f"Минимальное значение: {r['min']}")
+        print(f"Среднеквадратическое отклонение: {r['std']:.2f}")
+        sys.exit(0)
+    checks = _check_against_pandas()
+    for name, ok in checks.items():
+        print(f"{name:20s} {'ok' if ok else 'FAIL'}")
+    if "--memory" in sys.argv:
+        print(f"пик памяти на 20 млн значений: {_memory_check() / 2 ** 20:.1f} МБ")
+    sys.exit(0 if all(checks.values()) else 1)